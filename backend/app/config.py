@@ -10,6 +10,111 @@ class Settings:
     SECRET_KEY = os.getenv("SECRET_KEY")
     ENVIRONMENT = os.getenv("ENVIRONMENT")
     
+    # MongoDB client: connection pool, timeouts (milliseconds) and wire compression
+    # ("zstd,snappy" needs the zstandard / python-snappy packages; unavailable ones are skipped)
+    MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+    MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+    MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "10000"))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+    MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "10000"))
+    MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000"))
+    MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "")
+    # Read preference for email list pages, counts and dashboard reads (e.g.
+    # "secondaryPreferred"); claims, processing and everything else read the primary
+    MONGO_LIST_READ_PREFERENCE = os.getenv("MONGO_LIST_READ_PREFERENCE", "primary")
+    # Write concern for bulk ingest: w is a number or "majority"
+    MONGO_BULK_WRITE_W = os.getenv("MONGO_BULK_WRITE_W", "1")
+    MONGO_BULK_WRITE_JOURNAL = os.getenv("MONGO_BULK_WRITE_JOURNAL", "false").lower() == "true"
+    # Startup ping: attempts, with the delay doubling from MONGO_CONNECT_RETRY_DELAY_SECONDS
+    MONGO_CONNECT_RETRIES = int(os.getenv("MONGO_CONNECT_RETRIES", "5"))
+    MONGO_CONNECT_RETRY_DELAY_SECONDS = float(os.getenv("MONGO_CONNECT_RETRY_DELAY_SECONDS", "1"))
+    
+    # Processing pipeline
+    PROCESSING_CONCURRENCY = int(os.getenv("PROCESSING_CONCURRENCY", "8"))
+    PROCESSING_MAX_RETRIES = int(os.getenv("PROCESSING_MAX_RETRIES", "3"))
+    PROCESSING_RETRY_BASE_DELAY = float(os.getenv("PROCESSING_RETRY_BASE_DELAY", "1.0"))
+    # How long a worker's claim on an email lasts before it is returned to the queue
+    EMAIL_LEASE_SECONDS = int(os.getenv("EMAIL_LEASE_SECONDS", "300"))
+    # Failed attempts after which an email is no longer picked up automatically
+    PROCESSING_MAX_FAILURES = int(os.getenv("PROCESSING_MAX_FAILURES", "3"))
+    # "inline" runs jobs inside the API process; "worker" leaves them to `python worker.py`
+    PROCESSING_MODE = os.getenv("PROCESSING_MODE", "inline")
+    WORKER_POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL", "5"))
+    # A job still without a total after this long lost its creator mid-setup and is finalized
+    JOB_SETUP_TIMEOUT_SECONDS = int(os.getenv("JOB_SETUP_TIMEOUT_SECONDS", "300"))
+    
+    # How often a cached prompt config re-checks the version counter in Mongo
+    PROMPT_CACHE_CHECK_SECONDS = float(os.getenv("PROMPT_CACHE_CHECK_SECONDS", "5"))
+    
+    # Dashboard metrics snapshot lifetime (0 disables the snapshot)
+    DASHBOARD_CACHE_TTL_SECONDS = float(os.getenv("DASHBOARD_CACHE_TTL_SECONDS", "5"))
+    
+    # Bulk ingestion
+    BULK_INSERT_BATCH_SIZE = int(os.getenv("BULK_INSERT_BATCH_SIZE", "1000"))
+    
+    # Use one structured LLM call per email instead of separate action-item/auto-reply calls
+    USE_FUSED_ANALYSIS = os.getenv("USE_FUSED_ANALYSIS", "true").lower() == "true"
+    
+    # Gemini quota (requests per minute) and allowed burst
+    LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "60"))
+    LLM_BURST_SIZE = int(os.getenv("LLM_BURST_SIZE", "5"))
+    LLM_THREAD_POOL_SIZE = int(os.getenv("LLM_THREAD_POOL_SIZE", "16"))
+    LLM_MODEL_REFRESH_SECONDS = int(os.getenv("LLM_MODEL_REFRESH_SECONDS", "3600"))
+    
+    # Pack several short emails into one LLM request (sized by an approximate token budget)
+    LLM_BATCH_MODE = os.getenv("LLM_BATCH_MODE", "false").lower() == "true"
+    LLM_BATCH_TOKEN_BUDGET = int(os.getenv("LLM_BATCH_TOKEN_BUDGET", "6000"))
+    LLM_BATCH_MAX_EMAILS = int(os.getenv("LLM_BATCH_MAX_EMAILS", "10"))
+    
+    # Input token budget for the email body per LLM operation; longer bodies are
+    # condensed chunk by chunk (map-reduce) before the real call
+    LLM_BODY_TOKEN_BUDGETS = {
+        "analyze_email": int(os.getenv("LLM_ANALYZE_TOKEN_BUDGET", "4000")),
+        "extract_action_items": int(os.getenv("LLM_ACTION_ITEMS_TOKEN_BUDGET", "3000")),
+        "generate_auto_reply": int(os.getenv("LLM_AUTO_REPLY_TOKEN_BUDGET", "1500")),
+        "generate_summary": int(os.getenv("LLM_SUMMARY_TOKEN_BUDGET", "4000")),
+    }
+    LLM_CHUNK_TOKENS = int(os.getenv("LLM_CHUNK_TOKENS", "3000"))
+    LLM_MAX_CHUNKS = int(os.getenv("LLM_MAX_CHUNKS", "8"))
+    
+    # Search: hashed bag-of-words embedding size, in-process index refresh interval,
+    # candidates per ranking fused in hybrid mode, and the minimum cosine similarity
+    SEARCH_EMBEDDING_DIM = int(os.getenv("SEARCH_EMBEDDING_DIM", "256"))
+    SEARCH_INDEX_REFRESH_SECONDS = float(os.getenv("SEARCH_INDEX_REFRESH_SECONDS", "10"))
+    SEARCH_CANDIDATES = int(os.getenv("SEARCH_CANDIDATES", "200"))
+    SEARCH_MIN_SIMILARITY = float(os.getenv("SEARCH_MIN_SIMILARITY", "0.05"))
+    
+    # Near-duplicate reuse: emails whose SimHash is within DEDUP_MAX_DISTANCE bits of a
+    # processed email from the last DEDUP_WINDOW_DAYS reuse its results instead of
+    # calling the LLM (changing the distance needs fingerprints recomputed)
+    DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+    DEDUP_MAX_DISTANCE = int(os.getenv("DEDUP_MAX_DISTANCE", "5"))
+    DEDUP_WINDOW_DAYS = int(os.getenv("DEDUP_WINDOW_DAYS", "30"))
+    DEDUP_MIN_WORDS = int(os.getenv("DEDUP_MIN_WORDS", "20"))
+    DEDUP_MAX_CANDIDATES = int(os.getenv("DEDUP_MAX_CANDIDATES", "200"))
+    
+    # Explain the hot queries at startup and warn about collection scans
+    INDEX_PLAN_CHECK = os.getenv("INDEX_PLAN_CHECK", "true").lower() == "true"
+    
+    # Replies without Message-ID headers join a thread with the same normalized
+    # subject and an overlapping participant active within this many days
+    THREAD_WINDOW_DAYS = int(os.getenv("THREAD_WINDOW_DAYS", "30"))
+    
+    # Optional JSON file overriding keyword rule groups (see keyword_classifier.DEFAULT_KEYWORD_RULES)
+    KEYWORD_RULES_FILE = os.getenv("KEYWORD_RULES_FILE")
+    
+    # Per-call timeout and circuit breaker: after N consecutive failures, LLM calls
+    # short-circuit to the rule-based fallbacks for the cool-down window
+    LLM_CALL_TIMEOUT_SECONDS = float(os.getenv("LLM_CALL_TIMEOUT_SECONDS", "30"))
+    LLM_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", "5"))
+    LLM_CIRCUIT_RESET_SECONDS = float(os.getenv("LLM_CIRCUIT_RESET_SECONDS", "30"))
+    
+    # LLM response cache
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000"))
+    LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+    
     DEFAULT_PROMPTS = {
         "action_items": "Extract specific action items, deadlines, and responsibilities from this email. Format as bullet points.",
         "auto_reply": "Draft a professional auto-reply acknowledging receipt and indicating when to expect a proper response."
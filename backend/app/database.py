@@ -1,15 +1,72 @@
+import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient # type: ignore
+from pymongo import ReadPreference, WriteConcern
+from pymongo.errors import PyMongoError
 from app.config import settings
+from app.services.metrics import MongoCommandTimer, mongo_pool_monitor
+
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
 
 class Database:
     client: AsyncIOMotorClient = None
     database = None
+    # Same database with the list/dashboard read preference
+    list_database = None
 
 db = Database()
 
+def _client_options() -> dict:
+    options = {
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": settings.MONGO_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": settings.MONGO_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": settings.MONGO_SOCKET_TIMEOUT_MS,
+        # The listeners time every driver command and track pool usage for /metrics and /health
+        "event_listeners": [MongoCommandTimer(), mongo_pool_monitor],
+    }
+    compressors = [name.strip() for name in settings.MONGO_COMPRESSORS.split(",") if name.strip()]
+    if compressors:
+        options["compressors"] = compressors
+    return options
+
+def bulk_write_concern() -> WriteConcern:
+    """Write concern for bulk ingest, from MONGO_BULK_WRITE_W / MONGO_BULK_WRITE_JOURNAL"""
+    w = settings.MONGO_BULK_WRITE_W
+    return WriteConcern(w=int(w) if w.isdigit() else w, j=settings.MONGO_BULK_WRITE_JOURNAL)
+
 async def connect_to_mongo():
-    db.client = AsyncIOMotorClient(settings.MONGODB_URI)
+    """Create the client and ping the server, retrying with backoff while it is unreachable"""
+    read_preference = READ_PREFERENCES.get(settings.MONGO_LIST_READ_PREFERENCE)
+    if read_preference is None:
+        raise ValueError(f"Unknown MONGO_LIST_READ_PREFERENCE: {settings.MONGO_LIST_READ_PREFERENCE}")
+
+    db.client = AsyncIOMotorClient(settings.MONGODB_URI, **_client_options())
+    attempts = max(1, settings.MONGO_CONNECT_RETRIES)
+    delay = settings.MONGO_CONNECT_RETRY_DELAY_SECONDS
+    for attempt in range(1, attempts + 1):
+        try:
+            await db.client.admin.command("ping")
+            break
+        except PyMongoError as e:
+            if attempt == attempts:
+                db.client.close()
+                db.client = None
+                raise
+            print(f"⚠️ MongoDB ping failed (attempt {attempt}/{attempts}): {e}; retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            delay *= 2
+
     db.database = db.client[settings.DATABASE_NAME]
+    db.list_database = db.client.get_database(settings.DATABASE_NAME, read_preference=read_preference)
     print("✅ Connected to MongoDB")
 
 async def close_mongo_connection():
@@ -20,4 +77,10 @@ async def close_mongo_connection():
 def get_database():
     if db.database is None:
         raise RuntimeError("Database not initialized. Call connect_to_mongo() first.")
-    return db.database
\ No newline at end of file
+    return db.database
+
+def get_list_database():
+    """Database handle for list and dashboard reads, which may go to secondaries"""
+    if db.list_database is None:
+        raise RuntimeError("Database not initialized. Call connect_to_mongo() first.")
+    return db.list_database
@@ -1,8 +1,21 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import emails, prompts, dashboard, rewrite, summaries, autoreply
-from app.database import connect_to_mongo, close_mongo_connection
+from app.routes import emails, prompts, dashboard, rewrite, summaries, autoreply, jobs, drafts, threads
+from app.database import connect_to_mongo, close_mongo_connection, db
+from app.services.llm_cache import llm_cache
+from app.services.circuit_breaker import llm_circuit_breaker
+from app.services.metrics import http_request_duration, render_metrics, mongo_pool_monitor
+from app.services.near_duplicates import get_dedup_stats
+from app.services.index_manager import bootstrap_indexes
+from app.services.thread_service import ThreadService
+from app.services.llm_service import llm_executor, get_llm_service, init_llm_service
 from app.config import settings
+from app.services.prompt_service import PromptService
+from app.services.processing_service import ProcessingService
+import asyncio
+import os
+import time
 
 app = FastAPI(
     title="Email Productivity Agent API",
@@ -22,8 +35,27 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
+    expose_headers=["X-Next-Cursor"],  # Pagination cursor for list endpoints
 )
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Observe latency per route template (for streamed responses: time to first byte)"""
+    started_at = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        http_request_duration.observe(
+            time.perf_counter() - started_at,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=status
+        )
+
 # Include routers
 app.include_router(emails.router, prefix="/api/v1", tags=["emails"])
 app.include_router(prompts.router, prefix="/api/v1", tags=["prompts"])
@@ -31,15 +63,31 @@ app.include_router(dashboard.router, prefix="/api/v1", tags=["dashboard"])
 app.include_router(rewrite.router, prefix="/api/v1", tags=["rewrite"])
 app.include_router(summaries.router, prefix="/api/v1", tags=["summaries"]) 
 app.include_router(autoreply.router, prefix="/api/v1", tags=["autoreply"])  
+app.include_router(jobs.router, prefix="/api/v1", tags=["jobs"])
+app.include_router(drafts.router, prefix="/api/v1", tags=["drafts"])
+app.include_router(threads.router, prefix="/api/v1", tags=["threads"])
 
 @app.on_event("startup")
 async def startup_event():
     await connect_to_mongo()
+    await bootstrap_indexes()
+    await init_llm_service()
+    app.state.prompt_watcher = asyncio.create_task(PromptService().watch_changes())
+    if settings.PROCESSING_MODE == "inline":
+        # No separate workers: this process runs queued jobs, including any a previous one left unfinished
+        app.state.job_driver = asyncio.create_task(ProcessingService().drive_jobs(f"api-{os.getpid()}"))
+    # Emails stored before threading existed are grouped in the background
+    app.state.thread_backfill = asyncio.create_task(ThreadService().assign_unthreaded())
     print("🚀 Email Productivity Agent API Started")
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    app.state.prompt_watcher.cancel()
+    app.state.thread_backfill.cancel()
+    if hasattr(app.state, "job_driver"):
+        app.state.job_driver.cancel()
     await close_mongo_connection()
+    llm_executor.shutdown(wait=False, cancel_futures=True)
     print("👋 Email Productivity Agent API Stopped")
 
 @app.get("/")
@@ -52,7 +100,37 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": "2024-01-15T10:30:00Z"}
+    return {
+        # Degraded: the LLM circuit is open and responses come from rule-based fallbacks
+        "status": "degraded" if llm_circuit_breaker.is_open else "healthy",
+        "timestamp": "2024-01-15T10:30:00Z",
+        "llm": _llm_status(),
+        "llm_circuit": llm_circuit_breaker.status(),
+        "llm_cache": llm_cache.get_stats(),
+        "dedup": get_dedup_stats(),
+        "mongo_pool": {"max_pool_size": settings.MONGO_MAX_POOL_SIZE, "servers": mongo_pool_monitor.stats()}
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Route, LLM and MongoDB timings in the Prometheus text format"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/ready")
+async def readiness_check():
+    llm = _llm_status()
+    # Without an API key the app runs on fallbacks, so only a configured-but-cold model blocks readiness
+    ready = db.database is not None and (llm["ready"] or not llm["configured"])
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"ready": ready, "llm": llm}
+    )
+
+def _llm_status():
+    llm_service = get_llm_service()
+    if llm_service is None:
+        return {"configured": False, "ready": False}
+    return {"configured": True, **llm_service.status()}
 
 if __name__ == "__main__":
     import uvicorn
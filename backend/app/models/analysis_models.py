@@ -0,0 +1,61 @@
+from pydantic import BaseModel, field_validator
+from typing import List, Any
+
+SENTIMENTS = ("positive", "negative", "neutral", "urgent")
+
+def _clean_str_list(value: Any, limit: int) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list):
+        raise ValueError("Expected a list of strings")
+    items = []
+    for item in value:
+        if not isinstance(item, (str, int, float)):
+            continue
+        text = str(item).strip().strip('-•* ').strip()
+        if text and text not in items:
+            items.append(text)
+    return items[:limit]
+
+class EmailAnalysis(BaseModel):
+    """Structured result of the fused single-call email analysis"""
+    action_items: List[str] = []
+    auto_reply: str
+    summary: str
+    key_points: List[str] = []
+    sentiment: str = "neutral"
+    tags: List[str] = []
+    # Rule-based stand-in built when the AI call failed; not stored as AI output
+    fallback: bool = False
+
+    @field_validator("action_items", mode="before")
+    @classmethod
+    def validate_action_items(cls, v):
+        return _clean_str_list(v, 10)
+
+    @field_validator("key_points", mode="before")
+    @classmethod
+    def validate_key_points(cls, v):
+        return _clean_str_list(v, 5)
+
+    @field_validator("tags", mode="before")
+    @classmethod
+    def validate_tags(cls, v):
+        tags = _clean_str_list(v, 10)
+        return list(dict.fromkeys(tag.lower() for tag in tags))[:5]
+
+    @field_validator("auto_reply", "summary")
+    @classmethod
+    def validate_text(cls, v):
+        v = v.strip()
+        if not v:
+            raise ValueError("Field must not be empty")
+        return v
+
+    @field_validator("sentiment", mode="before")
+    @classmethod
+    def validate_sentiment(cls, v):
+        v = str(v or "").strip().lower()
+        return v if v in SENTIMENTS else "neutral"
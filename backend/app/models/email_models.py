@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr, Field, ConfigDict
+from pydantic import BaseModel, EmailStr, Field, ConfigDict, field_validator
 from typing import List, Optional, Dict, Any
-from datetime import datetime
+from datetime import datetime, timezone
 from enum import Enum
 from bson import ObjectId
 from pydantic_core import core_schema
@@ -23,9 +23,17 @@ class PyObjectId(ObjectId):
     def __get_pydantic_json_schema__(cls, field_schema):
         field_schema.update(type="string")
 
+def to_naive_utc(value: datetime) -> datetime:
+    """Naive UTC datetime, the form MongoDB returns stored datetimes in"""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
 class EmailStatus(str, Enum):
     UNREAD = "unread"
+    PROCESSING = "processing"
     PROCESSED = "processed"
+    FAILED = "failed"
     DRAFTED = "drafted"
     REPLIED = "replied"
 
@@ -35,6 +43,17 @@ class EmailBase(BaseModel):
     body: str
     timestamp: datetime
     status: EmailStatus = EmailStatus.UNREAD
+    recipients: List[EmailStr] = []
+    # RFC 5322 threading headers, when the source provides them
+    message_id: Optional[str] = None
+    in_reply_to: Optional[str] = None
+    references: List[str] = []
+
+    @field_validator("timestamp")
+    @classmethod
+    def validate_timestamp(cls, v: datetime) -> datetime:
+        # ISO input with "Z" or an offset is aware; keep it comparable with stored datetimes
+        return to_naive_utc(v)
 
 class EmailCreate(EmailBase):
     pass
@@ -44,9 +63,24 @@ class Email(EmailBase):
     action_items: List[str] = []
     processed_at: Optional[datetime] = None
     ai_summary: Optional[str] = None
+    key_points: List[str] = []
+    sentiment: Optional[str] = None
     priority: Optional[str] = None
     tags: List[str] = []
     metadata: Dict[str, Any] = {}
+    thread_id: Optional[str] = None
+    thread_summarized: bool = False
+    job_id: Optional[str] = None
+    claimed_by: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None
+    reprocess_lease_expires_at: Optional[datetime] = None
+    # Failed reprocess attempts for the prompt versions in reprocess_failed_key
+    reprocess_failures: int = 0
+    reprocess_failed_key: Optional[str] = None
+    simhash: Optional[int] = None
+    simhash_bands: List[str] = []
+    retry_count: int = 0
+    last_error: Optional[str] = None
 
     model_config = ConfigDict(
         populate_by_name=True,
@@ -0,0 +1,55 @@
+from pydantic import BaseModel, Field, ConfigDict
+from typing import List, Optional
+from datetime import datetime
+from enum import Enum
+from bson import ObjectId
+from pydantic_core import core_schema
+
+class PyObjectId(ObjectId):
+    @classmethod
+    def __get_pydantic_core_schema__(cls, _source_type, _handler):
+        return core_schema.chain_schema([
+            core_schema.str_schema(),
+            core_schema.no_info_plain_validator_function(cls.validate),
+        ])
+
+    @classmethod
+    def validate(cls, v):
+        if not ObjectId.is_valid(v):
+            raise ValueError("Invalid ObjectId")
+        return ObjectId(v)
+
+    @classmethod
+    def __get_pydantic_json_schema__(cls, field_schema):
+        field_schema.update(type="string")
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+
+class EmailOutcome(BaseModel):
+    email_id: str
+    status: str  # "processed", "failed"
+    error: Optional[str] = None
+    worker_id: Optional[str] = None
+    finished_at: datetime
+
+class Job(BaseModel):
+    id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
+    kind: str = "process"
+    status: JobStatus = JobStatus.QUEUED
+    total: Optional[int] = None  # None until the job's emails have been assigned
+    processed: int = 0
+    failed: int = 0
+    outcomes: List[EmailOutcome] = []
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    model_config = ConfigDict(
+        populate_by_name=True,
+        arbitrary_types_allowed=True,
+        json_encoders={ObjectId: str}
+    )
@@ -3,6 +3,8 @@ from bson import ObjectId
 from typing import Dict
 from pydantic_core import core_schema
 
+PROMPT_TYPES = ["action_items", "auto_reply"]
+
 class PyObjectId(ObjectId):
     @classmethod
     def __get_pydantic_core_schema__(cls, _source_type, _handler):
@@ -25,6 +27,8 @@ class PromptConfig(BaseModel):
     id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
     action_items: str
     auto_reply: str
+    version: int = 0
+    versions: Dict[str, int] = {}  # per prompt type, bumped only when that prompt changes
 
     model_config = ConfigDict(
         populate_by_name=True,
@@ -32,6 +36,10 @@ class PromptConfig(BaseModel):
         json_encoders={ObjectId: str}
     )
 
+    def stage_versions(self) -> Dict[str, int]:
+        """Version of each prompt type, as recorded on processed emails"""
+        return {prompt_type: self.versions.get(prompt_type, 0) for prompt_type in PROMPT_TYPES}
+
 class PromptUpdate(BaseModel):
     prompt_type: str  # "action_items", "auto_reply"
     content: str
\ No newline at end of file
@@ -0,0 +1,45 @@
+from pydantic import BaseModel, Field, ConfigDict
+from typing import List, Optional
+from datetime import datetime
+from bson import ObjectId
+from pydantic_core import core_schema
+
+class PyObjectId(ObjectId):
+    @classmethod
+    def __get_pydantic_core_schema__(cls, _source_type, _handler):
+        return core_schema.chain_schema([
+            core_schema.str_schema(),
+            core_schema.no_info_plain_validator_function(cls.validate),
+        ])
+
+    @classmethod
+    def validate(cls, v):
+        if not ObjectId.is_valid(v):
+            raise ValueError("Invalid ObjectId")
+        return ObjectId(v)
+
+    @classmethod
+    def __get_pydantic_json_schema__(cls, field_schema):
+        field_schema.update(type="string")
+
+class Thread(BaseModel):
+    id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
+    subject: str  # subject of the first message
+    normalized_subject: str
+    participants: List[str] = []
+    message_ids: List[str] = []  # RFC Message-IDs seen in the thread
+    referenced_ids: List[str] = []  # Message-IDs its messages reply to or reference
+    message_count: int = 0
+    first_at: datetime
+    last_at: datetime
+    # Rolling summary, extended with only the messages added since the last update
+    summary: Optional[str] = None
+    key_points: List[str] = []
+    summarized_count: int = 0  # messages folded in (flagged thread_summarized on the email)
+    summary_updated_at: Optional[datetime] = None
+
+    model_config = ConfigDict(
+        populate_by_name=True,
+        arbitrary_types_allowed=True,
+        json_encoders={ObjectId: str}
+    )
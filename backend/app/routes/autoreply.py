@@ -5,8 +5,8 @@ from pydantic import BaseModel
 from datetime import datetime
 from app.services.email_service import EmailService
 from app.services.processing_service import ProcessingService
-import google.generativeai as genai
-from app.config import settings
+from app.services.llm_service import LLMService, get_llm_service
+from app.utils.sse import text_events, sse_response
 
 router = APIRouter()
 
@@ -134,20 +134,48 @@ async def update_autoreply_settings(
 @router.post("/autoreply/generate")
 async def generate_ai_reply(
     request: GenerateReplyRequest,
-    processing_service: ProcessingService = Depends(get_processing_service)
+    llm_service: Optional[LLMService] = Depends(get_llm_service)
 ):
     """
     Generate an AI-powered auto-reply based on email content
     """
     try:
-        api_key = getattr(settings, 'GEMINI_API_KEY', None) or getattr(settings, 'GOOGLE_API_KEY', None)
-        if not api_key:
+        if llm_service is None:
             return {"reply": request.current_template, "ai_generated": False}
         
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-pro')
+        prompt = build_personalized_reply_prompt(request)
+        ai_reply = await llm_service.generate_text("generate_ai_reply", prompt)
         
-        prompt = f"""
+        return {
+            "reply": ai_reply,
+            "ai_generated": True,
+            "message": "AI-generated reply created successfully"
+        }
+        
+    except Exception as e:
+        print(f"Error generating AI reply: {str(e)}")
+        return {
+            "reply": request.current_template,
+            "ai_generated": False,
+            "message": "Using default template due to AI service error"
+        }
+
+@router.post("/autoreply/generate/stream")
+async def generate_ai_reply_stream(
+    request: GenerateReplyRequest,
+    llm_service: Optional[LLMService] = Depends(get_llm_service)
+):
+    """
+    Stream a personalized auto-reply as Server-Sent Events (`delta` chunks, then `done`)
+    """
+    chunks = None
+    if llm_service is not None:
+        chunks = llm_service.stream_text("generate_ai_reply", build_personalized_reply_prompt(request))
+    
+    return sse_response(text_events(chunks, fallback=lambda: request.current_template))
+
+def build_personalized_reply_prompt(request: GenerateReplyRequest) -> str:
+    return f"""
         Based on the incoming email content and the default template, generate a personalized auto-reply.
         
         INCOMING EMAIL:
@@ -164,28 +192,11 @@ async def generate_ai_reply(
         
         Personalized Auto-Reply:
         """
-        
-        response = model.generate_content(prompt)
-        ai_reply = response.text.strip()
-        
-        return {
-            "reply": ai_reply,
-            "ai_generated": True,
-            "message": "AI-generated reply created successfully"
-        }
-        
-    except Exception as e:
-        print(f"Error generating AI reply: {str(e)}")
-        return {
-            "reply": request.current_template,
-            "ai_generated": False,
-            "message": "Using default template due to AI service error"
-        }
 
 @router.post("/autoreply/test")
 async def test_autoreply(
     request: TestEmailRequest,
-    processing_service: ProcessingService = Depends(get_processing_service)
+    llm_service: Optional[LLMService] = Depends(get_llm_service)
 ):
     """
     Test auto-reply functionality with a sample email
@@ -195,8 +206,7 @@ async def test_autoreply(
         test_template = "Thank you for your email. I've received your message and will respond within 24 hours. For urgent matters, please contact our support team directly."
         
         # Use the generate_ai_reply function
-        api_key = getattr(settings, 'GEMINI_API_KEY', None) or getattr(settings, 'GOOGLE_API_KEY', None)
-        if not api_key:
+        if llm_service is None:
             return {
                 "test_email": request.test_email,
                 "generated_reply": test_template,
@@ -204,9 +214,6 @@ async def test_autoreply(
                 "timestamp": datetime.now().isoformat()
             }
         
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-pro')
-        
         prompt = f"""
         Based on the incoming email content, generate a professional auto-reply.
         
@@ -222,8 +229,7 @@ async def test_autoreply(
         Auto-Reply:
         """
         
-        response = model.generate_content(prompt)
-        ai_reply = response.text.strip()
+        ai_reply = await llm_service.generate_text("test_autoreply", prompt)
         
         return {
             "test_email": request.test_email,
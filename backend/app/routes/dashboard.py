@@ -1,25 +1,42 @@
+import time
 from fastapi import APIRouter, Depends
 from app.services.email_service import EmailService
 from app.schemas.dashboard_schemas import DashboardMetrics
+from app.models.email_models import EmailStatus
+from app.config import settings
 
 router = APIRouter()
 
+# Short-lived snapshot shared by the constantly polling dashboard clients
+_metrics_snapshot = {"metrics": None, "expires_at": 0.0}
+
 def get_email_service():
     return EmailService()
 
 @router.get("/dashboard/metrics", response_model=DashboardMetrics)
-async def get_dashboard_metrics(email_service: EmailService = Depends(get_email_service)):
+async def get_dashboard_metrics(
+    fresh: bool = False,
+    email_service: EmailService = Depends(get_email_service)
+):
     """Get dashboard metrics"""
-    emails = await email_service.get_emails()
-    processed_count = len([e for e in emails if e.status.value == "processed"])
+    if not fresh and _metrics_snapshot["metrics"] and _metrics_snapshot["expires_at"] > time.monotonic():
+        return _metrics_snapshot["metrics"]
     
-    # Calculate metrics
-    total_emails = len(emails)
-    auto_reply_count = len([e for e in emails if e.metadata and e.metadata.get("auto_reply_generated")])
+    stats = await email_service.get_dashboard_stats()
+    processed_count = stats["status_counts"].get(EmailStatus.PROCESSED.value, 0)
     
-    return DashboardMetrics(
+    metrics = DashboardMetrics(
         emails_processed=processed_count,
         time_saved_minutes=processed_count * 5,  # 5 minutes per email
-        auto_replies_sent=auto_reply_count,
-        productivity_score=min(processed_count * 20, 100)  # Cap at 100
-    )
\ No newline at end of file
+        auto_replies_sent=stats["auto_reply_count"],
+        productivity_score=min(processed_count * 20, 100),  # Cap at 100
+        total_emails=stats["total"],
+        status_counts=stats["status_counts"],
+        priority_counts=stats["priority_counts"],
+        tag_counts=stats["tag_counts"]
+    )
+    
+    if settings.DASHBOARD_CACHE_TTL_SECONDS > 0:
+        _metrics_snapshot["metrics"] = metrics
+        _metrics_snapshot["expires_at"] = time.monotonic() + settings.DASHBOARD_CACHE_TTL_SECONDS
+    return metrics
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends
+from typing import Optional
+from app.models.draft_models import DraftCreate
+from app.services.llm_service import LLMService, get_llm_service, DRAFT_FOLLOW_UPS
+from app.utils.sse import text_events, sse_response
+
+router = APIRouter()
+
+@router.post("/draft/stream")
+async def draft_email_stream(
+    draft: DraftCreate,
+    llm_service: Optional[LLMService] = Depends(get_llm_service)
+):
+    """
+    Stream an AI-drafted email body as Server-Sent Events (`delta` chunks, then `done`)
+    """
+    chunks = None
+    if llm_service is not None:
+        chunks = llm_service.stream_draft_email(draft.context, draft.recipient, draft.subject)
+    
+    def fallback() -> str:
+        return LLMService._get_mock_draft(draft.context, draft.recipient, draft.subject)["body"]
+    
+    return sse_response(text_events(
+        chunks,
+        fallback=fallback,
+        done_fields={"suggested_follow_ups": DRAFT_FOLLOW_UPS}
+    ))
@@ -1,8 +1,18 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends
-from typing import List
-from app.services.email_service import EmailService
-from app.services.processing_service import ProcessingService
-from app.schemas.email_schemas import EmailResponse, EmailListResponse, ProcessEmailsResponse
+from fastapi import APIRouter, HTTPException, Depends, Request, Response, Query
+from fastapi.responses import JSONResponse
+from typing import List, Dict, Any, Optional, Union, Literal
+from datetime import datetime
+from app.services.email_service import EmailService, COMPACT_PROJECTION
+from app.services.processing_service import ProcessingService, notify_job_queued
+from app.services.job_service import JobService
+from app.services.search_service import SearchService
+from app.services.metrics import timed, model_build_duration
+from app.config import settings
+from app.models.email_models import EmailStatus
+from app.schemas.email_schemas import (
+    EmailResponse, EmailListItem, EmailListResponse, EmailCompactListResponse,
+    ProcessEmailsResponse, BulkIngestResponse, EmailSearchHit, EmailSearchResponse
+)
 import asyncio
 
 router = APIRouter()
@@ -14,56 +24,222 @@ def get_email_service():
 def get_processing_service():
     return ProcessingService()
 
-@router.get("/emails", response_model=EmailListResponse)
-async def get_emails(email_service: EmailService = Depends(get_email_service)):
-    """Get all emails"""
-    emails = await email_service.get_emails()
-    processed_count = len([e for e in emails if e.status.value == "processed"])
+def get_job_service():
+    return JobService()
+
+def get_search_service():
+    return SearchService()
+
+class EmailFilters:
+    """Common filter query parameters for email listings"""
+    def __init__(
+        self,
+        status: Optional[EmailStatus] = None,
+        priority: Optional[str] = None,
+        tag: Optional[str] = None,
+        sender: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None
+    ):
+        self.values = {
+            "status": status,
+            "priority": priority,
+            "tag": tag,
+            "sender": sender,
+            "date_from": date_from,
+            "date_to": date_to
+        }
+
+# The models are built with model_construct from trusted documents and serialized
+# directly; a response_model would validate every item again (against both Union members)
+@router.get(
+    "/emails",
+    response_model=None,
+    responses={200: {"model": Union[EmailListResponse, EmailCompactListResponse]}}
+)
+async def get_emails(
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    view: Literal["full", "compact"] = "full",
+    filters: EmailFilters = Depends(),
+    email_service: EmailService = Depends(get_email_service)
+):
+    """Get a page of emails, newest first; pass next_cursor back to fetch the next page.
     
-    # Convert Email models to EmailResponse schemas
-    email_responses = [EmailResponse.from_email_model(email) for email in emails]
+    view=compact returns headers and a snippet only; load the body via /emails/{id}.
+    """
+    projection = COMPACT_PROJECTION if view == "compact" else None
+    try:
+        documents, next_cursor = await email_service.get_email_documents_page(
+            limit=limit, cursor=cursor, projection=projection, for_listing=True, **filters.values
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    total = await email_service.count_emails(for_listing=True, **filters.values)
+    if filters.values["status"] in (None, EmailStatus.PROCESSED):
+        processed_count = await email_service.count_emails(
+            for_listing=True, **{**filters.values, "status": EmailStatus.PROCESSED}
+        )
+    else:
+        processed_count = 0
+    
+    if view == "compact":
+        with timed(model_build_duration, model="EmailListItem"):
+            items = [EmailListItem.from_document(doc) for doc in documents]
+        page = EmailCompactListResponse.model_construct(
+            emails=items,
+            total=total,
+            processed_count=processed_count,
+            next_cursor=next_cursor
+        )
+        return JSONResponse(page.model_dump(mode="json"))
     
-    return EmailListResponse(
-        emails=email_responses,
-        total=len(emails),
-        processed_count=processed_count
+    with timed(model_build_duration, model="EmailResponse"):
+        emails = [EmailResponse.from_document(doc) for doc in documents]
+    page = EmailListResponse.model_construct(
+        emails=emails,
+        total=total,
+        processed_count=processed_count,
+        next_cursor=next_cursor
     )
+    return JSONResponse(page.model_dump(mode="json"))
 
 @router.post("/emails/load-mock")
 async def load_mock_emails(email_service: EmailService = Depends(get_email_service)):
     """Load mock emails into database"""
-    emails = await email_service.load_mock_emails()
+    count = await email_service.load_mock_emails()
     return {
-        "message": f"Loaded {len(emails)} mock emails",
-        "count": len(emails)
+        "message": f"Loaded {count} mock emails",
+        "count": count
     }
 
+# Errors carry either "index" or "line"; the unused one is left out of the JSON
+@router.post("/emails/bulk", response_model=BulkIngestResponse, response_model_exclude_none=True)
+async def bulk_ingest_emails(
+    emails: List[Dict[str, Any]],
+    email_service: EmailService = Depends(get_email_service)
+):
+    """Insert many emails at once; invalid or rejected items are reported, not fatal"""
+    result = await email_service.bulk_insert_emails(emails)
+    return BulkIngestResponse(
+        message=f"Inserted {result['inserted']} emails",
+        **result
+    )
+
+@router.post("/emails/bulk/ndjson", response_model=BulkIngestResponse, response_model_exclude_none=True)
+async def bulk_ingest_ndjson(
+    request: Request,
+    email_service: EmailService = Depends(get_email_service)
+):
+    """Stream a newline-delimited JSON mailbox export (one email per line)"""
+    result = await email_service.ingest_ndjson(request.stream())
+    return BulkIngestResponse(
+        message=f"Inserted {result['inserted']} emails",
+        **result
+    )
+
 @router.post("/emails/process", response_model=ProcessEmailsResponse)
 async def process_emails(
-    background_tasks: BackgroundTasks,
     email_service: EmailService = Depends(get_email_service),
-    processing_service: ProcessingService = Depends(get_processing_service)
+    processing_service: ProcessingService = Depends(get_processing_service),
+    job_service: JobService = Depends(get_job_service)
 ):
-    """Start email processing pipeline"""
-    emails = await email_service.get_emails()
-    unprocessed_emails = [email for email in emails if email.status.value != "processed"]
+    """Queue a processing job for every unprocessed email; track it via /jobs/{processing_id}"""
+    await processing_service.reap_expired_leases()
+    # No total yet: a worker finishing emails before set_total cannot complete the job early
+    job = await job_service.create_job()
+    job_id = str(job.id)
+    count = await email_service.assign_unprocessed_to_job(job_id)
     
-    if not unprocessed_emails:
+    if not count:
+        await job_service.delete_job(job_id)
         raise HTTPException(status_code=400, detail="No unprocessed emails found")
+    await job_service.set_total(job_id, count)
     
-    # Process in background
-    background_tasks.add_task(processing_service.process_email_batch, unprocessed_emails)
+    if settings.PROCESSING_MODE == "inline":
+        # No separate workers deployed: the in-process job driver starts on it now
+        notify_job_queued()
+        message = "Email processing started in background"
+    else:
+        message = "Email processing queued for workers"
     
     return ProcessEmailsResponse(
-        message="Email processing started in background",
-        count=len(unprocessed_emails),
-        processing_id="process_1"
+        message=message,
+        count=count,
+        processing_id=job_id
+    )
+
+@router.post("/emails/reprocess", response_model=ProcessEmailsResponse)
+async def reprocess_emails(
+    email_service: EmailService = Depends(get_email_service),
+    processing_service: ProcessingService = Depends(get_processing_service),
+    job_service: JobService = Depends(get_job_service)
+):
+    """Refresh processed emails whose prompt changed, rerunning only the affected stage (newest first)"""
+    active = await job_service.find_active_job(kind="reprocess")
+    if active:
+        return ProcessEmailsResponse(
+            message="Reprocessing already in progress",
+            count=active.total,
+            processing_id=str(active.id)
+        )
+    
+    prompts = await processing_service.prompt_service.get_prompts()
+    count = await email_service.count_stale_emails(prompts.stage_versions(), claimable=True)
+    if not count:
+        raise HTTPException(status_code=400, detail="No emails with outdated prompt results found")
+    job = await job_service.create_job(total=count, kind="reprocess")
+    job_id = str(job.id)
+    
+    if settings.PROCESSING_MODE == "inline":
+        notify_job_queued()
+        message = "Email reprocessing started in background"
+    else:
+        message = "Email reprocessing queued for workers"
+    
+    return ProcessEmailsResponse(
+        message=message,
+        count=count,
+        processing_id=job_id
+    )
+
+@router.get("/emails/search", response_model=EmailSearchResponse)
+async def search_emails(
+    q: str = Query(..., min_length=1, max_length=500),
+    mode: Literal["keyword", "semantic", "hybrid"] = "hybrid",
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=1000),
+    filters: EmailFilters = Depends(),
+    search_service: SearchService = Depends(get_search_service)
+):
+    """Ranked search over subject, body, sender and action items.
+    
+    keyword uses the Mongo text index, semantic the local embedding index, and
+    hybrid (default) fuses both. Pass next_offset back as offset for the next page.
+    """
+    results, has_more = await search_service.search(q, mode=mode, limit=limit, offset=offset, **filters.values)
+    return EmailSearchResponse(
+        results=[EmailSearchHit.from_ranked(doc, score) for doc, score in results],
+        query=q,
+        mode=mode,
+        next_offset=offset + limit if has_more else None
     )
 
 @router.get("/emails/processed", response_model=List[EmailResponse])
-async def get_processed_emails(email_service: EmailService = Depends(get_email_service)):
-    """Get processed emails with AI insights"""
-    emails = await email_service.get_processed_emails()
+async def get_processed_emails(
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    email_service: EmailService = Depends(get_email_service)
+):
+    """Get processed emails with AI insights; the next page cursor is sent in X-Next-Cursor"""
+    try:
+        emails, next_cursor = await email_service.get_processed_emails(limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     # Convert Email models to EmailResponse schemas
     return [EmailResponse.from_email_model(email) for email in emails]
 
@@ -0,0 +1,16 @@
+from fastapi import APIRouter, HTTPException, Depends
+from app.services.job_service import JobService
+from app.schemas.job_schemas import JobResponse
+
+router = APIRouter()
+
+def get_job_service():
+    return JobService()
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str, job_service: JobService = Depends(get_job_service)):
+    """Get processing job progress and per-email outcomes"""
+    job = await job_service.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JobResponse.from_job_model(job)
@@ -1,15 +1,11 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
+from typing import Optional
 from pydantic import BaseModel
-import google.generativeai as genai
-from app.config import settings
-import os
+from app.services.llm_service import LLMService, get_llm_service
+from app.utils.sse import text_events, sse_response
 
 router = APIRouter()
 
-# Configure Gemini
-if settings.GOOGLE_API_KEY:
-    genai.configure(api_key=settings.GOOGLE_API_KEY)
-
 class RewriteRequest(BaseModel):
     email: str
     tone: str
@@ -20,12 +16,15 @@ class RewriteResponse(BaseModel):
     success: bool
 
 @router.post("/rewrite-email", response_model=RewriteResponse)
-async def rewrite_email(request: RewriteRequest):
+async def rewrite_email(
+    request: RewriteRequest,
+    llm_service: Optional[LLMService] = Depends(get_llm_service)
+):
     """
     Rewrite an email in the specified tone using Gemini AI
     """
     try:
-        if not settings.GOOGLE_API_KEY:
+        if llm_service is None:
             # Fallback if no API key is configured
             rewritten_email = fallback_rewrite(request.email, request.tone)
             return RewriteResponse(
@@ -34,10 +33,49 @@ async def rewrite_email(request: RewriteRequest):
                 success=True
             )
         
-        # Use Gemini AI for rewriting
-        model = genai.GenerativeModel('gemini-2.5-flash')
+        prompt = build_rewrite_prompt(request)
+        rewritten_email = await llm_service.generate_text("rewrite_email", prompt)
+        
+        # Clean up any potential quotes or formatting artifacts
+        rewritten_email = cleaned_response(rewritten_email)
         
-        prompt = f"""
+        return RewriteResponse(
+            rewritten_email=rewritten_email,
+            tone=request.tone,
+            success=True
+        )
+        
+    except Exception as e:
+        print(f"Error rewriting email: {str(e)}")
+        # Fallback to simple rewrite
+        rewritten_email = fallback_rewrite(request.email, request.tone)
+        return RewriteResponse(
+            rewritten_email=rewritten_email,
+            tone=request.tone,
+            success=False
+        )
+
+@router.post("/rewrite-email/stream")
+async def rewrite_email_stream(
+    request: RewriteRequest,
+    llm_service: Optional[LLMService] = Depends(get_llm_service)
+):
+    """
+    Stream the rewritten email as Server-Sent Events (`delta` chunks, then `done`)
+    """
+    chunks = None
+    if llm_service is not None:
+        chunks = llm_service.stream_text("rewrite_email", build_rewrite_prompt(request))
+    
+    return sse_response(text_events(
+        chunks,
+        fallback=lambda: fallback_rewrite(request.email, request.tone),
+        cleaner=IncrementalCleaner(),
+        done_fields={"tone": request.tone}
+    ))
+
+def build_rewrite_prompt(request: RewriteRequest) -> str:
+    return f"""
         TASK: Completely rewrite the following email in a {request.tone.lower()} tone. 
         
         IMPORTANT INSTRUCTIONS:
@@ -58,28 +96,6 @@ async def rewrite_email(request: RewriteRequest):
         
         Your completely rewritten version in {request.tone} tone:
         """
-        
-        response = model.generate_content(prompt)
-        rewritten_email = response.text.strip()
-        
-        # Clean up any potential quotes or formatting artifacts
-        rewritten_email = cleaned_response(rewritten_email)
-        
-        return RewriteResponse(
-            rewritten_email=rewritten_email,
-            tone=request.tone,
-            success=True
-        )
-        
-    except Exception as e:
-        print(f"Error rewriting email: {str(e)}")
-        # Fallback to simple rewrite
-        rewritten_email = fallback_rewrite(request.email, request.tone)
-        return RewriteResponse(
-            rewritten_email=rewritten_email,
-            tone=request.tone,
-            success=False
-        )
 
 def get_tone_guidelines(tone: str) -> str:
     """
@@ -142,6 +158,14 @@ def get_tone_guidelines(tone: str) -> str:
     }
     return guidelines.get(tone, guidelines['Professional'])
 
+REMOVE_PHRASES = [
+    "Here is the rewritten email:",
+    "Rewritten email:",
+    "Here's the email rewritten in",
+    "Certainly! Here's the email rewritten",
+    "Of course! Here is the email"
+]
+
 def cleaned_response(text: str) -> str:
     """
     Clean up the AI response by removing common artifacts
@@ -150,20 +174,52 @@ def cleaned_response(text: str) -> str:
     text = text.strip('"\'')
     
     # Remove any introductory phrases the AI might add
-    remove_phrases = [
-        "Here is the rewritten email:",
-        "Rewritten email:",
-        "Here's the email rewritten in",
-        "Certainly! Here's the email rewritten",
-        "Of course! Here is the email"
-    ]
-    
-    for phrase in remove_phrases:
+    for phrase in REMOVE_PHRASES:
         if text.startswith(phrase):
             text = text[len(phrase):].strip()
     
     return text
 
+class IncrementalCleaner:
+    """
+    Streaming counterpart of cleaned_response: buffers the start of the
+    response until intro phrases and quotes can be removed, and holds back
+    trailing quotes/whitespace until more text shows they are not the end
+    """
+    HEAD_SIZE = max(len(phrase) for phrase in REMOVE_PHRASES) + 8
+    TRAILING = '"\' \t\r\n'
+
+    def __init__(self):
+        self._head = ""
+        self._started = False
+        self._held = ""
+
+    def feed(self, chunk: str) -> str:
+        if not self._started:
+            self._head += chunk
+            if len(self._head) < self.HEAD_SIZE:
+                return ""
+            self._started = True
+            chunk = self._clean_head(self._head)
+        
+        text = self._held + chunk
+        emitted = text.rstrip(self.TRAILING)
+        self._held = text[len(emitted):]
+        return emitted
+
+    def finish(self) -> str:
+        if not self._started:
+            # Short response: everything is still buffered, clean it in one go
+            return cleaned_response(self._head.strip())
+        return ""
+
+    def _clean_head(self, text: str) -> str:
+        text = text.lstrip().lstrip('"\'')
+        for phrase in REMOVE_PHRASES:
+            if text.startswith(phrase):
+                text = text[len(phrase):].lstrip()
+        return text
+
 def fallback_rewrite(email: str, tone: str) -> str:
     """
     Simple fallback rewrite function when Gemini is not available
@@ -1,6 +1,6 @@
 import json
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Response, Query
+from typing import List, Optional
 from pydantic import BaseModel
 from app.services.email_service import EmailService
 from app.services.processing_service import ProcessingService
@@ -28,6 +28,9 @@ def get_processing_service():
 
 @router.get("/summaries", response_model=List[SummaryResponse])
 async def get_email_summaries(
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
     email_service: EmailService = Depends(get_email_service),
     processing_service: ProcessingService = Depends(get_processing_service)
 ):
@@ -36,23 +39,15 @@ async def get_email_summaries(
     """
     try:
         # Get processed emails
-        processed_emails = await email_service.get_processed_emails()
+        processed_emails, next_cursor = await email_service.get_processed_emails(limit=limit, cursor=cursor)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        
+        # Stored summaries are served as-is; missing ones are generated concurrently
+        summaries_data = await processing_service.get_or_create_summaries(processed_emails)
         
         summaries = []
-        for email in processed_emails:
-            # Generate summary if not already generated
-            if not hasattr(email, 'summary') or not email.summary:
-                # Use processing service to generate summary
-                summary_data = await processing_service.generate_summary(email)
-            else:
-                summary_data = {
-                    'summary': getattr(email, 'summary', ''),
-                    'key_points': getattr(email, 'key_points', []),
-                    'action_items': getattr(email, 'action_items', []),
-                    'sentiment': getattr(email, 'sentiment', 'neutral'),
-                    'tags': getattr(email, 'tags', [])
-                }
-            
+        for email, summary_data in zip(processed_emails, summaries_data):
             summary_response = SummaryResponse(
                 id=str(email.id),
                 subject=email.subject,
@@ -69,6 +64,8 @@ async def get_email_summaries(
         
         return summaries
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"Error getting summaries: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to retrieve email summaries")
@@ -87,17 +84,8 @@ async def get_email_summary(
         if not email:
             raise HTTPException(status_code=404, detail="Email not found")
         
-        # Generate or retrieve summary
-        if not hasattr(email, 'summary') or not email.summary:
-            summary_data = await processing_service.generate_summary(email)
-        else:
-            summary_data = {
-                'summary': getattr(email, 'summary', ''),
-                'key_points': getattr(email, 'key_points', []),
-                'action_items': getattr(email, 'action_items', []),
-                'sentiment': getattr(email, 'sentiment', 'neutral'),
-                'tags': getattr(email, 'tags', [])
-            }
+        # Retrieve stored summary or generate and persist it
+        summary_data = await processing_service.get_or_create_summary(email)
         
         return {
             "email": {
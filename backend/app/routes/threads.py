@@ -0,0 +1,63 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Optional
+from app.services.thread_service import ThreadService
+from app.services.email_service import COMPACT_PROJECTION
+from app.schemas.email_schemas import EmailListItem
+from app.schemas.thread_schemas import (
+    ThreadResponse, ThreadListResponse, ThreadDetailResponse, ThreadSummaryResponse
+)
+
+router = APIRouter()
+
+def get_thread_service():
+    return ThreadService()
+
+@router.get("/threads", response_model=ThreadListResponse)
+async def get_threads(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    participant: Optional[str] = None,
+    thread_service: ThreadService = Depends(get_thread_service)
+):
+    """Get a page of conversations, most recently active first; pass next_cursor back for the next page"""
+    try:
+        threads, next_cursor = await thread_service.get_threads_page(
+            limit=limit, cursor=cursor, participant=participant
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ThreadListResponse(
+        threads=[ThreadResponse.from_thread_model(thread) for thread in threads],
+        next_cursor=next_cursor
+    )
+
+@router.get("/threads/{thread_id}", response_model=ThreadDetailResponse)
+async def get_thread(
+    thread_id: str,
+    limit: int = Query(200, ge=1, le=1000),
+    thread_service: ThreadService = Depends(get_thread_service)
+):
+    """Get a conversation with its messages (headers and snippets) in chronological order"""
+    thread = await thread_service.get_thread(thread_id)
+    if not thread:
+        raise HTTPException(status_code=404, detail="Thread not found")
+    messages = await thread_service.get_thread_messages(thread_id, limit=limit, projection=COMPACT_PROJECTION)
+    return ThreadDetailResponse(
+        **ThreadResponse.from_thread_model(thread).model_dump(),
+        messages=[EmailListItem.from_document(doc) for doc in messages]
+    )
+
+@router.get("/threads/{thread_id}/summary", response_model=ThreadSummaryResponse)
+async def get_thread_summary(thread_id: str, thread_service: ThreadService = Depends(get_thread_service)):
+    """Get the rolling conversation summary, first folding in any messages added since the last update"""
+    thread = await thread_service.get_thread(thread_id)
+    if not thread:
+        raise HTTPException(status_code=404, detail="Thread not found")
+    result = await thread_service.get_or_update_summary(thread)
+    return ThreadSummaryResponse(
+        thread_id=thread_id,
+        summary=result["summary"],
+        key_points=result["key_points"],
+        message_count=thread.message_count,
+        fallback=result.get("fallback", False)
+    )
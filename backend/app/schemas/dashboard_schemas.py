@@ -1,7 +1,12 @@
 from pydantic import BaseModel
+from typing import Dict
 
 class DashboardMetrics(BaseModel):
     emails_processed: int
     time_saved_minutes: int
     auto_replies_sent: int
-    productivity_score: int
\ No newline at end of file
+    productivity_score: int
+    total_emails: int = 0
+    status_counts: Dict[str, int] = {}
+    priority_counts: Dict[str, int] = {}
+    tag_counts: Dict[str, int] = {}
\ No newline at end of file
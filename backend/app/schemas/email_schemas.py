@@ -13,6 +13,8 @@ class EmailResponse(BaseModel):
     action_items: List[str]
     processed_at: Optional[datetime] = None
     ai_summary: Optional[str] = None
+    key_points: List[str] = []
+    sentiment: Optional[str] = None
     priority: Optional[str] = None
     tags: List[str]
 
@@ -29,16 +31,98 @@ class EmailResponse(BaseModel):
             action_items=email.action_items,
             processed_at=email.processed_at,
             ai_summary=email.ai_summary,
+            key_points=email.key_points,
+            sentiment=email.sentiment,
             priority=email.priority,
             tags=email.tags
         )
 
+    @classmethod
+    def from_document(cls, doc: dict):
+        """Build directly from a trusted Mongo document, skipping the Email model"""
+        return cls.model_construct(
+            id=str(doc["_id"]),
+            sender=doc["sender"],
+            subject=doc["subject"],
+            body=doc["body"],
+            timestamp=doc["timestamp"],
+            status=EmailStatus(doc.get("status", EmailStatus.UNREAD)),
+            action_items=doc.get("action_items", []),
+            processed_at=doc.get("processed_at"),
+            ai_summary=doc.get("ai_summary"),
+            key_points=doc.get("key_points", []),
+            sentiment=doc.get("sentiment"),
+            priority=doc.get("priority"),
+            tags=doc.get("tags", [])
+        )
+
+class EmailListItem(BaseModel):
+    """Lightweight list entry: headers and a body snippet, no full body"""
+    id: str
+    sender: str
+    subject: str
+    snippet: str
+    timestamp: datetime
+    status: EmailStatus
+    processed_at: Optional[datetime] = None
+    priority: Optional[str] = None
+    tags: List[str] = []
+
+    @classmethod
+    def from_document(cls, doc: dict):
+        """Build from a document fetched with the compact projection"""
+        return cls.model_construct(
+            id=str(doc["_id"]),
+            sender=doc["sender"],
+            subject=doc["subject"],
+            snippet=doc.get("snippet", ""),
+            timestamp=doc["timestamp"],
+            status=EmailStatus(doc.get("status", EmailStatus.UNREAD)),
+            processed_at=doc.get("processed_at"),
+            priority=doc.get("priority"),
+            tags=doc.get("tags", [])
+        )
+
+class EmailSearchHit(EmailListItem):
+    score: float
+
+    @classmethod
+    def from_ranked(cls, doc: dict, score: float):
+        return cls.model_construct(**EmailListItem.from_document(doc).model_dump(), score=score)
+
+class EmailSearchResponse(BaseModel):
+    results: List[EmailSearchHit]
+    query: str
+    mode: str
+    next_offset: Optional[int] = None
+
 class EmailListResponse(BaseModel):
     emails: List[EmailResponse]
     total: int
     processed_count: int
+    next_cursor: Optional[str] = None
+
+class EmailCompactListResponse(BaseModel):
+    emails: List[EmailListItem]
+    total: int
+    processed_count: int
+    next_cursor: Optional[str] = None
 
 class ProcessEmailsResponse(BaseModel):
     message: str
     count: int
-    processing_id: str
\ No newline at end of file
+    processing_id: str
+
+class BulkIngestError(BaseModel):
+    # 0-based position in a JSON array, or 1-based line number in an NDJSON upload
+    index: Optional[int] = None
+    line: Optional[int] = None
+    error: str
+
+class BulkIngestResponse(BaseModel):
+    message: str
+    inserted: int
+    failed: int
+    # Capped; inserted/failed count every item
+    ids: List[str] = []
+    errors: List[BulkIngestError] = []
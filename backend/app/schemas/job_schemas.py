@@ -0,0 +1,37 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+from app.models.job_models import JobStatus, EmailOutcome
+
+class JobResponse(BaseModel):
+    id: str
+    kind: str
+    status: JobStatus
+    total: int
+    processed: int
+    failed: int
+    progress: float
+    outcomes: List[EmailOutcome]
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    @classmethod
+    def from_job_model(cls, job):
+        """Convert Job model to JobResponse"""
+        done = job.processed + job.failed
+        return cls(
+            id=str(job.id),
+            kind=job.kind,
+            status=job.status,
+            total=job.total or 0,
+            processed=job.processed,
+            failed=job.failed,
+            progress=round(done / job.total, 4) if job.total else (1.0 if job.total == 0 else 0.0),
+            outcomes=job.outcomes,
+            created_at=job.created_at,
+            started_at=job.started_at,
+            finished_at=job.finished_at,
+            updated_at=job.updated_at
+        )
@@ -0,0 +1,44 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+from app.schemas.email_schemas import EmailListItem
+
+class ThreadResponse(BaseModel):
+    id: str
+    subject: str
+    participants: List[str]
+    message_count: int
+    first_at: datetime
+    last_at: datetime
+    summary: Optional[str] = None
+    # Messages not yet folded into the summary (refreshed via /threads/{id}/summary)
+    unsummarized_count: int = 0
+
+    @classmethod
+    def from_thread_model(cls, thread):
+        """Convert Thread model to ThreadResponse"""
+        return cls(
+            id=str(thread.id),
+            subject=thread.subject,
+            participants=thread.participants,
+            message_count=thread.message_count,
+            first_at=thread.first_at,
+            last_at=thread.last_at,
+            summary=thread.summary,
+            unsummarized_count=max(0, thread.message_count - thread.summarized_count)
+        )
+
+class ThreadListResponse(BaseModel):
+    threads: List[ThreadResponse]
+    next_cursor: Optional[str] = None
+
+class ThreadDetailResponse(ThreadResponse):
+    messages: List[EmailListItem] = []
+
+class ThreadSummaryResponse(BaseModel):
+    thread_id: str
+    summary: Optional[str] = None
+    key_points: List[str] = []
+    message_count: int
+    # True when the LLM was unavailable and the summary is rule-based (not stored)
+    fallback: bool = False
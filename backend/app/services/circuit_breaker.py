@@ -0,0 +1,88 @@
+import time
+from typing import Any, Dict, Optional
+from app.config import settings
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a backend whose circuit is open"""
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker shared by every caller of one backend.
+
+    closed: calls go through; `failure_threshold` consecutive failures open it.
+    open: calls are rejected immediately until `reset_timeout` seconds pass.
+    half_open: a single trial call is let through; its outcome closes or re-opens it.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.short_circuited = 0
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        """Whether a call may proceed now (claims the trial slot when half-open)"""
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._trial_in_flight = False
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        self.short_circuited += 1
+        return False
+
+    def check(self):
+        """Raise CircuitOpenError if the call must not proceed"""
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} circuit is open; using fallback")
+
+    def release(self):
+        """Give back a half-open trial slot when the call was abandoned (e.g. cancelled)"""
+        self._trial_in_flight = False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self, error: Exception):
+        self.consecutive_failures += 1
+        self.last_error = f"{type(error).__name__}: {error}"[:300]
+        self._trial_in_flight = False
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                print(f"🔌 {self.name} circuit opened after {self.consecutive_failures} failures: {self.last_error}")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == self.OPEN
+
+    def status(self) -> Dict[str, Any]:
+        retry_in = None
+        if self.state == self.OPEN:
+            retry_in = max(0.0, round(self.reset_timeout - (time.monotonic() - self.opened_at), 1))
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "retry_in_seconds": retry_in,
+            "short_circuited": self.short_circuited,
+            "last_error": self.last_error,
+        }
+
+llm_circuit_breaker = CircuitBreaker(
+    "gemini",
+    settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+    settings.LLM_CIRCUIT_RESET_SECONDS
+)
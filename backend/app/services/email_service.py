@@ -1,15 +1,49 @@
+import asyncio
 import json
-from typing import List, Optional
-from datetime import datetime
-from app.database import get_database
+from typing import List, Optional, Dict, Any, Tuple, AsyncIterator
+from datetime import datetime, timedelta
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+from app.database import get_database, get_list_database, bulk_write_concern
 from app.models.email_models import Email, EmailCreate, EmailStatus
+from app.config import settings
+from app.services.pagination import encode_cursor, keyset_filter
+from app.services.metrics import timed, model_build_duration
+from app.services.embeddings import embed_email, to_binary
+from app.services.near_duplicates import fingerprint_fields, from_int64, hamming_distance
+from app.services.thread_service import ThreadService
 from bson import ObjectId
+from pymongo import DESCENDING, ReturnDocument
 import os
 
+MAX_REPORTED_ERRORS = 100
+MAX_REPORTED_IDS = 1000
+
+# Newest first, with _id as a tie-breaker so keyset pagination is stable
+EMAIL_SORT = [("timestamp", DESCENDING), ("_id", DESCENDING)]
+
+SNIPPET_LENGTH = 200
+
+# Search vectors are only read by the search index, never returned to clients
+WITHOUT_EMBEDDING = {"embedding": 0}
+
+# Header fields plus a server-side snippet; the full body stays in Mongo
+COMPACT_PROJECTION = {
+    "sender": 1,
+    "subject": 1,
+    "timestamp": 1,
+    "status": 1,
+    "priority": 1,
+    "tags": 1,
+    "processed_at": 1,
+    "snippet": {"$substrCP": [{"$ifNull": ["$body", ""]}, 0, SNIPPET_LENGTH]}
+}
+
 class EmailService:
     def __init__(self):
         self._db = None
         self._collection = None
+        self._list_collection = None
     
     @property
     def db(self):
@@ -23,13 +57,20 @@ class EmailService:
             self._collection = self.db.emails
         return self._collection
     
+    @property
+    def list_collection(self):
+        """Emails with the list/dashboard read preference (possibly a secondary, slightly stale)"""
+        if self._list_collection is None:
+            self._list_collection = get_list_database().emails
+        return self._list_collection
+    
     def _convert_objectid_to_str(self, document):
         """Convert MongoDB document ObjectId to string for Pydantic"""
         if document and '_id' in document:
             document['_id'] = str(document['_id'])
         return document
     
-    async def load_mock_emails(self) -> List[Email]:
+    async def load_mock_emails(self) -> int:
         """Load mock emails from JSON file"""
         try:
             # Clear existing emails
@@ -40,42 +81,243 @@ class EmailService:
             with open(mock_file_path, 'r') as f:
                 mock_emails = json.load(f)
             
-            # Convert to Email objects and insert
-            email_objects = []
-            for email_data in mock_emails:
-                email_data['timestamp'] = datetime.fromisoformat(email_data['timestamp'])
-                email_create = EmailCreate(**email_data)
-                
-                # Insert into database
-                result = await self.collection.insert_one(email_create.model_dump())
-                
-                # Get the inserted document and convert ObjectId to string
-                inserted_email = await self.collection.find_one({"_id": result.inserted_id})
-                inserted_email = self._convert_objectid_to_str(inserted_email)
-                
-                email_obj = Email(**inserted_email)
-                email_objects.append(email_obj)
+            # Validate and insert in bulk
+            result = await self.bulk_insert_emails(mock_emails)
+            for error in result["errors"]:
+                print(f"Skipped mock email {error['index']}: {error['error']}")
             
-            return email_objects
+            return result["inserted"]
             
         except Exception as e:
             print(f"Error loading mock emails: {e}")
-            return []
+            return 0
+    
+    def _validate_batch(
+        self,
+        raw_emails: List[Dict[str, Any]],
+        positions: List[int],
+        position_key: str = "index"
+    ) -> Tuple[List[dict], List[int], List[Dict[str, Any]]]:
+        """Validate raw email dicts with EmailCreate, returning insertable docs and per-item errors.
+
+        Errors report each item's position under position_key ("index" for a JSON array, "line" for NDJSON).
+        """
+        docs, indexes, errors = [], [], []
+        for raw, position in zip(raw_emails, positions):
+            try:
+                doc = EmailCreate.model_validate(raw).model_dump()
+                doc["embedding"] = to_binary(embed_email(doc["subject"], doc["sender"], doc["body"]))
+                doc.update(fingerprint_fields(doc["body"]))
+                docs.append(doc)
+                indexes.append(position)
+            except ValidationError as e:
+                error = e.errors()[0]
+                field = ".".join(str(part) for part in error["loc"])
+                errors.append({position_key: position, "error": f"{field}: {error['msg']}" if field else error["msg"]})
+        return docs, indexes, errors
     
-    async def get_emails(self) -> List[Email]:
-        """Get all emails"""
-        emails_cursor = self.collection.find()
-        emails_list = await emails_cursor.to_list(length=100)
+    async def _validate_off_loop(
+        self,
+        raw_emails: List[Dict[str, Any]],
+        positions: List[int],
+        position_key: str = "index"
+    ) -> Tuple[List[dict], List[int], List[Dict[str, Any]]]:
+        """_validate_batch in the default executor: embedding and fingerprinting a batch is CPU-bound"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._validate_batch, raw_emails, positions, position_key)
+    
+    async def _insert_batch(
+        self,
+        docs: List[dict],
+        indexes: List[int],
+        position_key: str = "index"
+    ) -> Tuple[List[dict], List[Dict[str, Any]]]:
+        """insert_many(ordered=False); returns the inserted docs (with _id set by the driver) and failures"""
+        if not docs:
+            return [], []
+        failed = {}
+        try:
+            await self.collection.with_options(write_concern=bulk_write_concern()).insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            failed = {err["index"]: err.get("errmsg", "write error") for err in e.details.get("writeErrors", [])}
+        
+        inserted = [doc for i, doc in enumerate(docs) if i not in failed]
+        errors = [{position_key: indexes[i], "error": msg} for i, msg in failed.items()]
+        await ThreadService().assign_threads(inserted)
+        return inserted, errors
+    
+    @staticmethod
+    def _report(reported: List[Any], items: List[Any], cap: int):
+        """Append items to a response list until it holds cap entries"""
+        reported.extend(items[:max(0, cap - len(reported))])
+    
+    async def bulk_insert_emails(self, raw_emails: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Validate and insert a JSON array of emails in batches.
+
+        Counts cover every item; ids and errors (0-based array indexes) are capped
+        at MAX_REPORTED_IDS / MAX_REPORTED_ERRORS so the response stays bounded.
+        """
+        batch_size = settings.BULK_INSERT_BATCH_SIZE
+        inserted_count, failed_count, ids, errors = 0, 0, [], []
+        
+        for start in range(0, len(raw_emails), batch_size):
+            batch = raw_emails[start:start + batch_size]
+            docs, indexes, batch_errors = await self._validate_off_loop(batch, list(range(start, start + len(batch))))
+            inserted, insert_errors = await self._insert_batch(docs, indexes)
+            inserted_count += len(inserted)
+            failed_count += len(batch_errors) + len(insert_errors)
+            # The driver sets _id on each inserted document, so no read-back is needed
+            self._report(ids, [str(doc["_id"]) for doc in inserted], MAX_REPORTED_IDS)
+            self._report(errors, batch_errors + insert_errors, MAX_REPORTED_ERRORS)
+        
+        return {"inserted": inserted_count, "failed": failed_count, "ids": ids, "errors": errors}
+    
+    async def ingest_ndjson(self, chunks: AsyncIterator[bytes]) -> Dict[str, Any]:
+        """Stream newline-delimited JSON emails into the database in batches.
+
+        Errors carry 1-based line numbers under "line"; ids and errors are capped like bulk_insert_emails.
+        """
+        batch_size = settings.BULK_INSERT_BATCH_SIZE
+        inserted_count, failed_count, ids, errors = 0, 0, [], []
+        pending: List[Dict[str, Any]] = []
+        pending_lines: List[int] = []
+        line_number = 0
+        buffer = b""
+        
+        async def flush():
+            nonlocal inserted_count, failed_count, pending, pending_lines
+            docs, indexes, batch_errors = await self._validate_off_loop(pending, pending_lines, "line")
+            inserted, insert_errors = await self._insert_batch(docs, indexes, "line")
+            inserted_count += len(inserted)
+            failed_count += len(batch_errors) + len(insert_errors)
+            self._report(ids, [str(doc["_id"]) for doc in inserted], MAX_REPORTED_IDS)
+            self._report(errors, batch_errors + insert_errors, MAX_REPORTED_ERRORS)
+            pending, pending_lines = [], []
+        
+        async def handle_line(line: bytes):
+            nonlocal line_number, failed_count
+            line_number += 1
+            line = line.strip()
+            if not line:
+                return
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                failed_count += 1
+                self._report(errors, [{"line": line_number, "error": f"Invalid JSON: {e.msg}"}], MAX_REPORTED_ERRORS)
+                return
+            pending.append(record)
+            pending_lines.append(line_number)
+            if len(pending) >= batch_size:
+                await flush()
+        
+        async for chunk in chunks:
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                await handle_line(line)
+        await handle_line(buffer)
+        if pending:
+            await flush()
+        
+        return {"inserted": inserted_count, "failed": failed_count, "ids": ids, "errors": errors}
+    
+    def build_filter(
+        self,
+        status: Optional[EmailStatus] = None,
+        priority: Optional[str] = None,
+        tag: Optional[str] = None,
+        sender: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None
+    ) -> dict:
+        """Translate list filters into a Mongo query"""
+        query = {}
+        if status:
+            query["status"] = status
+        if priority:
+            query["priority"] = priority
+        if tag:
+            query["tags"] = tag
+        if sender:
+            query["sender"] = sender
+        if date_from or date_to:
+            query["timestamp"] = {}
+            if date_from:
+                query["timestamp"]["$gte"] = date_from
+            if date_to:
+                query["timestamp"]["$lte"] = date_to
+        return query
+    
+    async def get_email_documents_page(
+        self,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        projection: Optional[dict] = None,
+        for_listing: bool = False,
+        **filters
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Get one page of raw email documents, newest first, plus the cursor for the next page.
+        
+        for_listing reads with the list read preference; leave it off where the
+        result feeds writes (processing reads the primary).
+        """
+        query = self.build_filter(**filters)
+        after = keyset_filter(cursor)
+        if after:
+            query = {"$and": [query, after]} if query else after
+        
+        collection = self.list_collection if for_listing else self.collection
+        emails_cursor = collection.find(query, projection or WITHOUT_EMBEDDING).sort(EMAIL_SORT).limit(limit + 1)
+        emails_list = await emails_cursor.to_list(length=limit + 1)
+        
+        next_cursor = None
+        if len(emails_list) > limit:
+            emails_list = emails_list[:limit]
+            last = emails_list[-1]
+            next_cursor = encode_cursor(last["timestamp"], last["_id"])
+        
+        return emails_list, next_cursor
+    
+    async def get_emails_page(
+        self,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        **filters
+    ) -> Tuple[List[Email], Optional[str]]:
+        """Get one page of emails, newest first, plus the cursor for the next page"""
+        emails_list, next_cursor = await self.get_email_documents_page(limit=limit, cursor=cursor, **filters)
         
         # Convert all ObjectIds to strings
         emails_list = [self._convert_objectid_to_str(email) for email in emails_list]
         
-        return [Email(**email) for email in emails_list]
+        with timed(model_build_duration, model="Email"):
+            emails = [Email(**email) for email in emails_list]
+        return emails, next_cursor
+    
+    async def iter_emails(self, page_size: int = 500, **filters) -> AsyncIterator[Email]:
+        """Iterate over every matching email, one page at a time"""
+        cursor = None
+        while True:
+            emails, cursor = await self.get_emails_page(limit=page_size, cursor=cursor, **filters)
+            for email in emails:
+                yield email
+            if not cursor:
+                break
+    
+    async def get_emails(self, limit: int = 100, **filters) -> List[Email]:
+        """Get up to limit emails matching the filters, newest first; use iter_emails to walk all of them"""
+        emails, _ = await self.get_emails_page(limit=limit, **filters)
+        return emails
+    
+    async def count_emails(self, for_listing: bool = False, **filters) -> int:
+        collection = self.list_collection if for_listing else self.collection
+        return await collection.count_documents(self.build_filter(**filters))
     
     async def get_email(self, email_id: str) -> Optional[Email]:
         """Get specific email by ID"""
         try:
-            email = await self.collection.find_one({"_id": ObjectId(email_id)})
+            email = await self.collection.find_one({"_id": ObjectId(email_id)}, WITHOUT_EMBEDDING)
             if email:
                 email = self._convert_objectid_to_str(email)
                 return Email(**email)
@@ -83,30 +325,299 @@ class EmailService:
         except:
             return None
     
-    async def get_processed_emails(self) -> List[Email]:
-        """Get only processed emails"""
-        emails_cursor = self.collection.find({"status": EmailStatus.PROCESSED})
-        emails_list = await emails_cursor.to_list(length=100)
+    async def get_processed_emails(self, limit: int = 100, cursor: Optional[str] = None) -> Tuple[List[Email], Optional[str]]:
+        """Get one page of processed emails"""
+        return await self.get_emails_page(limit=limit, cursor=cursor, status=EmailStatus.PROCESSED)
+    
+    async def get_dashboard_stats(self) -> Dict[str, Any]:
+        """Counts by status, priority and tag plus auto-reply count in one $facet aggregation"""
+        def grouped(field: str) -> list:
+            return [{"$group": {"_id": field, "count": {"$sum": 1}}}]
         
-        # Convert all ObjectIds to strings
-        emails_list = [self._convert_objectid_to_str(email) for email in emails_list]
+        pipeline = [{"$facet": {
+            "by_status": grouped("$status"),
+            "by_priority": grouped("$priority"),
+            "by_tag": [{"$unwind": "$tags"}] + grouped("$tags") + [{"$sort": {"count": -1}}, {"$limit": 20}],
+            "auto_replies": [
+                {"$match": {"metadata.auto_reply_generated": {"$nin": [None, "", False]}}},
+                {"$count": "count"}
+            ]
+        }}]
+        result = await self.list_collection.aggregate(pipeline).to_list(length=1)
+        facets = result[0] if result else {}
         
-        return [Email(**email) for email in emails_list]
+        def as_counts(buckets: list) -> Dict[str, int]:
+            return {str(b["_id"]): b["count"] for b in buckets if b["_id"] is not None}
+        
+        status_counts = as_counts(facets.get("by_status", []))
+        auto_replies = facets.get("auto_replies", [])
+        return {
+            "total": sum(status_counts.values()),
+            "status_counts": status_counts,
+            "priority_counts": as_counts(facets.get("by_priority", [])),
+            "tag_counts": as_counts(facets.get("by_tag", [])),
+            "auto_reply_count": auto_replies[0]["count"] if auto_replies else 0
+        }
     
-    async def update_email(self, email_id: str, update_data: dict) -> Optional[Email]:
-        """Update email with processed data"""
+    async def update_email(self, email_id: str, update_data: dict, only_if: Optional[dict] = None) -> Optional[Email]:
+        """Update email with processed data.
+        
+        `only_if` adds conditions the email must still match (e.g. the worker's
+        lease); returns None if it no longer does.
+        """
         try:
             update_data['processed_at'] = datetime.now()
-            await self.collection.update_one(
-                {"_id": ObjectId(email_id)},
+            result = await self.collection.update_one(
+                {"_id": ObjectId(email_id), **(only_if or {})},
                 {"$set": update_data}
             )
+            if result.matched_count == 0:
+                return None
             return await self.get_email(email_id)
         except Exception as e:
             print(f"Error updating email: {e}")
             return None
     
+    async def find_near_duplicate(
+        self,
+        email_id: str,
+        fingerprint: int,
+        bands: List[str],
+        versions: Dict[str, int]
+    ) -> Optional[dict]:
+        """Closest (then most recent) processed email within DEDUP_MAX_DISTANCE bits of the fingerprint.
+        
+        Candidates share at least one LSH band (an indexed lookup) and only their
+        fingerprints are fetched; only results produced with the current prompt
+        versions are eligible for reuse.
+        """
+        query = {
+            "simhash_bands": {"$in": bands},
+            "status": EmailStatus.PROCESSED,
+            # Rule-based fallback results are not worth copying
+            "metadata.fallback": {"$ne": True},
+            "_id": {"$ne": ObjectId(email_id)},
+            "timestamp": {"$gte": datetime.now() - timedelta(days=settings.DEDUP_WINDOW_DAYS)},
+            **{f"metadata.prompt_versions.{prompt_type}": version for prompt_type, version in versions.items()}
+        }
+        cursor = self.collection.find(query, {"simhash": 1}).sort(EMAIL_SORT).limit(settings.DEDUP_MAX_CANDIDATES)
+        best_id, best_distance = None, settings.DEDUP_MAX_DISTANCE + 1
+        async for candidate in cursor:
+            distance = hamming_distance(fingerprint, from_int64(candidate["simhash"]))
+            if distance < best_distance:
+                best_id, best_distance = candidate["_id"], distance
+        if best_id is None:
+            return None
+        return await self.collection.find_one(
+            {"_id": best_id},
+            {"action_items": 1, "ai_summary": 1, "key_points": 1, "sentiment": 1, "tags": 1, "metadata": 1}
+        )
+    
+    def claimable_filter(self) -> dict:
+        """Emails that still need processing: never processed, or failed with retries left"""
+        return {"$or": [
+            {"status": {"$nin": [EmailStatus.PROCESSED, EmailStatus.PROCESSING, EmailStatus.FAILED]}},
+            {"status": EmailStatus.FAILED, "retry_count": {"$lt": settings.PROCESSING_MAX_FAILURES}}
+        ]}
+    
+    def _claim_update(self, worker_id: str) -> dict:
+        return {"$set": {
+            "status": EmailStatus.PROCESSING,
+            "claimed_by": worker_id,
+            "lease_expires_at": datetime.now() + timedelta(seconds=settings.EMAIL_LEASE_SECONDS)
+        }}
+    
+    async def assign_unprocessed_to_job(self, job_id: str) -> int:
+        """Attach every claimable email not already owned by a job to this job"""
+        result = await self.collection.update_many(
+            {"$and": [self.claimable_filter(), {"job_id": None}]},
+            {"$set": {"job_id": job_id}}
+        )
+        return result.modified_count
+    
+    async def count_job_pending(self, job_id: str) -> int:
+        """Emails of a job still waiting to be claimed or held by a worker"""
+        return await self.collection.count_documents({"$and": [
+            {"job_id": job_id},
+            {"$or": [self.claimable_filter(), {"status": EmailStatus.PROCESSING}]}
+        ]})
+    
+    async def claim_email(self, job_id: str, worker_id: str) -> Optional[Email]:
+        """Atomically claim (lease) the next claimable email of a job for this worker"""
+        email = await self.collection.find_one_and_update(
+            {"$and": [self.claimable_filter(), {"job_id": job_id}]},
+            self._claim_update(worker_id),
+            sort=EMAIL_SORT,
+            return_document=ReturnDocument.AFTER
+        )
+        if email:
+            return Email(**self._convert_objectid_to_str(email))
+        return None
+    
+    def lease_filter(self, worker_id: str) -> dict:
+        """Conditions for writes that require the worker to still hold the email's lease"""
+        return {"status": EmailStatus.PROCESSING, "claimed_by": worker_id}
+    
+    async def renew_lease(self, email_id: str, worker_id: str) -> bool:
+        """Extend the worker's lease; False if it expired and the email was released"""
+        result = await self.collection.update_one(
+            {"_id": ObjectId(email_id), **self.lease_filter(worker_id)},
+            {"$set": {"lease_expires_at": datetime.now() + timedelta(seconds=settings.EMAIL_LEASE_SECONDS)}}
+        )
+        return result.matched_count > 0
+    
+    async def mark_failed(
+        self,
+        email_id: str,
+        error: str,
+        only_if: Optional[dict] = None,
+        keep_in_job: bool = False
+    ) -> Optional[dict]:
+        """Release the lease and record a failed attempt.
+        
+        The email is detached from its job (so a later job can retry it) unless
+        `keep_in_job` is set and it still has retries left. `only_if` adds
+        conditions the email must still match. Returns the updated document.
+        """
+        email = await self.collection.find_one_and_update(
+            {"_id": ObjectId(email_id), **(only_if or {})},
+            {
+                "$set": {
+                    "status": EmailStatus.FAILED,
+                    "last_error": error[:500],
+                    "claimed_by": None,
+                    "lease_expires_at": None
+                },
+                "$inc": {"retry_count": 1}
+            },
+            return_document=ReturnDocument.AFTER
+        )
+        if email and (not keep_in_job or email["retry_count"] >= settings.PROCESSING_MAX_FAILURES):
+            await self.collection.update_one({"_id": email["_id"]}, {"$set": {"job_id": None}})
+        return email
+    
+    @staticmethod
+    def versions_key(versions: Dict[str, int]) -> str:
+        """Stable string form of a set of prompt versions"""
+        return ",".join(f"{prompt_type}:{version}" for prompt_type, version in sorted(versions.items()))
+    
+    def stale_filter(self, versions: Dict[str, int], claimable: bool = False) -> dict:
+        """Processed emails whose stored version of any prompt differs from `versions`.
+        
+        `claimable` leaves out emails that already failed PROCESSING_MAX_FAILURES
+        reprocess attempts for these versions (a later prompt change retries them).
+        """
+        query = {
+            "status": EmailStatus.PROCESSED,
+            "$or": [
+                {f"metadata.prompt_versions.{prompt_type}": {"$ne": version}}
+                for prompt_type, version in versions.items()
+            ]
+        }
+        if claimable:
+            query["$nor"] = [{
+                "reprocess_failed_key": self.versions_key(versions),
+                "reprocess_failures": {"$gte": settings.PROCESSING_MAX_FAILURES}
+            }]
+        return query
+    
+    async def count_stale_emails(self, versions: Dict[str, int], claimable: bool = False) -> int:
+        return await self.collection.count_documents(self.stale_filter(versions, claimable))
+    
+    async def claim_stale_email(
+        self,
+        versions: Dict[str, int],
+        worker_id: str,
+        exclude_ids: Optional[List[str]] = None
+    ) -> Optional[Email]:
+        """Lease the most recent email with stale prompt output for reprocessing.
+        
+        Uses its own lease field so the email stays PROCESSED (and visible) meanwhile.
+        """
+        now = datetime.now()
+        query = {
+            "$and": [
+                self.stale_filter(versions, claimable=True),
+                {"$or": [
+                    {"reprocess_lease_expires_at": None},
+                    {"reprocess_lease_expires_at": {"$lt": now}}
+                ]}
+            ]
+        }
+        if exclude_ids:
+            query["_id"] = {"$nin": [ObjectId(email_id) for email_id in exclude_ids]}
+        email = await self.collection.find_one_and_update(
+            query,
+            {"$set": {
+                "claimed_by": worker_id,
+                "reprocess_lease_expires_at": now + timedelta(seconds=settings.EMAIL_LEASE_SECONDS)
+            }},
+            sort=EMAIL_SORT,
+            return_document=ReturnDocument.AFTER
+        )
+        if email:
+            return Email(**self._convert_objectid_to_str(email))
+        return None
+    
+    async def release_stale_claim(self, email_id: str, error: str, versions: Dict[str, int]) -> int:
+        """Drop a reprocess lease after a failed attempt, keeping the previous results.
+        
+        Returns the number of failed attempts for these prompt versions so far.
+        """
+        key = self.versions_key(versions)
+        email = await self.collection.find_one_and_update(
+            {"_id": ObjectId(email_id)},
+            [{"$set": {
+                "claimed_by": None,
+                "reprocess_lease_expires_at": None,
+                "last_error": error[:500],
+                # Attempts count per prompt-version set: a new prompt change starts over
+                "reprocess_failures": {"$cond": [
+                    {"$eq": ["$reprocess_failed_key", key]},
+                    {"$add": [{"$ifNull": ["$reprocess_failures", 0]}, 1]},
+                    1
+                ]},
+                "reprocess_failed_key": key
+            }}],
+            projection={"reprocess_failures": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        return email["reprocess_failures"] if email else 0
+    
+    async def find_expired_leases(self, limit: int = 100) -> List[dict]:
+        """Emails whose worker lease ran out (worker crashed or hung)"""
+        cursor = self.collection.find(
+            {"status": EmailStatus.PROCESSING, "lease_expires_at": {"$lt": datetime.now()}},
+            {"_id": 1, "job_id": 1, "claimed_by": 1}
+        )
+        return await cursor.to_list(length=limit)
+    
+    async def release_expired_lease(self, email_id: str) -> Optional[dict]:
+        """Return a stale claim to the queue as a failed attempt, if it is still expired"""
+        return await self.mark_failed(
+            email_id,
+            "Processing lease expired",
+            only_if={"status": EmailStatus.PROCESSING, "lease_expires_at": {"$lt": datetime.now()}},
+            keep_in_job=True
+        )
+    
+    async def save_summary(self, email_id: str, summary_data: dict) -> bool:
+        """Persist generated summary fields without touching processing state"""
+        try:
+            result = await self.collection.update_one(
+                {"_id": ObjectId(email_id)},
+                {"$set": {
+                    "ai_summary": summary_data.get("summary", ""),
+                    "key_points": summary_data.get("key_points", []),
+                    "sentiment": summary_data.get("sentiment", "neutral")
+                }}
+            )
+            return result.modified_count > 0
+        except Exception as e:
+            print(f"Error saving summary: {e}")
+            return False
+    
     async def clear_emails(self):
         """Clear all emails from database"""
         await self.collection.delete_many({})
-        return {"message": "All emails cleared"}
\ No newline at end of file
+        return {"message": "All emails cleared"}
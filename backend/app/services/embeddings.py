@@ -0,0 +1,49 @@
+import hashlib
+import re
+from typing import List
+import numpy as np
+from bson.binary import Binary
+from app.config import settings
+
+# Hashed bag-of-words embeddings: cheap, CPU-only and deterministic across
+# processes, so vectors can be stored at ingest and compared anywhere.
+EMBEDDING_DIM = settings.SEARCH_EMBEDDING_DIM
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+STOPWORDS = frozenset("""
+a an and are as at be been but by can do for from has have i if in is it its me my no not of on or our please
+so that the their them there these they this to us was we were will with you your re fw fwd hi hello thanks regards
+""".split())
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS and len(token) > 1]
+
+def _bucket(feature: str) -> int:
+    # Stable across processes, unlike hash(); the low bit picks the sign
+    return int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+
+def embed_text(text: str) -> np.ndarray:
+    """L2-normalised float32 vector of hashed unigrams and bigrams (sublinear term frequency)"""
+    tokens = tokenize(text)
+    features = tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    if not features:
+        return vector
+    hashes = np.fromiter((_bucket(feature) for feature in features), dtype=np.uint64, count=len(features))
+    signs = np.where(hashes & np.uint64(1), -1.0, 1.0).astype(np.float32)
+    buckets = ((hashes >> np.uint64(1)) % np.uint64(EMBEDDING_DIM)).astype(np.intp)
+    np.add.at(vector, buckets, signs)
+    vector = np.sign(vector) * np.log1p(np.abs(vector))
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+def embed_email(subject: str, sender: str, body: str) -> np.ndarray:
+    # The subject carries most of the topic: count it twice
+    return embed_text(f"{subject}\n{subject}\n{sender}\n{body}")
+
+def to_binary(vector: np.ndarray) -> Binary:
+    """Compact storage form: raw little-endian float32 bytes"""
+    return Binary(vector.astype("<f4").tobytes())
+
+def from_binary(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype="<f4")
@@ -0,0 +1,112 @@
+from typing import Dict, List, Optional
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+from app.config import settings
+from app.database import get_database
+from app.models.email_models import EmailStatus
+from app.models.job_models import JobStatus
+from app.services.email_service import EMAIL_SORT, EmailService
+from app.services.thread_service import THREAD_SORT
+
+# Every secondary index the app relies on, by collection. The prompts
+# collection holds a single document and needs nothing beyond _id.
+INDEXES: Dict[str, List[IndexModel]] = {
+    "emails": [
+        IndexModel(EMAIL_SORT),
+        # Filtered, keyset-paginated list queries
+        *[IndexModel([(field, ASCENDING)] + EMAIL_SORT) for field in ("status", "priority", "tags", "sender")],
+        # Job claims and lease recovery
+        IndexModel([("job_id", ASCENDING), ("status", ASCENDING)] + EMAIL_SORT),
+        IndexModel([("status", ASCENDING), ("lease_expires_at", ASCENDING)]),
+        # Near-duplicate band lookup
+        IndexModel([("simhash_bands", ASCENDING), ("status", ASCENDING)] + EMAIL_SORT),
+        # Thread messages in chronological order
+        IndexModel([("thread_id", ASCENDING), ("timestamp", ASCENDING), ("_id", ASCENDING)]),
+        # Keyword search (GET /emails/search)
+        IndexModel(
+            [("subject", TEXT), ("body", TEXT), ("sender", TEXT), ("action_items", TEXT)],
+            weights={"subject": 5, "action_items": 3, "sender": 2, "body": 1},
+            name="email_text"
+        ),
+    ],
+    "jobs": [
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)]),
+    ],
+    "threads": [
+        IndexModel([("message_ids", ASCENDING)]),
+        IndexModel([("referenced_ids", ASCENDING)]),
+        IndexModel([("normalized_subject", ASCENDING), ("last_at", DESCENDING)]),
+        IndexModel(THREAD_SORT),
+        IndexModel([("participants", ASCENDING)] + THREAD_SORT),
+    ],
+    # Let MongoDB expire cached LLM responses on their own
+    "llm_cache": [
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+}
+
+def _hot_queries() -> List[dict]:
+    """Representative shapes of the frequent queries, checked with explain()"""
+    return [
+        {"name": "emails by status", "collection": "emails",
+         "filter": {"status": EmailStatus.PROCESSED}, "sort": EMAIL_SORT},
+        {"name": "emails by priority", "collection": "emails",
+         "filter": {"priority": "high"}, "sort": EMAIL_SORT},
+        {"name": "job email claim", "collection": "emails",
+         "filter": {"$and": [EmailService().claimable_filter(), {"job_id": "job"}]}, "sort": EMAIL_SORT},
+        {"name": "near-duplicate candidates", "collection": "emails",
+         "filter": {"simhash_bands": {"$in": ["0:0"]}, "status": EmailStatus.PROCESSED}, "sort": EMAIL_SORT},
+        {"name": "thread messages", "collection": "emails",
+         "filter": {"thread_id": "thread"}, "sort": [("timestamp", ASCENDING), ("_id", ASCENDING)]},
+        {"name": "active jobs", "collection": "jobs",
+         "filter": {"status": {"$in": [JobStatus.QUEUED, JobStatus.RUNNING]}}, "sort": [("created_at", ASCENDING)]},
+        {"name": "threads by participant", "collection": "threads",
+         "filter": {"participants": "someone@example.com"}, "sort": THREAD_SORT},
+    ]
+
+async def ensure_indexes(database=None):
+    """Create any missing indexes; an existing index with other options is reported, not replaced"""
+    database = database if database is not None else get_database()
+    for collection_name, indexes in INDEXES.items():
+        try:
+            await database[collection_name].create_indexes(indexes)
+        except OperationFailure as e:
+            print(f"⚠️ Could not create indexes on {collection_name}: {e}")
+
+def _stages(plan: dict):
+    """Every stage of a (possibly nested) query plan"""
+    if not isinstance(plan, dict):
+        return
+    yield plan.get("stage")
+    for key in ("inputStage", "queryPlan"):
+        yield from _stages(plan.get(key))
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+async def check_query_plans(database=None) -> List[str]:
+    """Explain the hot queries and warn about any that fall back to a collection scan.
+
+    Returns the names of the queries planned as COLLSCAN.
+    """
+    database = database if database is not None else get_database()
+    scans = []
+    for query in _hot_queries():
+        cursor = database[query["collection"]].find(query["filter"]).sort(query["sort"]).limit(1)
+        try:
+            explanation = await cursor.explain()
+        except OperationFailure as e:
+            print(f"⚠️ Could not explain '{query['name']}': {e}")
+            continue
+        winning_plan: Optional[dict] = explanation.get("queryPlanner", {}).get("winningPlan")
+        if "COLLSCAN" in set(_stages(winning_plan)):
+            scans.append(query["name"])
+            print(f"⚠️ Query '{query['name']}' on {query['collection']} uses a COLLSCAN - check its indexes")
+    return scans
+
+async def bootstrap_indexes():
+    """Startup hook: create the indexes, then verify the hot query plans"""
+    await ensure_indexes()
+    if settings.INDEX_PLAN_CHECK:
+        scans = await check_query_plans()
+        if not scans:
+            print("🗂️ Indexes ready; hot queries use index scans")
@@ -0,0 +1,162 @@
+from typing import List, Optional
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import ASCENDING, ReturnDocument
+from app.database import get_database
+from app.models.job_models import Job, JobStatus
+
+# Per-email outcomes kept on the job document (most recent first are kept)
+MAX_JOB_OUTCOMES = 500
+
+class JobService:
+    def __init__(self):
+        self._db = None
+        self._collection = None
+    
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = get_database()
+        return self._db
+    
+    @property
+    def collection(self):
+        if self._collection is None:
+            self._collection = self.db.jobs
+        return self._collection
+    
+    def _convert_objectid_to_str(self, document):
+        """Convert MongoDB document ObjectId to string for Pydantic"""
+        if document and '_id' in document:
+            document['_id'] = str(document['_id'])
+        return document
+    
+    def _to_job(self, document) -> Optional[Job]:
+        if not document:
+            return None
+        return Job(**self._convert_objectid_to_str(document))
+    
+    async def create_job(self, total: Optional[int] = None, kind: str = "process") -> Job:
+        """Create a queued job; without a total it cannot complete until set_total is called"""
+        now = datetime.now()
+        job_dict = {
+            "kind": kind,
+            "status": JobStatus.QUEUED,
+            "total": total,
+            "processed": 0,
+            "failed": 0,
+            "outcomes": [],
+            "created_at": now,
+            "updated_at": now
+        }
+        result = await self.collection.insert_one(job_dict)
+        return self._to_job(job_dict | {"_id": result.inserted_id})
+    
+    async def get_job(self, job_id: str) -> Optional[Job]:
+        """Get job by ID"""
+        try:
+            return self._to_job(await self.collection.find_one({"_id": ObjectId(job_id)}))
+        except Exception:
+            return None
+    
+    async def set_total(self, job_id: str, total: int):
+        """Set the job's email count, completing it if workers already finished that many"""
+        document = await self.collection.find_one_and_update(
+            {"_id": ObjectId(job_id)},
+            {"$set": {"total": total, "updated_at": datetime.now()}},
+            return_document=ReturnDocument.AFTER
+        )
+        await self._complete_if_done(document)
+    
+    async def _complete_if_done(self, document: Optional[dict]):
+        if document and document.get("total") is not None and document["processed"] + document["failed"] >= document["total"]:
+            await self.collection.update_one(
+                {"_id": document["_id"], "status": {"$ne": JobStatus.COMPLETED}},
+                {"$set": {"status": JobStatus.COMPLETED, "finished_at": datetime.now()}}
+            )
+            document["status"] = JobStatus.COMPLETED
+    
+    async def delete_job(self, job_id: str):
+        await self.collection.delete_one({"_id": ObjectId(job_id)})
+    
+    async def mark_running(self, job_id: str):
+        """Move a queued job to running (no-op if another worker already did)"""
+        now = datetime.now()
+        await self.collection.update_one(
+            {"_id": ObjectId(job_id), "status": JobStatus.QUEUED},
+            {"$set": {"status": JobStatus.RUNNING, "started_at": now, "updated_at": now}}
+        )
+    
+    async def complete_job(self, job_id: str):
+        """Mark a job completed regardless of its counters (e.g. nothing was left to do).
+        
+        A job still being set up (no total yet) is left alone.
+        """
+        now = datetime.now()
+        await self.collection.update_one(
+            {"_id": ObjectId(job_id), "status": {"$ne": JobStatus.COMPLETED}, "total": {"$ne": None}},
+            {"$set": {"status": JobStatus.COMPLETED, "finished_at": now, "updated_at": now}}
+        )
+    
+    def _active_filter(self, kind: Optional[str] = None) -> dict:
+        query = {"status": {"$in": [JobStatus.QUEUED, JobStatus.RUNNING]}}
+        if kind:
+            query["kind"] = kind
+        return query
+    
+    async def find_active_job(self, kind: Optional[str] = None) -> Optional[Job]:
+        """Oldest job that still has work"""
+        document = await self.collection.find_one(self._active_filter(kind), sort=[("created_at", ASCENDING)])
+        return self._to_job(document)
+    
+    async def find_active_jobs(self, kind: Optional[str] = None, limit: int = 20) -> List[Job]:
+        """Jobs that still have work, oldest first, for workers to try in turn"""
+        cursor = self.collection.find(self._active_filter(kind)).sort("created_at", ASCENDING).limit(limit)
+        return [self._to_job(document) async for document in cursor]
+    
+    async def find_orphaned_jobs(self, older_than_seconds: int, limit: int = 20) -> List[Job]:
+        """Active jobs still without a total long after creation (their creator died during setup)"""
+        cursor = self.collection.find({
+            **self._active_filter(),
+            "total": None,
+            "created_at": {"$lt": datetime.now() - timedelta(seconds=older_than_seconds)}
+        }).limit(limit)
+        return [self._to_job(document) async for document in cursor]
+    
+    async def finalize_total(self, job_id: str, pending: int):
+        """Give an orphaned job the total it has reached plus what is still pending, if it has none yet"""
+        document = await self.collection.find_one_and_update(
+            {"_id": ObjectId(job_id), "total": None},
+            [{"$set": {"total": {"$add": ["$processed", "$failed", pending]}, "updated_at": datetime.now()}}],
+            return_document=ReturnDocument.AFTER
+        )
+        await self._complete_if_done(document)
+    
+    async def record_outcome(
+        self,
+        job_id: str,
+        email_id: str,
+        success: bool,
+        error: Optional[str] = None,
+        worker_id: Optional[str] = None
+    ) -> Optional[Job]:
+        """Atomically count one finished email and complete the job when all are done"""
+        now = datetime.now()
+        outcome = {
+            "email_id": email_id,
+            "status": "processed" if success else "failed",
+            "error": error,
+            "worker_id": worker_id,
+            "finished_at": now
+        }
+        document = await self.collection.find_one_and_update(
+            {"_id": ObjectId(job_id)},
+            {
+                "$inc": {"processed" if success else "failed": 1},
+                "$push": {"outcomes": {"$each": [outcome], "$slice": -MAX_JOB_OUTCOMES}},
+                "$set": {"updated_at": now}
+            },
+            return_document=ReturnDocument.AFTER
+        )
+        await self._complete_if_done(document)
+        return self._to_job(document)
@@ -0,0 +1,155 @@
+import json
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+from app.config import settings
+
+# Rule tables: group -> label -> keywords. Keywords match as lowercase substrings.
+# Order matters: sentiments are checked in order (first match wins), and tags
+# and mock action items are reported in table order.
+DEFAULT_KEYWORD_RULES: Dict[str, Dict[str, List[str]]] = {
+    "priority": {
+        "high": ["urgent", "asap", "immediately"],
+    },
+    "tags": {
+        "meeting": ["meeting", "schedule", "calendar"],
+        "project": ["project", "timeline", "deadline"],
+    },
+    "sentiment": {
+        "urgent": ["urgent", "asap", "immediately", "emergency", "important"],
+        "positive": ["great", "excellent", "good", "thanks", "thank you", "appreciate"],
+        "negative": ["problem", "issue", "concern", "urgent", "asap", "immediately"],
+    },
+    "action_items": {
+        "Review the document": ["review", "check", "look at"],
+        "Schedule a meeting": ["schedule", "meeting", "call"],
+        "Provide updates": ["update", "progress", "status"],
+        "Meet the deadline": ["deadline", "friday", "end of day"],
+        "Provide feedback": ["feedback", "comments", "suggestions"],
+    },
+    "action_verbs": {
+        "action": ["please", "need", "required", "should", "must", "action"],
+    },
+}
+
+ACTION_REQUIRED_TAG = "action-required"
+
+@dataclass
+class Classification:
+    priority: str
+    tags: List[str]
+    sentiment: str
+    action_items: List[str] = field(default_factory=list)
+
+class KeywordClassifier:
+    """Matches every keyword of every rule group in one regex pass over the text.
+
+    All keywords are compiled into a single alternation inside a lookahead, so
+    the scan tries each position once and overlapping matches are all found.
+    Alternatives are ordered longest first; a keyword that is a prefix of a
+    longer one (e.g. "thank" / "thank you") is credited through the longer
+    keyword's label set, since only one alternative can match at a position.
+    """
+
+    def __init__(self, rules: Dict[str, Dict[str, List[str]]]):
+        self.rules = rules
+        self._labels: Dict[str, Set[Tuple[str, str]]] = {}
+        for group, table in rules.items():
+            for label, keywords in table.items():
+                for keyword in keywords:
+                    self._labels.setdefault(keyword.lower(), set()).add((group, label))
+
+        keywords = sorted(self._labels, key=len, reverse=True)
+        for keyword in keywords:
+            for other in keywords:
+                if other != keyword and keyword.startswith(other):
+                    self._labels[keyword] |= self._labels[other]
+
+        alternation = "|".join(re.escape(keyword) for keyword in keywords)
+        self._pattern = re.compile(f"(?=({alternation}))") if keywords else None
+
+    @property
+    def rule_tags(self) -> Set[str]:
+        """Tags this classifier can assign (as opposed to tags from the LLM)"""
+        return set(self.rules.get("tags", {})) | {ACTION_REQUIRED_TAG}
+
+    def scan(self, text: str) -> List[Tuple[int, Set[Tuple[str, str]]]]:
+        """(position, {(group, label)}) for every keyword occurrence"""
+        if self._pattern is None:
+            return []
+        return [(match.start(), self._labels[match.group(1)]) for match in self._pattern.finditer(text.lower())]
+
+    def match(self, text: str) -> Set[Tuple[str, str]]:
+        """All (group, label) pairs with at least one keyword in the text"""
+        matched: Set[Tuple[str, str]] = set()
+        for _, labels in self.scan(text):
+            matched |= labels
+        return matched
+
+    def _in_order(self, group: str, matched: Set[Tuple[str, str]]) -> List[str]:
+        return [label for label in self.rules.get(group, {}) if (group, label) in matched]
+
+    def classify(self, text: str, action_items: Optional[List[str]] = None) -> Classification:
+        """Priority, tags, sentiment and mock action items from one scan of the text.
+
+        The extracted `action_items`, if any, raise priority and add the
+        action-required tag. The result's `action_items` are the keyword-based
+        stand-ins used when the LLM is unavailable.
+        """
+        matched = self.match(text)
+        mock_items = self._in_order("action_items", matched)
+        has_actions = bool(action_items)
+
+        if ("priority", "high") in matched:
+            priority = "high"
+        elif has_actions:
+            priority = "medium"
+        else:
+            priority = "low"
+
+        tags = self._in_order("tags", matched)
+        if has_actions:
+            tags.append(ACTION_REQUIRED_TAG)
+
+        sentiments = self._in_order("sentiment", matched)
+        return Classification(
+            priority=priority,
+            tags=tags,
+            sentiment=sentiments[0] if sentiments else "neutral",
+            action_items=mock_items
+        )
+
+    def sentences_with(self, text: str, group: str, limit: int) -> List[str]:
+        """Up to `limit` '.'-separated sentences containing a keyword of `group`"""
+        sentences, starts, offset = text.split('.'), [], 0
+        for sentence in sentences:
+            starts.append(offset)
+            offset += len(sentence) + 1
+
+        found: List[str] = []
+        index = 0
+        for position, labels in self.scan(text):
+            if not any(label_group == group for label_group, _ in labels):
+                continue
+            while index + 1 < len(starts) and starts[index + 1] <= position:
+                index += 1
+            sentence = sentences[index].strip()
+            if sentence not in found:
+                found.append(sentence)
+                if len(found) >= limit:
+                    break
+        return found
+
+def load_keyword_rules() -> Dict[str, Dict[str, List[str]]]:
+    """Default rules, with groups overridden from KEYWORD_RULES_FILE (JSON) if set"""
+    rules = dict(DEFAULT_KEYWORD_RULES)
+    if settings.KEYWORD_RULES_FILE:
+        with open(settings.KEYWORD_RULES_FILE) as rules_file:
+            rules.update(json.load(rules_file))
+    return rules
+
+@lru_cache(maxsize=1)
+def get_keyword_classifier() -> KeywordClassifier:
+    """Process-wide classifier (compiled once)"""
+    return KeywordClassifier(load_keyword_rules())
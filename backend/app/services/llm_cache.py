@@ -0,0 +1,120 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from app.database import get_database
+from app.config import settings
+
+class LLMCache:
+    """Two-tier (in-process LRU + MongoDB TTL) cache for LLM responses"""
+
+    def __init__(self, max_entries: int, ttl_seconds: int, collection_name: str = "llm_cache"):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.collection_name = collection_name
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.stats = {"memory_hits": 0, "mongo_hits": 0, "misses": 0, "bypassed": 0}
+
+    @property
+    def collection(self):
+        try:
+            return get_database()[self.collection_name]
+        except RuntimeError:
+            # Database not connected (e.g. scripts) - memory tier only
+            return None
+
+    @staticmethod
+    def make_key(model: str, operation: str, generation_config: Dict[str, Any], prompt: str) -> str:
+        """Content-addressed key over everything that influences the response"""
+        payload = json.dumps(
+            {"model": model, "operation": operation, "config": generation_config, "prompt": prompt},
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _get_memory(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _set_memory(self, key: str, value: str):
+        self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[str]:
+        value = self._get_memory(key)
+        if value is not None:
+            self.stats["memory_hits"] += 1
+            return value
+
+        collection = self.collection
+        if collection is not None:
+            try:
+                doc = await collection.find_one({"_id": key, "expires_at": {"$gt": datetime.utcnow()}})
+                if doc:
+                    self._set_memory(key, doc["response"])
+                    self.stats["mongo_hits"] += 1
+                    return doc["response"]
+            except Exception as e:
+                print(f"⚠️ LLM cache lookup failed: {e}")
+
+        self.stats["misses"] += 1
+        return None
+
+    async def set(self, key: str, value: str, operation: str, model: str):
+        self._set_memory(key, value)
+
+        collection = self.collection
+        if collection is None:
+            return
+        now = datetime.utcnow()
+        try:
+            await collection.update_one(
+                {"_id": key},
+                {"$set": {
+                    "response": value,
+                    "operation": operation,
+                    "model": model,
+                    "created_at": now,
+                    "expires_at": now + timedelta(seconds=self.ttl_seconds)
+                }},
+                upsert=True
+            )
+        except Exception as e:
+            print(f"⚠️ LLM cache write failed: {e}")
+
+    async def delete(self, key: str):
+        """Drop an entry from both tiers (e.g. a response that failed validation)"""
+        self._entries.pop(key, None)
+        collection = self.collection
+        if collection is None:
+            return
+        try:
+            await collection.delete_one({"_id": key})
+        except Exception as e:
+            print(f"⚠️ LLM cache delete failed: {e}")
+
+    def record_bypass(self):
+        self.stats["bypassed"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        hits = self.stats["memory_hits"] + self.stats["mongo_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0
+        }
+
+llm_cache = LLMCache(settings.LLM_CACHE_MAX_ENTRIES, settings.LLM_CACHE_TTL_SECONDS)
@@ -2,37 +2,102 @@ import google.generativeai as genai
 import os
 import json
 import asyncio
-from typing import List, Dict, Any
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple, Callable
+from pydantic import ValidationError
 from app.config import settings
+from app.services.rate_limiter import llm_rate_limiter
+from app.services.llm_cache import llm_cache
+from app.services.circuit_breaker import llm_circuit_breaker, CircuitOpenError
+from app.services.metrics import record_llm_call, llm_input_tokens, llm_output_tokens
+from app.models.analysis_models import EmailAnalysis
+from app.services.text_preprocessing import estimate_tokens, clean_body, chunk_text, truncate_to_tokens
+from app.services.keyword_classifier import get_keyword_classifier
+
+# The Gemini SDK is synchronous; give it its own bounded pool so slow model
+# calls cannot exhaust the default executor used by the rest of the app
+llm_executor = ThreadPoolExecutor(
+    max_workers=settings.LLM_THREAD_POOL_SIZE,
+    thread_name_prefix="gemini"
+)
+
+# Output allowance per email in batched calls, capped at the model's output limit
+BATCH_OUTPUT_TOKENS_PER_EMAIL = {"analyze_email": 1000, "extract_action_items": 300}
+MAX_OUTPUT_TOKENS = 8192
+
+def pack_by_token_budget(
+    items: List[Tuple[str, str]],
+    token_budget: int,
+    max_items: int
+) -> List[List[Tuple[str, str]]]:
+    """Group (key, text) pairs into batches that fit the token budget.
+    
+    Items larger than the budget get a batch of their own.
+    """
+    batches, current, used = [], [], 0
+    for key, text in items:
+        tokens = estimate_tokens(text)
+        if current and (used + tokens > token_budget or len(current) >= max_items):
+            batches.append(current)
+            current, used = [], 0
+        current.append((key, text))
+        used += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+DRAFT_GENERATION_CONFIG = {"temperature": 0.4, "top_p": 0.8, "max_output_tokens": 800}
+DRAFT_FOLLOW_UPS = [
+    "Schedule a follow-up meeting",
+    "Share additional documents if needed",
+    "Confirm receipt and understanding"
+]
 
 class LLMService:
+    # Try available models in order of preference
+    MODEL_PRIORITY = [
+        'gemini-2.5-flash-lite',  # Latest experimental flash model
+        'gemini-2.5-flash',      # Fast model
+        'gemini-1.5-flash',        # High quality model
+        'gemini-1.0-flash',        # Original pro model
+    ]
+    
     def __init__(self):
         if not settings.GOOGLE_API_KEY:
             raise ValueError("GOOGLE_API_KEY not found in environment variables")
         genai.configure(api_key=settings.GOOGLE_API_KEY)
         
-        # List available models to see what's accessible
+        self.model = None
+        self.model_name = None
+        self.available_models: List[str] = []
+        self.models_refreshed_at: Optional[float] = None
+        self.ready = False
+        self._refresh_lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+        # Per-operation call and token counters (input tokens are the main cost)
+        self.token_usage: Dict[str, Dict[str, int]] = {}
+    
+    def _discover_models(self):
+        """List accessible models and pick the preferred one (blocking network call)"""
         try:
-            available_models = genai.list_models()
-            print("🔍 Available Google Gemini Models:")
-            for model in available_models:
-                print(f"  - {model.name}")
+            self.available_models = [model.name.split('/')[-1] for model in genai.list_models()]
+            print(f"🔍 Found {len(self.available_models)} Google Gemini models")
         except Exception as e:
             print(f"❌ Error listing models: {e}")
         
-        # Try available models in order of preference
-        model_priority = [
-            'gemini-2.5-flash-lite',  # Latest experimental flash model
-            'gemini-2.5-flash',      # Fast model
-            'gemini-1.5-flash',        # High quality model
-            'gemini-1.0-flash',        # Original pro model
-        ]
+        candidates = self.MODEL_PRIORITY
+        if self.available_models:
+            # Only consider models the key can actually use, keeping our preference order
+            candidates = [name for name in self.MODEL_PRIORITY if name in self.available_models]
+            candidates = candidates or self.available_models[:1]
         
-        self.model = None
-        for model_name in model_priority:
+        for model_name in candidates:
             try:
-                self.model = genai.GenerativeModel(model_name)
-                print(f"✅ Successfully loaded model: {model_name}")
+                model = genai.GenerativeModel(model_name)
+                if model_name != self.model_name:
+                    print(f"✅ Successfully loaded model: {model_name}")
+                self.model, self.model_name = model, model_name
                 break
             except Exception as e:
                 print(f"❌ Model {model_name} not available: {e}")
@@ -40,24 +105,283 @@ class LLMService:
         
         if not self.model:
             print("🚨 No Gemini models available. Please check your API key and model access.")
-            # Try to get any available model as last resort
+        
+        self.models_refreshed_at = time.monotonic()
+        self.ready = self.model is not None
+    
+    async def refresh_models(self, force: bool = False):
+        """Re-run model discovery if the cached result is older than the refresh interval"""
+        async with self._refresh_lock:
+            if not force and not self._models_stale():
+                return
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(llm_executor, self._discover_models)
+    
+    async def start(self):
+        """Warm start: discover models before the first request needs them"""
+        await self.refresh_models(force=True)
+    
+    def _models_stale(self) -> bool:
+        if self.models_refreshed_at is None:
+            return True
+        return time.monotonic() - self.models_refreshed_at > settings.LLM_MODEL_REFRESH_SECONDS
+    
+    def _schedule_refresh(self):
+        """Refresh model discovery in the background without delaying the current call"""
+        if self._models_stale() and (self._refresh_task is None or self._refresh_task.done()):
+            self._refresh_task = asyncio.create_task(self.refresh_models())
+    
+    async def _ensure_model(self) -> bool:
+        """Discover models on first use if the service was not warm-started"""
+        if self.models_refreshed_at is None:
+            await self.refresh_models()
+        return self.model is not None
+    
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "model": self.model_name,
+            "available_models": len(self.available_models),
+            "token_usage": self.token_usage,
+        }
+    
+    def _record_usage(self, operation: str, prompt: str, usage: Any = None, output_text: str = ""):
+        """Count one model call, using the API's usage metadata when present and the estimate otherwise"""
+        input_tokens = getattr(usage, "prompt_token_count", None) or estimate_tokens(prompt)
+        output_tokens = getattr(usage, "candidates_token_count", None) or estimate_tokens(output_text)
+        counters = self.token_usage.setdefault(operation, {"calls": 0, "input_tokens": 0, "output_tokens": 0})
+        counters["calls"] += 1
+        counters["input_tokens"] += input_tokens
+        counters["output_tokens"] += output_tokens
+        llm_input_tokens.inc(input_tokens, operation=operation, model=self.model_name)
+        llm_output_tokens.inc(output_tokens, operation=operation, model=self.model_name)
+        print(f"🔢 {operation}: {input_tokens} input tokens, {output_tokens} output tokens")
+    
+    async def prepare_body(self, operation: str, body: str) -> str:
+        """Fit an email body into the operation's input token budget.
+        
+        Quoted reply chains and signatures are always stripped. A body still over
+        budget is condensed chunk by chunk (map), and the condensed parts are
+        joined (reduce); if that is not possible it is truncated.
+        """
+        body = clean_body(body)
+        budget = settings.LLM_BODY_TOKEN_BUDGETS.get(operation)
+        if budget is None or estimate_tokens(body) <= budget:
+            return body
+        
+        chunks = chunk_text(body, settings.LLM_CHUNK_TOKENS)[:settings.LLM_MAX_CHUNKS]
+        # Give each chunk an equal share of the budget for its condensed form
+        share = max(100, budget // len(chunks))
+        try:
+            if not await self._ensure_model():
+                raise RuntimeError("No AI model available")
+            condensed = await asyncio.gather(*(self._condense_chunk(chunk, share) for chunk in chunks))
+            body = "\n\n".join(condensed)
+            print(f"✂️ Condensed {operation} input from {len(chunks)} chunks to ~{estimate_tokens(body)} tokens")
+        except Exception as e:
+            print(f"⚠️ Could not condense long email, truncating instead: {e}")
+        return truncate_to_tokens(body, budget)
+    
+    async def _condense_chunk(self, chunk: str, max_tokens: int) -> str:
+        prompt = f"""
+        Condense this part of a long email to at most {max_tokens} tokens.
+        Keep every request, question, deadline, decision, name, number and commitment.
+        Return only the condensed text.
+        
+        TEXT:
+        {chunk}
+        """
+        return (await self._generate(
+            "condense_chunk",
+            prompt,
+            {"temperature": 0.1, "max_output_tokens": max_tokens}
+        )).strip()
+    
+    async def _generate(
+        self,
+        operation: str,
+        prompt: str,
+        generation_config: Dict[str, Any],
+        use_cache: bool = True,
+        validate: Optional[Callable[[str], bool]] = None
+    ) -> str:
+        """Run one model call, served from the response cache when possible.
+        
+        With `validate`, only responses it accepts are cached, so a malformed
+        reply is not replayed to every retry until the entry expires.
+        """
+        started_at = time.perf_counter()
+        use_cache = use_cache and settings.LLM_CACHE_ENABLED
+        cache_key = llm_cache.make_key(self.model_name, operation, generation_config, prompt)
+        if use_cache:
+            cached = await self._cached_response(cache_key, validate)
+            if cached is not None:
+                record_llm_call(operation, self.model_name, time.perf_counter() - started_at, cache_hit=True)
+                return cached
+        else:
+            llm_cache.record_bypass()
+        
+        # Fail fast while the backend is known to be down; callers fall back
+        try:
+            llm_circuit_breaker.check()
+        except CircuitOpenError:
+            record_llm_call(operation, self.model_name, time.perf_counter() - started_at, fallback=True)
+            raise
+        self._schedule_refresh()
+        try:
+            await llm_rate_limiter.acquire()
+            # Run in the dedicated pool since genai is synchronous; the SDK timeout
+            # frees the thread, wait_for bounds the caller even if it does not
+            loop = asyncio.get_running_loop()
+            response = await asyncio.wait_for(
+                loop.run_in_executor(
+                    llm_executor,
+                    lambda: self.model.generate_content(
+                        prompt,
+                        generation_config=genai.types.GenerationConfig(**generation_config),
+                        request_options={"timeout": settings.LLM_CALL_TIMEOUT_SECONDS}
+                    )
+                ),
+                timeout=settings.LLM_CALL_TIMEOUT_SECONDS + 1
+            )
+            text = response.text
+        except asyncio.CancelledError:
+            llm_circuit_breaker.release()
+            raise
+        except Exception as e:
+            llm_circuit_breaker.record_failure(e)
+            # The caller falls back to rule-based output
+            record_llm_call(operation, self.model_name, time.perf_counter() - started_at, fallback=True)
+            raise
+        llm_circuit_breaker.record_success()
+        record_llm_call(operation, self.model_name, time.perf_counter() - started_at)
+        self._record_usage(operation, prompt, getattr(response, "usage_metadata", None), text)
+        
+        if use_cache and (validate is None or validate(text)):
+            await llm_cache.set(cache_key, text, operation, self.model_name)
+        return text
+    
+    async def _cached_response(self, cache_key: str, validate: Optional[Callable[[str], bool]]) -> Optional[str]:
+        """Cached response for the key, dropping one that no longer validates"""
+        cached = await llm_cache.get(cache_key)
+        if cached is not None and validate is not None and not validate(cached):
+            await llm_cache.delete(cache_key)
+            return None
+        return cached
+    
+    async def generate_text(
+        self,
+        operation: str,
+        prompt: str,
+        generation_config: Optional[Dict[str, Any]] = None,
+        use_cache: bool = True,
+        validate: Optional[Callable[[str], bool]] = None
+    ) -> str:
+        """Generate free-form text; raises if no model is available or the call fails"""
+        if not await self._ensure_model():
+            raise RuntimeError("No AI model available")
+        response_text = await self._generate(
+            operation, prompt, generation_config or {}, use_cache=use_cache, validate=validate
+        )
+        return response_text.strip()
+    
+    async def stream_text(
+        self,
+        operation: str,
+        prompt: str,
+        generation_config: Optional[Dict[str, Any]] = None,
+        use_cache: bool = True,
+        validate: Optional[Callable[[str], bool]] = None
+    ) -> AsyncIterator[str]:
+        """Yield response text chunks as the model produces them; raises on failure.
+        
+        Only a complete stream (accepted by `validate`, if given) is cached.
+        """
+        if not await self._ensure_model():
+            raise RuntimeError("No AI model available")
+        generation_config = generation_config or {}
+        started_at = time.perf_counter()
+        
+        use_cache = use_cache and settings.LLM_CACHE_ENABLED
+        cache_key = llm_cache.make_key(self.model_name, operation, generation_config, prompt)
+        if use_cache:
+            cached = await self._cached_response(cache_key, validate)
+            if cached is not None:
+                record_llm_call(operation, self.model_name, time.perf_counter() - started_at, cache_hit=True)
+                yield cached
+                return
+        
+        try:
+            llm_circuit_breaker.check()
+        except CircuitOpenError:
+            record_llm_call(operation, self.model_name, time.perf_counter() - started_at, fallback=True)
+            raise
+        self._schedule_refresh()
+        try:
+            await llm_rate_limiter.acquire()
+        except asyncio.CancelledError:
+            llm_circuit_breaker.release()
+            raise
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        finished = object()
+        
+        usage = {}
+        
+        def produce():
+            # Runs in the dedicated pool; hands chunks back to the event loop
             try:
-                available_models = genai.list_models()
-                if available_models:
-                    first_model_name = available_models[0].name.split('/')[-1]
-                    self.model = genai.GenerativeModel(first_model_name)
-                    print(f"🔄 Using fallback model: {first_model_name}")
-                else:
-                    raise Exception("No models available in account")
+                response = self.model.generate_content(
+                    prompt,
+                    generation_config=genai.types.GenerationConfig(**generation_config),
+                    stream=True,
+                    request_options={"timeout": settings.LLM_CALL_TIMEOUT_SECONDS}
+                )
+                for chunk in response:
+                    if chunk.text:
+                        loop.call_soon_threadsafe(queue.put_nowait, chunk.text)
+                usage["metadata"] = getattr(response, "usage_metadata", None)
             except Exception as e:
-                print(f"💥 Critical: No models available - {e}")
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, finished)
+        
+        producer = loop.run_in_executor(llm_executor, produce)
+        parts = []
+        try:
+            while True:
+                # The timeout bounds the wait for each chunk, not the whole stream
+                item = await asyncio.wait_for(queue.get(), timeout=settings.LLM_CALL_TIMEOUT_SECONDS)
+                if item is finished:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                parts.append(item)
+                yield item
+            await producer
+        except (asyncio.CancelledError, GeneratorExit):
+            # Client went away: says nothing about the backend's health
+            llm_circuit_breaker.release()
+            raise
+        except Exception as e:
+            llm_circuit_breaker.record_failure(e)
+            record_llm_call(operation, self.model_name, time.perf_counter() - started_at, fallback=True)
+            raise
+        llm_circuit_breaker.record_success()
+        record_llm_call(operation, self.model_name, time.perf_counter() - started_at)
+        self._record_usage(operation, prompt, usage.get("metadata"), "".join(parts))
+        
+        text = "".join(parts)
+        if use_cache and text.strip() and (validate is None or validate(text)):
+            await llm_cache.set(cache_key, text, operation, self.model_name)
     
-    async def extract_action_items(self, email_content: str, prompt: str) -> List[str]:
+    async def extract_action_items(self, email_content: str, prompt: str, use_cache: bool = True) -> List[str]:
         """Extract action items from email using AI"""
-        if not self.model:
+        if not await self._ensure_model():
             print("❌ No AI model available - returning mock data")
             return self._get_mock_action_items(email_content)
         
+        email_content = await self.prepare_body("extract_action_items", email_content)
         full_prompt = f"""
         {prompt}
         
@@ -72,45 +396,309 @@ class LLMService:
         """
         
         try:
-            # Run in thread pool since genai is synchronous
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None, 
-                lambda: self.model.generate_content(
-                    full_prompt,
-                    generation_config=genai.types.GenerationConfig(
-                        temperature=0.3,
-                        top_p=0.8,
-                        top_k=40,
-                        max_output_tokens=500,
-                    )
-                )
+            response_text = await self._generate(
+                "extract_action_items",
+                full_prompt,
+                {"temperature": 0.3, "top_p": 0.8, "top_k": 40, "max_output_tokens": 500},
+                use_cache=use_cache,
+                validate=lambda text: self._parse_action_items(text) is not None
             )
             
             # Try to parse JSON response
-            response_text = response.text.strip()
+            response_text = response_text.strip()
             print(f"🤖 AI Response for action items: {response_text}")
             
+            items = self._parse_action_items(response_text)
+            if items is not None:
+                print(f"✅ Extracted {len(items)} action items")
+                return items
+            
             # Clean the response - remove markdown code blocks if present
             cleaned_text = response_text.replace('```json', '').replace('```', '').strip()
-            
             if cleaned_text.startswith('[') and cleaned_text.endswith(']'):
-                items = json.loads(cleaned_text)
-                if isinstance(items, list) and len(items) > 0:
-                    print(f"✅ Extracted {len(items)} action items")
-                    return items
-                else:
-                    print("⚠️ Empty action items list from AI")
-                    return self._get_mock_action_items(email_content)
-            else:
-                print("⚠️ AI didn't return valid JSON, using fallback extraction")
-                # Fallback: try to extract action items from text
-                return self._extract_from_text(cleaned_text)
+                print("⚠️ Empty or invalid action items list from AI")
+                return self._get_mock_action_items(email_content)
+            print("⚠️ AI didn't return valid JSON, using fallback extraction")
+            # Fallback: try to extract action items from text
+            return self._extract_from_text(cleaned_text)
                 
         except Exception as e:
             print(f"❌ Error extracting action items: {e}")
             return self._get_mock_action_items(email_content)
     
+    async def analyze_email(
+        self,
+        subject: str,
+        sender: str,
+        email_content: str,
+        action_items_prompt: str,
+        auto_reply_prompt: str,
+        use_cache: bool = True
+    ) -> Optional[EmailAnalysis]:
+        """Extract action items, auto-reply, summary, sentiment and tags in one AI call.
+        
+        Returns None when no model is available or the response does not
+        validate, so the caller can fall back to rule-based output.
+        """
+        if not await self._ensure_model():
+            print("❌ No AI model available - skipping fused analysis")
+            return None
+        
+        email_content = await self.prepare_body("analyze_email", email_content)
+        full_prompt = f"""
+        Analyze the following email and complete every task below.
+        
+        TASK 1 - ACTION ITEMS: {action_items_prompt}
+        TASK 2 - AUTO-REPLY: {auto_reply_prompt} Keep it professional, concise and under 100 words.
+        TASK 3 - SUMMARY: A concise 2-3 sentence overview of the email's core message.
+        TASK 4 - KEY POINTS: 3-5 of the most important pieces of information.
+        TASK 5 - SENTIMENT: Exactly one of: positive, negative, neutral, urgent.
+        TASK 6 - TAGS: Up to 5 short lowercase categories (e.g. meeting, project, follow-up).
+        
+        EMAIL:
+        Subject: {subject}
+        From: {sender}
+        Body: {email_content}
+        
+        IMPORTANT: Return ONLY a valid JSON object with exactly these keys:
+        {{
+            "action_items": ["action item 1", "action item 2"],
+            "auto_reply": "reply text",
+            "summary": "main summary text",
+            "key_points": ["point 1", "point 2", "point 3"],
+            "sentiment": "neutral",
+            "tags": ["tag1", "tag2"]
+        }}
+        """
+        
+        try:
+            response_text = await self._generate(
+                "analyze_email",
+                full_prompt,
+                {
+                    "temperature": 0.3,
+                    "top_p": 0.8,
+                    "top_k": 40,
+                    "max_output_tokens": 1000,
+                    "response_mime_type": "application/json",
+                },
+                use_cache=use_cache,
+                validate=lambda text: self.parse_analysis(text) is not None
+            )
+            
+            analysis = self.parse_analysis(response_text)
+            if analysis is None:
+                print("⚠️ AI analysis did not match the expected schema")
+            else:
+                print(f"✅ Analyzed email: {len(analysis.action_items)} action items, sentiment={analysis.sentiment}")
+            return analysis
+        except Exception as e:
+            print(f"❌ Error analyzing email: {e}")
+            return None
+    
+    def _batch_email_block(self, key: str, email: Dict[str, str]) -> str:
+        return f"""
+        EMAIL "{key}":
+        Subject: {email.get('subject', '')}
+        From: {email.get('sender', '')}
+        Body: {email['body']}
+        """
+    
+    def _parse_keyed_json(self, response_text: str) -> Dict[str, Any]:
+        """Parse a JSON object keyed by email key; returns {} if it is not one"""
+        cleaned_text = response_text.replace('```json', '').replace('```', '').strip()
+        start, end = cleaned_text.find('{'), cleaned_text.rfind('}')
+        if start == -1 or end <= start:
+            return {}
+        try:
+            data = json.loads(cleaned_text[start:end + 1])
+        except json.JSONDecodeError:
+            return {}
+        return data if isinstance(data, dict) else {}
+    
+    async def _generate_batch(
+        self,
+        operation: str,
+        instructions: str,
+        item_schema: str,
+        emails: Dict[str, Dict[str, str]],
+        use_cache: bool = True
+    ) -> Dict[str, Any]:
+        """One model call covering several emails; returns the raw per-key results.
+        
+        Emails are sent under short keys so the response cannot mix them up.
+        Raises on call failure; keys missing from the result are simply absent.
+        """
+        keys = {f"e{i}": email_id for i, email_id in enumerate(emails, 1)}
+        blocks = "".join(self._batch_email_block(key, emails[email_id]) for key, email_id in keys.items())
+        full_prompt = f"""
+        {instructions}
+        
+        Handle each email below independently.
+        {blocks}
+        
+        IMPORTANT: Return ONLY a valid JSON object with one entry per email key
+        ({", ".join(keys)}), each value having this shape:
+        {item_schema}
+        """
+        
+        response_text = await self._generate(
+            f"{operation}_batch",
+            full_prompt,
+            {
+                "temperature": 0.3,
+                "top_p": 0.8,
+                "top_k": 40,
+                "max_output_tokens": min(MAX_OUTPUT_TOKENS, BATCH_OUTPUT_TOKENS_PER_EMAIL[operation] * len(keys)),
+                "response_mime_type": "application/json",
+            },
+            use_cache=use_cache,
+            # Only a reply covering every email is worth replaying
+            validate=lambda text: set(keys) <= set(self._parse_keyed_json(text))
+        )
+        data = self._parse_keyed_json(response_text)
+        return {email_id: data[key] for key, email_id in keys.items() if key in data}
+    
+    async def _prepare_emails(self, operation: str, emails: Dict[str, Dict[str, str]]) -> Dict[str, Dict[str, str]]:
+        """Copies of the emails with bodies fitted to the operation's token budget"""
+        bodies = await asyncio.gather(*(self.prepare_body(operation, email["body"]) for email in emails.values()))
+        return {email_id: {**email, "body": body} for (email_id, email), body in zip(emails.items(), bodies)}
+    
+    def _batches(self, emails: Dict[str, Dict[str, str]]) -> List[Dict[str, Dict[str, str]]]:
+        packed = pack_by_token_budget(
+            [(email_id, email["body"]) for email_id, email in emails.items()],
+            settings.LLM_BATCH_TOKEN_BUDGET,
+            settings.LLM_BATCH_MAX_EMAILS
+        )
+        return [{email_id: emails[email_id] for email_id, _ in batch} for batch in packed]
+    
+    async def analyze_email_batch(
+        self,
+        emails: Dict[str, Dict[str, str]],
+        action_items_prompt: str,
+        auto_reply_prompt: str,
+        use_cache: bool = True
+    ) -> Dict[str, Optional[EmailAnalysis]]:
+        """Fused analysis for several emails ({id: {subject, sender, body}}) in as few calls as possible.
+        
+        Items that are missing or fail validation are retried with a single-email
+        call, so every id maps to the same result `analyze_email` would give.
+        """
+        if not await self._ensure_model():
+            print("❌ No AI model available - skipping fused analysis")
+            return {email_id: None for email_id in emails}
+        
+        emails = await self._prepare_emails("analyze_email", emails)
+        instructions = f"""
+        Analyze each of the following emails and complete every task below for each one.
+        
+        TASK 1 - ACTION ITEMS: {action_items_prompt}
+        TASK 2 - AUTO-REPLY: {auto_reply_prompt} Keep it professional, concise and under 100 words.
+        TASK 3 - SUMMARY: A concise 2-3 sentence overview of the email's core message.
+        TASK 4 - KEY POINTS: 3-5 of the most important pieces of information.
+        TASK 5 - SENTIMENT: Exactly one of: positive, negative, neutral, urgent.
+        TASK 6 - TAGS: Up to 5 short lowercase categories (e.g. meeting, project, follow-up).
+        """
+        item_schema = """{
+            "action_items": ["action item 1", "action item 2"],
+            "auto_reply": "reply text",
+            "summary": "main summary text",
+            "key_points": ["point 1", "point 2", "point 3"],
+            "sentiment": "neutral",
+            "tags": ["tag1", "tag2"]
+        }"""
+        
+        results: Dict[str, Optional[EmailAnalysis]] = {}
+        for batch in self._batches(emails):
+            try:
+                raw = await self._generate_batch("analyze_email", instructions, item_schema, batch, use_cache)
+            except Exception as e:
+                print(f"❌ Error in batched analysis of {len(batch)} emails: {e}")
+                raw = {}
+            for email_id, item in raw.items():
+                try:
+                    results[email_id] = EmailAnalysis(**item) if isinstance(item, dict) else None
+                except (ValidationError, TypeError):
+                    results[email_id] = None
+        
+        retry_ids = [email_id for email_id in emails if results.get(email_id) is None]
+        if retry_ids:
+            print(f"⚠️ Batched analysis: {len(retry_ids)}/{len(emails)} emails fell back to single calls")
+            singles = await asyncio.gather(*(
+                self.analyze_email(
+                    emails[email_id].get("subject", ""), emails[email_id].get("sender", ""),
+                    emails[email_id]["body"], action_items_prompt, auto_reply_prompt, use_cache=use_cache
+                )
+                for email_id in retry_ids
+            ))
+            results.update(zip(retry_ids, singles))
+        return results
+    
+    async def extract_action_items_batch(
+        self,
+        emails: Dict[str, Dict[str, str]],
+        prompt: str,
+        use_cache: bool = True
+    ) -> Dict[str, List[str]]:
+        """Action items for several emails ({id: {subject, sender, body}}), packed into few calls.
+        
+        Items that are missing or not a list of strings fall back to
+        `extract_action_items` for that email alone.
+        """
+        if not await self._ensure_model():
+            print("❌ No AI model available - returning mock data")
+            return {email_id: self._get_mock_action_items(email["body"]) for email_id, email in emails.items()}
+        
+        emails = await self._prepare_emails("extract_action_items", emails)
+        item_schema = '["action item 1", "action item 2", "action item 3"]'
+        results: Dict[str, List[str]] = {}
+        for batch in self._batches(emails):
+            try:
+                raw = await self._generate_batch("extract_action_items", prompt, item_schema, batch, use_cache)
+            except Exception as e:
+                print(f"❌ Error in batched action item extraction of {len(batch)} emails: {e}")
+                raw = {}
+            for email_id, items in raw.items():
+                if isinstance(items, list) and items and all(isinstance(item, str) for item in items):
+                    results[email_id] = items
+        
+        retry_ids = [email_id for email_id in emails if email_id not in results]
+        if retry_ids:
+            print(f"⚠️ Batched action items: {len(retry_ids)}/{len(emails)} emails fell back to single calls")
+            singles = await asyncio.gather(*(
+                self.extract_action_items(emails[email_id]["body"], prompt, use_cache=use_cache)
+                for email_id in retry_ids
+            ))
+            results.update(zip(retry_ids, singles))
+        return results
+    
+    def _parse_action_items(self, response_text: str) -> Optional[List[str]]:
+        """Non-empty JSON array of action items, or None"""
+        cleaned_text = response_text.replace('```json', '').replace('```', '').strip()
+        if not (cleaned_text.startswith('[') and cleaned_text.endswith(']')):
+            return None
+        try:
+            items = json.loads(cleaned_text)
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(items, list) or not items:
+            return None
+        return items
+    
+    def parse_analysis(self, response_text: str) -> Optional[EmailAnalysis]:
+        """Parse and validate a fused analysis JSON response"""
+        cleaned_text = response_text.replace('```json', '').replace('```', '').strip()
+        start, end = cleaned_text.find('{'), cleaned_text.rfind('}')
+        if start == -1 or end <= start:
+            return None
+        try:
+            data = json.loads(cleaned_text[start:end + 1])
+            if not isinstance(data, dict):
+                return None
+            return EmailAnalysis(**data)
+        except (json.JSONDecodeError, ValidationError, TypeError):
+            return None
+    
     def _extract_from_text(self, text: str) -> List[str]:
         """Extract action items from free text response"""
         lines = [line.strip() for line in text.split('\n') if line.strip()]
@@ -130,19 +718,7 @@ class LLMService:
     
     def _get_mock_action_items(self, email_content: str) -> List[str]:
         """Fallback mock action items based on email content"""
-        email_lower = email_content.lower()
-        action_items = []
-        
-        if any(word in email_lower for word in ['review', 'check', 'look at']):
-            action_items.append("Review the document")
-        if any(word in email_lower for word in ['schedule', 'meeting', 'call']):
-            action_items.append("Schedule a meeting")
-        if any(word in email_lower for word in ['update', 'progress', 'status']):
-            action_items.append("Provide updates")
-        if any(word in email_lower for word in ['deadline', 'friday', 'end of day']):
-            action_items.append("Meet the deadline")
-        if any(word in email_lower for word in ['feedback', 'comments', 'suggestions']):
-            action_items.append("Provide feedback")
+        action_items = get_keyword_classifier().classify(email_content).action_items
         
         # Add some generic items if none found
         if not action_items:
@@ -154,12 +730,13 @@ class LLMService:
         
         return action_items[:3]
     
-    async def generate_auto_reply(self, email_content: str, prompt: str) -> str:
+    async def generate_auto_reply(self, email_content: str, prompt: str, use_cache: bool = True) -> str:
         """Generate auto-reply draft using AI"""
-        if not self.model:
+        if not await self._ensure_model():
             print("❌ No AI model available - returning mock auto-reply")
             return "Thank you for your email. I have received it and will review it shortly."
         
+        email_content = await self.prepare_body("generate_auto_reply", email_content)
         full_prompt = f"""
         {prompt}
         
@@ -171,32 +748,51 @@ class LLMService:
         """
         
         try:
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: self.model.generate_content(
-                    full_prompt,
-                    generation_config=genai.types.GenerationConfig(
-                        temperature=0.2,
-                        top_p=0.7,
-                        max_output_tokens=200,
-                    )
-                )
+            response_text = await self._generate(
+                "generate_auto_reply",
+                full_prompt,
+                {"temperature": 0.2, "top_p": 0.7, "max_output_tokens": 200},
+                use_cache=use_cache
             )
-            reply = response.text.strip()
+            reply = response_text.strip()
             print(f"🤖 Generated auto-reply: {reply}")
             return reply
         except Exception as e:
             print(f"❌ Error generating auto-reply: {e}")
             return "Thank you for your email. I will review it and respond as soon as possible."
     
-    async def draft_email(self, context: str, recipient: str, subject: str) -> Dict[str, Any]:
+    async def draft_email(self, context: str, recipient: str, subject: str, use_cache: bool = True) -> Dict[str, Any]:
         """Draft a new email using AI"""
-        if not self.model:
+        if not await self._ensure_model():
             print("❌ No AI model available - returning mock draft")
             return self._get_mock_draft(context, recipient, subject)
         
-        prompt = f"""
+        try:
+            response_text = await self._generate(
+                "draft_email",
+                self._draft_prompt(context, recipient, subject),
+                DRAFT_GENERATION_CONFIG,
+                use_cache=use_cache
+            )
+            
+            return {
+                "body": response_text.strip(),
+                "suggested_follow_ups": list(DRAFT_FOLLOW_UPS)
+            }
+        except Exception as e:
+            print(f"❌ Error drafting email: {e}")
+            return self._get_mock_draft(context, recipient, subject)
+    
+    def stream_draft_email(self, context: str, recipient: str, subject: str) -> AsyncIterator[str]:
+        """Stream the body of a new AI-drafted email"""
+        return self.stream_text(
+            "draft_email",
+            self._draft_prompt(context, recipient, subject),
+            DRAFT_GENERATION_CONFIG
+        )
+    
+    def _draft_prompt(self, context: str, recipient: str, subject: str) -> str:
+        return f"""
         Draft a professional email with the following details:
         
         RECIPIENT: {recipient}
@@ -206,34 +802,9 @@ class LLMService:
         Please generate a complete, professional email with appropriate greeting, body content, and closing.
         Make it clear, concise, and actionable.
         """
-        
-        try:
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: self.model.generate_content(
-                    prompt,
-                    generation_config=genai.types.GenerationConfig(
-                        temperature=0.4,
-                        top_p=0.8,
-                        max_output_tokens=800,
-                    )
-                )
-            )
-            
-            return {
-                "body": response.text.strip(),
-                "suggested_follow_ups": [
-                    "Schedule a follow-up meeting",
-                    "Share additional documents if needed",
-                    "Confirm receipt and understanding"
-                ]
-            }
-        except Exception as e:
-            print(f"❌ Error drafting email: {e}")
-            return self._get_mock_draft(context, recipient, subject)
     
-    def _get_mock_draft(self, context: str, recipient: str, subject: str) -> Dict[str, Any]:
+    @staticmethod
+    def _get_mock_draft(context: str, recipient: str, subject: str) -> Dict[str, Any]:
         """Fallback mock email draft"""
         return {
             "body": f"""Dear {recipient.split('@')[0].title() if '@' in recipient else 'Recipient'},
@@ -251,4 +822,22 @@ Best regards,
                 "Provide additional information as needed",
                 "Coordinate next steps with relevant parties"
             ]
-        }
\ No newline at end of file
+        }
+
+_llm_service: Optional[LLMService] = None
+
+def get_llm_service() -> Optional[LLMService]:
+    """Application-wide LLMService, or None when no API key is configured"""
+    global _llm_service
+    if _llm_service is None and settings.GOOGLE_API_KEY:
+        _llm_service = LLMService()
+    return _llm_service
+
+async def init_llm_service() -> Optional[LLMService]:
+    """Create and warm up the shared LLMService at startup"""
+    llm_service = get_llm_service()
+    if llm_service is None:
+        print("⚠️ GOOGLE_API_KEY not set - AI features will use fallbacks")
+        return None
+    await llm_service.start()
+    return llm_service
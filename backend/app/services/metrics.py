@@ -0,0 +1,214 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+from pymongo import monitoring
+
+# Prometheus' default latency buckets (seconds)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    """Monotonic counter with labels"""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name, self.documentation, self.labels = name, documentation, tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, key)} {value}")
+        return lines
+
+class Histogram:
+    """Cumulative-bucket histogram with labels"""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name, self.documentation, self.labels = name, documentation, tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            series = self._series.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0])
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                total = series[len(self.buckets)]
+                for bound, count in zip(self.buckets, series):
+                    bucket_labels = _format_labels(self.labels, key, 'le="%s"' % bound)
+                    lines.append(f"{self.name}_bucket{bucket_labels} {count}")
+                inf_labels = _format_labels(self.labels, key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{inf_labels} {total}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {series[-1]}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {total}")
+        return lines
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ["method", "route", "status"]
+)
+llm_call_duration = Histogram(
+    "llm_call_duration_seconds", "LLM call latency (cache hits included)",
+    ["operation", "model", "cache_hit", "fallback"]
+)
+llm_input_tokens = Counter("llm_input_tokens_total", "Prompt tokens sent to the model", ["operation", "model"])
+llm_output_tokens = Counter("llm_output_tokens_total", "Tokens generated by the model", ["operation", "model"])
+mongo_command_duration = Histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency as reported by the driver",
+    ["command", "collection", "status"]
+)
+mongo_pool_checkout_failures = Counter(
+    "mongo_pool_checkout_failures_total", "Connection checkouts that failed (e.g. pool wait timeout)",
+    ["reason"]
+)
+dedup_lookups = Counter("dedup_lookups_total", "Near-duplicate lookups before LLM processing", ["result"])
+model_build_duration = Histogram(
+    "pydantic_model_build_seconds", "Time spent building Pydantic models from documents, per batch",
+    ["model"]
+)
+
+REGISTRY = [
+    http_request_duration, llm_call_duration, llm_input_tokens, llm_output_tokens,
+    mongo_command_duration, mongo_pool_checkout_failures, model_build_duration, dedup_lookups
+]
+
+@contextmanager
+def timed(histogram: Histogram, **labels):
+    """Observe the wall time of the enclosed block"""
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - started_at, **labels)
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+def record_llm_call(operation: str, model: str, seconds: float, cache_hit: bool = False, fallback: bool = False):
+    llm_call_duration.observe(
+        seconds, operation=operation, model=model or "none",
+        cache_hit=str(cache_hit).lower(), fallback=str(fallback).lower()
+    )
+
+class MongoCommandTimer(monitoring.CommandListener):
+    """Driver command listener feeding mongo_command_duration_seconds.
+
+    Motor runs commands on driver threads, so events arrive off the event loop;
+    the collection name is only on the started event and is kept until it finishes.
+    """
+
+    def __init__(self):
+        self._collections: Dict[Tuple[object, int], str] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        with self._lock:
+            self._collections[(event.connection_id, event.request_id)] = collection if isinstance(collection, str) else ""
+
+    def _finish(self, event, status: str):
+        with self._lock:
+            collection = self._collections.pop((event.connection_id, event.request_id), "")
+        mongo_command_duration.observe(
+            event.duration_micros / 1_000_000,
+            command=event.command_name, collection=collection, status=status
+        )
+
+    def succeeded(self, event):
+        self._finish(event, "ok")
+
+    def failed(self, event):
+        self._finish(event, "error")
+
+class MongoPoolMonitor(monitoring.ConnectionPoolListener):
+    """Driver pool listener keeping per-server connection counts for /health.
+
+    `waiting` counts checkouts started but not yet served: a persistently
+    non-zero value (with checkout failures) means the pool is exhausted.
+    """
+
+    def __init__(self):
+        self._pools: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _update(self, address, **deltas):
+        key = "%s:%s" % address if isinstance(address, tuple) else str(address)
+        with self._lock:
+            pool = self._pools.setdefault(key, {
+                "open": 0, "checked_out": 0, "waiting": 0, "max_checked_out": 0,
+                "checkout_failures": 0, "cleared": 0
+            })
+            for name, delta in deltas.items():
+                pool[name] = max(0, pool[name] + delta)
+            pool["max_checked_out"] = max(pool["max_checked_out"], pool["checked_out"])
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {address: dict(pool) for address, pool in self._pools.items()}
+
+    def pool_created(self, event):
+        self._update(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._update(event.address, cleared=1)
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._update(event.address, open=1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._update(event.address, open=-1)
+
+    def connection_check_out_started(self, event):
+        self._update(event.address, waiting=1)
+
+    def connection_check_out_failed(self, event):
+        self._update(event.address, waiting=-1, checkout_failures=1)
+        mongo_pool_checkout_failures.inc(reason=event.reason)
+
+    def connection_checked_out(self, event):
+        self._update(event.address, waiting=-1, checked_out=1)
+
+    def connection_checked_in(self, event):
+        self._update(event.address, checked_out=-1)
+
+mongo_pool_monitor = MongoPoolMonitor()
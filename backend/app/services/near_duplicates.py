@@ -0,0 +1,76 @@
+import hashlib
+import re
+from typing import List
+import numpy as np
+from app.config import settings
+from app.services.text_preprocessing import clean_body
+from app.services.metrics import dedup_lookups
+
+# 64-bit SimHash over word shingles, with LSH bands for candidate lookup.
+# Splitting the fingerprint into (max distance + 1) bands guarantees, by the
+# pigeonhole principle, that any two fingerprints within that Hamming distance
+# share at least one band exactly - so an indexed equality lookup finds them.
+FINGERPRINT_BITS = 64
+SHINGLE_SIZE = 3
+
+WORD_PATTERN = re.compile(r"\w+")
+DIGITS = re.compile(r"\d+")
+
+def _shingles(text: str) -> List[str]:
+    # Numbers vary between otherwise identical notifications (order ids, dates)
+    words = WORD_PATTERN.findall(DIGITS.sub("0", clean_body(text).lower()))
+    if len(words) <= SHINGLE_SIZE:
+        return [" ".join(words)] if words else []
+    return [" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)]
+
+def word_count(text: str) -> int:
+    return len(WORD_PATTERN.findall(text))
+
+def simhash(text: str) -> int:
+    """Unsigned 64-bit SimHash of the text's word shingles"""
+    shingles = _shingles(text)
+    if not shingles:
+        return 0
+    digests = b"".join(hashlib.blake2b(shingle.encode(), digest_size=8).digest() for shingle in shingles)
+    # One row of 64 bits (least significant first) per shingle; each bit votes +1 if set, -1 if not
+    bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    weights = 2 * bits.sum(axis=0, dtype=np.int64) - len(shingles)
+    return int(np.packbits(weights > 0, bitorder="little").view("<u8")[0])
+
+def hamming_distance(first: int, second: int) -> int:
+    return bin(first ^ second).count("1")
+
+def lsh_bands(fingerprint: int) -> List[str]:
+    """Band keys for the fingerprint, stored as an indexed array on the email"""
+    bands = min(FINGERPRINT_BITS, settings.DEDUP_MAX_DISTANCE + 1)
+    width = FINGERPRINT_BITS // bands
+    mask = (1 << width) - 1
+    return [f"{band}:{(fingerprint >> (band * width)) & mask:x}" for band in range(bands)]
+
+def to_int64(fingerprint: int) -> int:
+    """BSON has no unsigned 64-bit integers: store as two's complement"""
+    return fingerprint - (1 << 64) if fingerprint >= 1 << 63 else fingerprint
+
+def from_int64(value: int) -> int:
+    return value & ((1 << 64) - 1)
+
+_dedup_stats = {"lookups": 0, "hits": 0}
+
+def record_lookup(hit: bool):
+    _dedup_stats["lookups"] += 1
+    _dedup_stats["hits"] += int(hit)
+    dedup_lookups.inc(result="hit" if hit else "miss")
+
+def get_dedup_stats() -> dict:
+    lookups = _dedup_stats["lookups"]
+    return {
+        **_dedup_stats,
+        "hit_rate": round(_dedup_stats["hits"] / lookups, 3) if lookups else 0.0
+    }
+
+def fingerprint_fields(body: str) -> dict:
+    """Fields stored on an email for near-duplicate lookup (empty for very short bodies)"""
+    if word_count(body) < settings.DEDUP_MIN_WORDS:
+        return {}
+    fingerprint = simhash(body)
+    return {"simhash": to_int64(fingerprint), "simhash_bands": lsh_bands(fingerprint)}
@@ -0,0 +1,30 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+from bson import ObjectId
+
+def encode_cursor(timestamp: datetime, document_id) -> str:
+    """Opaque keyset cursor for the last item of a page sorted by (timestamp field, _id)"""
+    payload = json.dumps({"ts": timestamp.isoformat(), "id": str(document_id)})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    """Inverse of encode_cursor; raises ValueError for malformed cursors"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(payload["ts"]), ObjectId(payload["id"])
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
+
+def keyset_filter(cursor: Optional[str], descending: bool = True, field: str = "timestamp") -> dict:
+    """Mongo filter selecting documents after the cursor position on (field, _id)"""
+    if not cursor:
+        return {}
+    timestamp, document_id = decode_cursor(cursor)
+    op = "$lt" if descending else "$gt"
+    return {"$or": [
+        {field: {op: timestamp}},
+        {field: timestamp, "_id": {op: document_id}}
+    ]}
@@ -1,24 +1,45 @@
-from typing import List
+from typing import Dict, List, Optional, Tuple
 from app.models.email_models import Email, EmailStatus
-from app.services.llm_service import LLMService
+from app.models.analysis_models import EmailAnalysis
+from app.models.prompt_models import PromptConfig
+from app.services.llm_service import get_llm_service
+from app.services.text_preprocessing import estimate_tokens
+from app.services.keyword_classifier import get_keyword_classifier
+from app.services.near_duplicates import fingerprint_fields, from_int64, record_lookup
 from app.services.prompt_service import PromptService
 from app.services.email_service import EmailService
+from app.services.job_service import JobService
 import asyncio
+import random
+import time
 from datetime import datetime
 import json
-import google.generativeai as genai  # Changed from 'import genai'
 from app.config import settings  # Import settings properly
 
+class LeaseLostError(RuntimeError):
+    """The worker's lease on an email expired and the email was handed to another worker"""
+
+# Set when a job is queued, so the inline job driver starts on it without waiting for its next poll
+_jobs_queued = asyncio.Event()
+
+def notify_job_queued():
+    _jobs_queued.set()
+
 class ProcessingService:
-    def __init__(self):
+    def __init__(self, batch_mode: Optional[bool] = None):
+        # Batch mode packs several claimed emails into one LLM request (bulk backfills)
+        self.batch_mode = settings.LLM_BATCH_MODE if batch_mode is None else batch_mode
         self._llm_service = None
         self._prompt_service = None
         self._email_service = None
+        self._job_service = None
     
     @property
     def llm_service(self):
         if self._llm_service is None:
-            self._llm_service = LLMService()
+            self._llm_service = get_llm_service()
+            if self._llm_service is None:
+                raise ValueError("GOOGLE_API_KEY not found in environment variables")
         return self._llm_service
     
     @property
@@ -33,93 +54,471 @@ class ProcessingService:
             self._email_service = EmailService()
         return self._email_service
     
-    async def process_single_email(self, email: Email) -> Email:
+    @property
+    def job_service(self):
+        if self._job_service is None:
+            self._job_service = JobService()
+        return self._job_service
+    
+    async def process_single_email(self, email: Email, prompts: Optional[PromptConfig] = None) -> Email:
         """Process a single email through the AI pipeline"""
         try:
+            return await self._run_pipeline(email, prompts)
+        except LeaseLostError:
+            return email
+        except Exception as e:
+            try:
+                return await self._mark_failed(email, e)
+            except LeaseLostError:
+                return email
+    
+    async def _run_pipeline(
+        self,
+        email: Email,
+        prompts: Optional[PromptConfig] = None,
+        precomputed: Optional[dict] = None
+    ) -> Email:
+        """Run the AI pipeline for one email, raising on failure.
+        
+        `precomputed` holds stage results already produced by a batched call
+        ("analysis" or "action_items") and the near-duplicate lookup result
+        ("duplicate"); those steps are not run again.
+        """
+        if prompts is None:
             prompts = await self.prompt_service.get_prompts()
-            
+        precomputed = precomputed or {}
+        
+        if "duplicate" in precomputed:
+            duplicate = precomputed["duplicate"]
+        else:
+            duplicate = await self._find_duplicate(email, prompts)
+        
+        analysis = None
+        if duplicate is not None:
+            # Near-identical to an email processed with the same prompts: reuse its results
+            action_items = duplicate.get("action_items", [])
+            auto_reply = duplicate.get("metadata", {}).get("auto_reply_generated")
+        elif settings.USE_FUSED_ANALYSIS:
+            # One structured call for action items, auto-reply and summary
+            analysis = precomputed.get("analysis") or await self.analyze_email(email, prompts)
+            action_items = analysis.action_items
+            auto_reply = analysis.auto_reply
+        else:
             # Extract action items
-            action_items = await self.llm_service.extract_action_items(
-                email.body, prompts.action_items
-            )
+            action_items = precomputed.get("action_items")
+            if action_items is None:
+                action_items = await self.llm_service.extract_action_items(
+                    email.body, prompts.action_items
+                )
             
             # Generate auto-reply (store for potential use)
             auto_reply = await self.llm_service.generate_auto_reply(
                 email.body, prompts.auto_reply
             )
-            
-            # Update email with processed data
-            update_data = {
-                "action_items": action_items,
-                "status": EmailStatus.PROCESSED,
-                "processed_at": datetime.now(),
-                "metadata": {
-                    "auto_reply_generated": auto_reply,
-                    "processed_with_prompts": {
-                        "action_items_prompt": prompts.action_items[:100] + "...",
-                        "auto_reply_prompt": prompts.auto_reply[:100] + "..."
-                    }
-                }
+        
+        # Update email with processed data
+        update_data = {
+            "action_items": action_items,
+            "status": EmailStatus.PROCESSED,
+            "processed_at": datetime.now(),
+            "metadata": {
+                "auto_reply_generated": auto_reply,
+                "prompt_version": prompts.version,
+                "prompt_versions": prompts.stage_versions()
             }
-            
-            # Determine priority based on action items and content
-            if any(urgent in email.body.lower() for urgent in ['urgent', 'asap', 'immediately']):
-                update_data["priority"] = "high"
-            elif action_items:
-                update_data["priority"] = "medium"
-            else:
-                update_data["priority"] = "low"
-            
-            # Add tags based on content
-            tags = []
-            if any(word in email.body.lower() for word in ['meeting', 'schedule', 'calendar']):
-                tags.append("meeting")
-            if any(word in email.body.lower() for word in ['project', 'timeline', 'deadline']):
-                tags.append("project")
-            if action_items:
-                tags.append("action-required")
-            
-            update_data["tags"] = tags
-            
-            return await self.email_service.update_email(str(email.id), update_data)
-            
-        except Exception as e:
-            print(f"Error processing email {email.id}: {e}")
-            # Mark as processed even if failed to avoid reprocessing
-            await self.email_service.update_email(str(email.id), {
-                "status": EmailStatus.PROCESSED,
-                "processed_at": datetime.now(),
-                "action_items": ["Error processing email"]
-            })
-            return email
+        }
+        
+        # Priority and rule tags always come from this email's own text
+        update_data["priority"], tags = self._priority_and_tags(email, action_items)
+        
+        if analysis and analysis.fallback:
+            # Summary fields stay empty so get_or_create_summary asks the AI again later,
+            # and the flag keeps these results out of near-duplicate reuse
+            update_data["metadata"]["fallback"] = True
+        elif analysis:
+            update_data["ai_summary"] = analysis.summary
+            update_data["key_points"] = analysis.key_points
+            update_data["sentiment"] = analysis.sentiment
+            tags.extend(tag for tag in analysis.tags if tag not in tags)
+        elif duplicate is not None:
+            update_data["metadata"]["duplicate_of"] = str(duplicate["_id"])
+            for field in ("ai_summary", "key_points", "sentiment"):
+                if duplicate.get(field):
+                    update_data[field] = duplicate[field]
+            rule_tags = get_keyword_classifier().rule_tags
+            tags.extend(tag for tag in duplicate.get("tags", []) if tag not in rule_tags and tag not in tags)
+        
+        update_data["tags"] = tags
+        if email.simhash is None:
+            # Emails ingested before fingerprinting become reuse candidates from now on
+            update_data.update(await asyncio.get_running_loop().run_in_executor(None, fingerprint_fields, email.body))
+        
+        # Release the worker lease along with the results
+        update_data["claimed_by"] = None
+        update_data["lease_expires_at"] = None
+        update_data["last_error"] = None
+        
+        # A claimed email is only written while this worker still holds its lease
+        only_if = self.email_service.lease_filter(email.claimed_by) if email.claimed_by else None
+        updated_email = await self.email_service.update_email(str(email.id), update_data, only_if=only_if)
+        if updated_email is None:
+            if only_if and await self.email_service.get_email(str(email.id)) is not None:
+                raise LeaseLostError(f"Lease on email {email.id} expired before its results were stored")
+            raise RuntimeError(f"Failed to store results for email {email.id}")
+        return updated_email
+    
+    def _priority_and_tags(self, email: Email, action_items: List[str]) -> Tuple[str, List[str]]:
+        """Rule-based priority and tags from the email body and its action items"""
+        classification = get_keyword_classifier().classify(email.body, action_items)
+        return classification.priority, classification.tags
     
-    async def process_email_batch(self, emails: List[Email]) -> List[Email]:
-        """Process multiple emails with progress tracking"""
-        processed_emails = []
+    async def reprocess_email(self, email: Email, prompts: PromptConfig) -> Email:
+        """Rerun only the pipeline stages whose prompt changed since the email was processed"""
+        processed_versions = email.metadata.get("prompt_versions", {})
+        current_versions = prompts.stage_versions()
+        update_data = {
+            "metadata.prompt_version": prompts.version,
+            "metadata.prompt_versions": current_versions,
+            "claimed_by": None,
+            "reprocess_lease_expires_at": None,
+            "reprocess_failures": 0,
+            "reprocess_failed_key": None,
+            "last_error": None
+        }
         
-        for i, email in enumerate(emails):
-            if email.status != EmailStatus.PROCESSED:
-                processed_email = await self.process_single_email(email)
-                processed_emails.append(processed_email)
-            
-            # Optional: Add small delay to avoid rate limiting
-            await asyncio.sleep(0.5)
+        if processed_versions.get("action_items") != current_versions["action_items"]:
+            action_items = await self.llm_service.extract_action_items(email.body, prompts.action_items)
+            priority, rule_tags = self._priority_and_tags(email, action_items)
+            # Keep AI-assigned tags, refresh the ones derived from action items
+            rule_tag_names = get_keyword_classifier().rule_tags
+            ai_tags = [tag for tag in email.tags if tag not in rule_tag_names]
+            update_data["action_items"] = action_items
+            update_data["priority"] = priority
+            update_data["tags"] = rule_tags + [tag for tag in ai_tags if tag not in rule_tags]
         
-        return processed_emails
-
+        if processed_versions.get("auto_reply") != current_versions["auto_reply"]:
+            update_data["metadata.auto_reply_generated"] = await self.llm_service.generate_auto_reply(
+                email.body, prompts.auto_reply
+            )
+        
+        updated_email = await self.email_service.update_email(str(email.id), update_data)
+        if updated_email is None:
+            raise RuntimeError(f"Failed to store reprocessed results for email {email.id}")
+        return updated_email
+    
+    async def run_reprocess_job(self, job_id: str, worker_id: str, concurrency: Optional[int] = None) -> int:
+        """Reprocess emails whose stored prompt versions are stale, newest first.
+        
+        Claims use a short lease on the email, so several workers can share the
+        job. Each pass skips emails that already failed in it; failing emails
+        are retried by later passes, with a growing backoff in between, until
+        they have failed PROCESSING_MAX_FAILURES times and are counted as
+        failed. The job completes once no claimable stale email is left.
+        Returns the number of emails handled here.
+        """
+        await self.job_service.mark_running(job_id)
+        succeeded, failed, handled = 0, 0, 0
+        
+        async def worker(prompts: PromptConfig, versions: Dict[str, int], failed_ids: List[str]):
+            nonlocal succeeded, failed, handled
+            while True:
+                email = await self.email_service.claim_stale_email(versions, worker_id, exclude_ids=failed_ids)
+                if email is None:
+                    return
+                handled += 1
+                try:
+                    await self.reprocess_email(email, prompts)
+                except Exception as e:
+                    print(f"Error reprocessing email {email.id}: {e}")
+                    # Not retried again in this pass; later passes retry until the limit
+                    failed_ids.append(str(email.id))
+                    error = str(e) or type(e).__name__
+                    failures = await self.email_service.release_stale_claim(str(email.id), error, versions)
+                    if failures >= settings.PROCESSING_MAX_FAILURES:
+                        failed += 1
+                        await self.job_service.record_outcome(
+                            job_id, str(email.id), False, error=error, worker_id=worker_id
+                        )
+                    continue
+                succeeded += 1
+                await self.job_service.record_outcome(job_id, str(email.id), True, worker_id=worker_id)
+        
+        attempt = 0
+        while True:
+            # Prompts are re-read each pass so a prompt edit mid-job is picked up
+            prompts = await self.prompt_service.get_prompts()
+            versions = prompts.stage_versions()
+            failed_ids: List[str] = []
+            await asyncio.gather(*(
+                worker(prompts, versions, failed_ids)
+                for _ in range(concurrency or settings.PROCESSING_CONCURRENCY)
+            ))
+            # Only permanently failed emails (or none) left: nothing more to do
+            if await self.email_service.count_stale_emails(versions, claimable=True) == 0:
+                await self.job_service.complete_job(job_id)
+                break
+            # Emails that failed transiently (or are leased by another worker) remain
+            delay = min(settings.PROCESSING_RETRY_BASE_DELAY * (2 ** attempt), settings.EMAIL_LEASE_SECONDS)
+            await asyncio.sleep(delay + random.uniform(0, settings.PROCESSING_RETRY_BASE_DELAY))
+            attempt += 1
+        if handled:
+            print(f"✅ Worker {worker_id} reprocessed {succeeded} emails ({failed} failed) for job {job_id}")
+        return handled
+    
+    async def run_any_job(self, job, worker_id: str, concurrency: Optional[int] = None) -> int:
+        """Dispatch a job to the runner for its kind"""
+        if job.kind == "reprocess":
+            return await self.run_reprocess_job(str(job.id), worker_id, concurrency)
+        return await self.run_job(str(job.id), worker_id, concurrency)
+    
+    async def run_active_jobs(self, worker_id: str, concurrency: Optional[int] = None) -> int:
+        """Work on the oldest active job that has something claimable.
+        
+        A job whose remaining emails are all leased elsewhere handles nothing,
+        so the next job is tried instead of waiting behind it. Returns the
+        number of emails handled.
+        """
+        await self.reap_expired_leases()
+        await self.finalize_orphaned_jobs()
+        for job in await self.job_service.find_active_jobs():
+            handled = await self.run_any_job(job, worker_id, concurrency)
+            if handled:
+                return handled
+        return 0
+    
+    async def drive_jobs(self, worker_id: str, poll_interval: Optional[float] = None):
+        """Run active jobs inside the API process until cancelled (inline mode).
+        
+        Picks up jobs left by a previous process at startup, newly queued jobs
+        as soon as notify_job_queued() is called, and, on each poll, emails
+        whose expired leases returned them to a job.
+        """
+        poll_interval = poll_interval or settings.WORKER_POLL_INTERVAL
+        while True:
+            _jobs_queued.clear()
+            try:
+                handled = await self.run_active_jobs(worker_id)
+            except Exception as e:
+                print(f"Error running jobs: {e}")
+                handled = 0
+            if not handled:
+                try:
+                    await asyncio.wait_for(_jobs_queued.wait(), timeout=poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+    
+    async def finalize_orphaned_jobs(self) -> int:
+        """Give jobs whose creator died before set_total a total, so they can complete"""
+        jobs = await self.job_service.find_orphaned_jobs(settings.JOB_SETUP_TIMEOUT_SECONDS)
+        for job in jobs:
+            pending = await self.email_service.count_job_pending(str(job.id))
+            await self.job_service.finalize_total(str(job.id), pending)
+        if jobs:
+            print(f"♻️ Finalized {len(jobs)} jobs left without a total")
+        return len(jobs)
+    
+    async def analyze_email(self, email: Email, prompts) -> EmailAnalysis:
+        """Run the fused analysis, falling back to rule-based output if the AI call fails"""
+        analysis = await self.llm_service.analyze_email(
+            email.subject, email.sender, email.body,
+            prompts.action_items, prompts.auto_reply
+        )
+        if analysis is not None:
+            return analysis
+        return self._fallback_analysis(email)
+    
+    def _fallback_analysis(self, email: Email) -> EmailAnalysis:
+        """Rule-based stand-in for the fused analysis"""
+        fallback = self._generate_fallback_summary(email)
+        return EmailAnalysis(
+            action_items=self.llm_service._get_mock_action_items(email.body),
+            auto_reply="Thank you for your email. I will review it and respond as soon as possible.",
+            summary=fallback["summary"] or email.subject,
+            key_points=fallback["key_points"],
+            sentiment=fallback["sentiment"],
+            tags=[],
+            fallback=True
+        )
+    
+    async def _mark_failed(self, email: Email, error: Exception) -> Email:
+        """Record a processing failure; the email is retried by a later run until PROCESSING_MAX_FAILURES"""
+        print(f"Error processing email {email.id}: {error}")
+        only_if = self.email_service.lease_filter(email.claimed_by) if email.claimed_by else None
+        document = await self.email_service.mark_failed(
+            str(email.id), str(error) or type(error).__name__, only_if=only_if
+        )
+        if document is None and only_if:
+            raise LeaseLostError(f"Lease on email {email.id} expired before its failure was recorded")
+        if document:
+            email = Email(**self.email_service._convert_objectid_to_str(document))
+        return email
+    
+    async def reap_expired_leases(self) -> int:
+        """Return emails whose worker lease expired to their job's queue"""
+        released = 0
+        for document in await self.email_service.find_expired_leases():
+            email = await self.email_service.release_expired_lease(str(document["_id"]))
+            if email is None:
+                continue
+            released += 1
+            # Out of retries: the job will not see this email again, so count it as failed now
+            if email.get("job_id") and email["retry_count"] >= settings.PROCESSING_MAX_FAILURES:
+                await self.job_service.record_outcome(
+                    email["job_id"], str(email["_id"]), False, error=email["last_error"]
+                )
+        if released:
+            print(f"♻️ Released {released} emails with expired processing leases")
+        return released
+    
+    async def _process_with_retry(
+        self,
+        email: Email,
+        prompts: PromptConfig,
+        precomputed: Optional[dict] = None
+    ) -> Tuple[Email, Optional[Exception]]:
+        """Process an email, retrying transient failures with exponential backoff.
+        
+        Returns the resulting email and the final error, if every attempt failed.
+        A LeaseLostError means another worker owns the email now: nothing is
+        written and the caller must not count an outcome for it.
+        """
+        max_retries = settings.PROCESSING_MAX_RETRIES
+        for attempt in range(max_retries + 1):
+            # Keep the lease alive across retries and backoff, and stop early if it was lost
+            if email.claimed_by and not await self.email_service.renew_lease(str(email.id), email.claimed_by):
+                return email, LeaseLostError(f"Lease on email {email.id} expired")
+            try:
+                return await self._run_pipeline(email, prompts, precomputed), None
+            except LeaseLostError as e:
+                return email, e
+            except Exception as e:
+                if attempt >= max_retries:
+                    try:
+                        return await self._mark_failed(email, e), e
+                    except LeaseLostError as lost:
+                        return email, lost
+                delay = settings.PROCESSING_RETRY_BASE_DELAY * (2 ** attempt)
+                delay += random.uniform(0, settings.PROCESSING_RETRY_BASE_DELAY)
+                print(f"⚠️ Retrying email {email.id} in {delay:.1f}s (attempt {attempt + 1}/{max_retries}): {e}")
+                await asyncio.sleep(delay)
+    
+    async def _find_duplicate(self, email: Email, prompts: PromptConfig) -> Optional[dict]:
+        """Processed near-duplicate whose results can be reused for this email, if any"""
+        if not settings.DEDUP_ENABLED:
+            return None
+        if email.simhash is not None:
+            fingerprint, bands = from_int64(email.simhash), email.simhash_bands
+        else:
+            # Emails stored before fingerprinting: hash off the event loop
+            fields = await asyncio.get_running_loop().run_in_executor(None, fingerprint_fields, email.body)
+            if not fields:
+                return None
+            fingerprint, bands = from_int64(fields["simhash"]), fields["simhash_bands"]
+        if not bands:
+            return None
+        
+        duplicate = await self.email_service.find_near_duplicate(
+            str(email.id), fingerprint, bands, prompts.stage_versions()
+        )
+        record_lookup(duplicate is not None)
+        return duplicate
+    
+    async def _precompute_batch(self, emails: List[Email], prompts: PromptConfig) -> Dict[str, dict]:
+        """Run the LLM stage for several claimed emails in packed requests (batch mode only)"""
+        if not self.batch_mode or len(emails) < 2:
+            return {}
+        payload = {
+            str(email.id): {"subject": email.subject, "sender": email.sender, "body": email.body}
+            for email in emails
+        }
+        if settings.USE_FUSED_ANALYSIS:
+            analyses = await self.llm_service.analyze_email_batch(payload, prompts.action_items, prompts.auto_reply)
+            return {
+                str(email.id): {"analysis": analyses.get(str(email.id)) or self._fallback_analysis(email)}
+                for email in emails
+            }
+        action_items = await self.llm_service.extract_action_items_batch(payload, prompts.action_items)
+        return {email_id: {"action_items": items} for email_id, items in action_items.items()}
+    
+    async def _process_claimed(self, emails: List[Email], prompts: PromptConfig) -> List[Tuple[Email, Optional[Exception]]]:
+        """Process emails this worker already holds, sharing one batched LLM stage when enabled.
+        
+        Near-duplicates of processed emails are resolved first and left out of the batch.
+        """
+        duplicates = await asyncio.gather(*(self._find_duplicate(email, prompts) for email in emails))
+        fresh = [email for email, duplicate in zip(emails, duplicates) if duplicate is None]
+        precomputed = await self._precompute_batch(fresh, prompts)
+        return await asyncio.gather(*(
+            self._process_with_retry(
+                email, prompts, {**precomputed.get(str(email.id), {}), "duplicate": duplicate}
+            )
+            for email, duplicate in zip(emails, duplicates)
+        ))
+    
+    def _claim_group_size(self) -> int:
+        return settings.LLM_BATCH_MAX_EMAILS if self.batch_mode else 1
+    
+    async def _claim_job_emails(self, job_id: str, worker_id: str) -> List[Email]:
+        """Claim the next email of a job, or in batch mode as many as fit one packed request"""
+        claimed: List[Email] = []
+        tokens = 0
+        while len(claimed) < self._claim_group_size() and tokens < settings.LLM_BATCH_TOKEN_BUDGET:
+            email = await self.email_service.claim_email(job_id, worker_id)
+            if email is None:
+                break
+            claimed.append(email)
+            tokens += estimate_tokens(email.body)
+        return claimed
+    
+    async def run_job(self, job_id: str, worker_id: str, concurrency: Optional[int] = None) -> int:
+        """Claim and process a job's emails until none are left unclaimed.
+        
+        Emails are claimed one at a time with an atomic update, so any number of
+        workers (in this or other processes) can run the same job without
+        processing an email twice. Returns the number of emails handled here.
+        """
+        await self.reap_expired_leases()
+        await self.job_service.mark_running(job_id)
+        prompts = await self.prompt_service.get_prompts()
+        handled = 0
+        
+        async def worker():
+            nonlocal handled
+            while True:
+                emails = await self._claim_job_emails(job_id, worker_id)
+                if not emails:
+                    return
+                results = await self._process_claimed(emails, prompts)
+                for email, (_, error) in zip(emails, results):
+                    if isinstance(error, LeaseLostError):
+                        # The worker that re-claimed the email records its outcome
+                        continue
+                    await self.job_service.record_outcome(
+                        job_id, str(email.id), error is None,
+                        error=str(error) if error else None,
+                        worker_id=worker_id
+                    )
+                handled += len(emails)
+        
+        started_at = time.monotonic()
+        await asyncio.gather(*(worker() for _ in range(concurrency or settings.PROCESSING_CONCURRENCY)))
+        if handled:
+            print(f"✅ Worker {worker_id} processed {handled} emails for job {job_id} in {time.monotonic() - started_at:.1f}s")
+        elif await self.email_service.count_job_pending(job_id) == 0:
+            # Its emails were finished elsewhere (e.g. processed individually): nothing can complete it
+            await self.job_service.complete_job(job_id)
+        return handled
+    
     async def generate_summary(self, email):
         """
         Generate AI-powered summary for an email
         """
         try:
             # Check if API key is available
-            api_key = getattr(settings, 'GOOGLE_API_KEY', None) or getattr(settings, 'GOOGLE_API_KEY', None)
-            if not api_key:
+            if not settings.GOOGLE_API_KEY:
                 return self._generate_fallback_summary(email)
             
-            # Configure and use Gemini
-            genai.configure(api_key=api_key)
-            model = genai.GenerativeModel('gemini-2.5-flash')
+            body = await self.llm_service.prepare_body("generate_summary", email.body)
             
             prompt = f"""
             Analyze the following email and provide a comprehensive summary with these components:
@@ -133,7 +532,7 @@ class ProcessingService:
             EMAIL CONTENT:
             Subject: {email.subject}
             From: {email.sender}
-            Body: {email.body}
+            Body: {body}
             
             Please format your response as JSON:
             {{
@@ -145,8 +544,7 @@ class ProcessingService:
             }}
             """
             
-            response = model.generate_content(prompt)
-            response_text = response.text.strip()
+            response_text = await self.llm_service.generate_text("generate_summary", prompt)
             
             # Extract JSON from response
             try:
@@ -167,6 +565,39 @@ class ProcessingService:
             print(f"Error generating AI summary: {str(e)}")
             return self._generate_fallback_summary(email)
     
+    def _stored_summary(self, email: Email) -> dict:
+        """Build summary data from fields already persisted on the email"""
+        return {
+            'summary': email.ai_summary,
+            'key_points': email.key_points,
+            'action_items': email.action_items,
+            'sentiment': email.sentiment or 'neutral',
+            'tags': email.tags
+        }
+    
+    async def get_or_create_summary(self, email: Email) -> dict:
+        """Return the stored summary, generating and persisting it on first use"""
+        if email.ai_summary:
+            return self._stored_summary(email)
+        
+        summary_data = await self.generate_summary(email)
+        # Rule-based fallbacks are not stored so the AI summary is retried later
+        if not summary_data.pop('fallback', False):
+            await self.email_service.save_summary(str(email.id), summary_data)
+        return summary_data
+    
+    async def get_or_create_summaries(self, emails: List[Email]) -> List[dict]:
+        """Summaries for several emails, generating the missing ones concurrently"""
+        semaphore = asyncio.Semaphore(settings.PROCESSING_CONCURRENCY)
+        
+        async def summarize(email: Email) -> dict:
+            if email.ai_summary:
+                return self._stored_summary(email)
+            async with semaphore:
+                return await self.get_or_create_summary(email)
+        
+        return await asyncio.gather(*(summarize(email) for email in emails))
+    
     def _parse_text_response(self, text):
         """Parse text response when JSON parsing fails"""
         # Simple text parsing logic
@@ -212,38 +643,21 @@ class ProcessingService:
     def _generate_fallback_summary(self, email):
         """Generate a basic summary when AI is not available"""
         # Simple rule-based summary generation
-        body_lower = email.body.lower()
-        
-        # Determine sentiment based on keywords
-        sentiment = "neutral"
-        positive_words = ['great', 'excellent', 'good', 'thanks', 'thank you', 'appreciate']
-        negative_words = ['problem', 'issue', 'concern', 'urgent', 'asap', 'immediately']
-        urgent_words = ['urgent', 'asap', 'immediately', 'emergency', 'important']
-        
-        if any(word in body_lower for word in urgent_words):
-            sentiment = "urgent"
-        elif any(word in body_lower for word in positive_words):
-            sentiment = "positive"
-        elif any(word in body_lower for word in negative_words):
-            sentiment = "negative"
+        classifier = get_keyword_classifier()
+        sentiment = classifier.classify(email.body).sentiment
         
         # Generate basic summary
         words = email.body.split()[:20]  # First 20 words
         summary = " ".join(words) + ("..." if len(email.body.split()) > 20 else "")
         
         # Extract potential action items (lines with action verbs)
-        action_verbs = ['please', 'need', 'required', 'should', 'must', 'action']
-        action_items = []
-        for line in email.body.split('.'):
-            if any(verb in line.lower() for verb in action_verbs):
-                action_items.append(line.strip())
-                if len(action_items) >= 2:
-                    break
+        action_items = classifier.sentences_with(email.body, "action_verbs", limit=2)
         
         return {
             "summary": summary,
             "key_points": [f"From: {email.sender}", f"Subject: {email.subject}"],
             "action_items": action_items[:2],
             "sentiment": sentiment,
-            "tags": [email.priority, "email"]  # Basic tags
+            "tags": [email.priority, "email"],  # Basic tags
+            "fallback": True
         }
\ No newline at end of file
@@ -1,7 +1,24 @@
+import asyncio
+import time
+from typing import Optional
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
 from app.database import get_database
-from app.models.prompt_models import PromptConfig, PromptUpdate
+from app.models.prompt_models import PromptConfig, PromptUpdate, PROMPT_TYPES
 from app.config import settings
-from bson import ObjectId
+
+# Process-wide prompt cache. Other workers' changes are picked up through the
+# change-stream watcher when available, otherwise by re-checking the version counter.
+_prompt_cache = {"config": None, "checked_at": 0.0}
+
+def invalidate_prompt_cache():
+    _prompt_cache["config"] = None
+    _prompt_cache["checked_at"] = 0.0
+
+def _cache_prompts(prompts: PromptConfig) -> PromptConfig:
+    _prompt_cache["config"] = prompts
+    _prompt_cache["checked_at"] = time.monotonic()
+    return prompts
 
 class PromptService:
     def __init__(self):
@@ -26,57 +43,92 @@ class PromptService:
             document['_id'] = str(document['_id'])
         return document
     
+    def _default_prompts(self) -> dict:
+        return {
+            "action_items": settings.DEFAULT_PROMPTS["action_items"],
+            "auto_reply": settings.DEFAULT_PROMPTS["auto_reply"]
+        }
+    
     async def get_prompts(self) -> PromptConfig:
-        """Get current prompt configurations"""
+        """Get current prompt configurations (served from the process-wide cache)"""
+        cached: Optional[PromptConfig] = _prompt_cache["config"]
+        if cached is not None:
+            if time.monotonic() - _prompt_cache["checked_at"] < settings.PROMPT_CACHE_CHECK_SECONDS:
+                return cached
+            # Cheap staleness check: only the version counter crosses the wire
+            current = await self.collection.find_one({}, {"version": 1})
+            if current and current.get("version", 0) == cached.version:
+                return _cache_prompts(cached)
+        
         prompts = await self.collection.find_one({})
         
         if not prompts:
             # Initialize with default prompts
-            default_prompts_dict = {
-                "action_items": settings.DEFAULT_PROMPTS["action_items"],
-                "auto_reply": settings.DEFAULT_PROMPTS["auto_reply"]
+            prompts = {
+                **self._default_prompts(),
+                "version": 1,
+                "versions": {prompt_type: 1 for prompt_type in PROMPT_TYPES}
             }
-            result = await self.collection.insert_one(default_prompts_dict)
-            
-            # Get the inserted document and convert ObjectId to string
-            prompts = await self.collection.find_one({"_id": result.inserted_id})
+            result = await self.collection.insert_one(prompts)
+            prompts["_id"] = result.inserted_id
         
         # Convert ObjectId to string
         prompts = self._convert_objectid_to_str(prompts)
         
-        return PromptConfig(**prompts)
+        return _cache_prompts(PromptConfig(**prompts))
     
     async def update_prompt(self, prompt_type: str, content: str) -> PromptConfig:
         """Update specific prompt"""
-        valid_types = ["action_items", "auto_reply"]
-        if prompt_type not in valid_types:
-            raise ValueError(f"Invalid prompt type. Must be one of: {valid_types}")
+        if prompt_type not in PROMPT_TYPES:
+            raise ValueError(f"Invalid prompt type. Must be one of: {PROMPT_TYPES}")
         
-        # Get current prompts first
-        current_prompts = await self.get_prompts()
+        # Make sure the prompts document exists
+        if await self.collection.count_documents({}, limit=1) == 0:
+            await self.get_prompts()
         
-        # Update the specific prompt
-        update_data = {prompt_type: content}
-        await self.collection.update_one(
-            {"_id": ObjectId(current_prompts.id)},
-            {"$set": update_data}
+        # Update the specific prompt and bump the version in one round-trip
+        prompts = await self.collection.find_one_and_update(
+            {},
+            {"$set": {prompt_type: content}, "$inc": {"version": 1, f"versions.{prompt_type}": 1}},
+            return_document=ReturnDocument.AFTER
         )
+        prompts = self._convert_objectid_to_str(prompts)
         
-        return await self.get_prompts()
+        return _cache_prompts(PromptConfig(**prompts))
     
     async def reset_to_defaults(self) -> PromptConfig:
         """Reset prompts to default values"""
-        default_prompts_dict = {
-            "action_items": settings.DEFAULT_PROMPTS["action_items"],
-            "auto_reply": settings.DEFAULT_PROMPTS["auto_reply"]
-        }
-        
-        # Delete all and create new
-        await self.collection.delete_many({})
-        result = await self.collection.insert_one(default_prompts_dict)
-        
-        # Get the new document and convert ObjectId to string
-        prompts = await self.collection.find_one({"_id": result.inserted_id})
+        # Keep a single document and bump its version so other workers notice the reset;
+        # only prompts that actually change get a new stage version
+        current = await self.collection.find_one({}) or {}
+        defaults = self._default_prompts()
+        increments = {"version": 1}
+        for prompt_type in PROMPT_TYPES:
+            if current.get(prompt_type) != defaults[prompt_type]:
+                increments[f"versions.{prompt_type}"] = 1
+        prompts = await self.collection.find_one_and_update(
+            {},
+            {"$set": defaults, "$inc": increments},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        await self.collection.delete_many({"_id": {"$ne": prompts["_id"]}})
         prompts = self._convert_objectid_to_str(prompts)
         
-        return PromptConfig(**prompts)
\ No newline at end of file
+        return _cache_prompts(PromptConfig(**prompts))
+    
+    async def watch_changes(self):
+        """Invalidate the cache whenever another process changes the prompts.
+        
+        Change streams need a replica set; on a standalone server this returns
+        and the periodic version check keeps the cache fresh instead.
+        """
+        try:
+            async with self.collection.watch() as stream:
+                print("👀 Watching prompt changes")
+                async for _ in stream:
+                    invalidate_prompt_cache()
+        except asyncio.CancelledError:
+            raise
+        except PyMongoError as e:
+            print(f"⚠️ Prompt change stream unavailable, using version checks: {e}")
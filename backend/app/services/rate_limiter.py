@@ -0,0 +1,33 @@
+import asyncio
+import time
+from app.config import settings
+
+class TokenBucket:
+    """Async token-bucket limiter shared by every coroutine in the process"""
+
+    def __init__(self, rate_per_minute: float, capacity: int = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or max(1, int(rate_per_minute // 60) or 1)
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self, tokens: int = 1):
+        """Wait until `tokens` are available, then consume them"""
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+llm_rate_limiter = TokenBucket(
+    settings.LLM_REQUESTS_PER_MINUTE,
+    capacity=settings.LLM_BURST_SIZE
+)
@@ -0,0 +1,220 @@
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from bson import ObjectId
+from pymongo import ASCENDING, UpdateOne
+from app.config import settings
+from app.services.email_service import EmailService, COMPACT_PROJECTION
+from app.services.embeddings import EMBEDDING_DIM, embed_email, embed_text, from_binary, to_binary
+
+# Reciprocal-rank-fusion constant for hybrid ranking
+RRF_K = 60
+
+# Filtered semantic search ranks the whole index, then checks this many times the
+# wanted candidates against the filter (growing by the same factor until enough match)
+FILTER_OVERFETCH = 4
+
+# Emails read (and, for older data, embedded) per round trip when loading the index
+INDEX_PAGE_SIZE = 1000
+
+def _embed_documents(documents: List[dict]) -> List[np.ndarray]:
+    return [embed_email(doc.get("subject", ""), doc.get("sender", ""), doc.get("body", "")) for doc in documents]
+
+class SemanticIndex:
+    """In-process matrix of email embeddings, refreshed incrementally from Mongo.
+
+    New emails are appended by scanning _id upward from the last one seen, one
+    page at a time; a count mismatch up to that id (deletions, or inserts with
+    older _ids) triggers a full reload. Emails stored without a vector (older
+    data) get one computed in the default executor and written back.
+    """
+
+    def __init__(self):
+        self.ids: List[ObjectId] = []
+        self.matrix = np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+        self.checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _reset(self):
+        self.ids = []
+        self.matrix = np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+
+    async def _load_page(self, collection, documents: List[dict]) -> Tuple[List[ObjectId], List[np.ndarray], int]:
+        """Vectors for one page of {_id, embedding} documents; returns ids, vectors and the backfill count"""
+        vectors: Dict[ObjectId, np.ndarray] = {}
+        missing = []
+        for doc in documents:
+            data = doc.get("embedding")
+            if data and len(data) == EMBEDDING_DIM * 4:
+                vectors[doc["_id"]] = from_binary(data)
+            else:
+                missing.append(doc["_id"])
+
+        backfilled = 0
+        if missing:
+            stored = await collection.find(
+                {"_id": {"$in": missing}}, {"subject": 1, "sender": 1, "body": 1}
+            ).to_list(length=None)
+            # Embedding is CPU-bound: keep it off the event loop
+            computed = await asyncio.get_running_loop().run_in_executor(None, _embed_documents, stored)
+            updates = []
+            for doc, vector in zip(stored, computed):
+                vectors[doc["_id"]] = vector
+                updates.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"embedding": to_binary(vector)}}))
+            if updates:
+                await collection.bulk_write(updates, ordered=False)
+                backfilled = len(updates)
+
+        ids = [doc["_id"] for doc in documents if doc["_id"] in vectors]
+        return ids, [vectors[email_id] for email_id in ids], backfilled
+
+    async def _load_after(self, collection, last_id: Optional[ObjectId]):
+        ids: List[ObjectId] = []
+        vectors: List[np.ndarray] = []
+        backfilled = 0
+        while True:
+            query = {"_id": {"$gt": last_id}} if last_id else {}
+            documents = await collection.find(query, {"embedding": 1}).sort("_id", ASCENDING).to_list(length=INDEX_PAGE_SIZE)
+            if not documents:
+                break
+            page_ids, page_vectors, page_backfilled = await self._load_page(collection, documents)
+            ids.extend(page_ids)
+            vectors.extend(page_vectors)
+            backfilled += page_backfilled
+            last_id = documents[-1]["_id"]
+
+        if backfilled:
+            print(f"🧭 Backfilled search embeddings for {backfilled} emails")
+        if ids:
+            self.ids.extend(ids)
+            self.matrix = np.vstack([self.matrix, np.stack(vectors)])
+
+    async def refresh(self, collection, force: bool = False):
+        async with self._lock:
+            if not force and time.monotonic() - self.checked_at < settings.SEARCH_INDEX_REFRESH_SECONDS:
+                return
+            await self._load_after(collection, self.ids[-1] if self.ids else None)
+            # Count only up to the last loaded id, so emails inserted meanwhile do not look like a mismatch
+            if self.ids and await collection.count_documents({"_id": {"$lte": self.ids[-1]}}) != len(self.ids):
+                # Emails deleted, or inserted with older _ids: rebuild once
+                self._reset()
+                await self._load_after(collection, None)
+            self.checked_at = time.monotonic()
+
+    def scores(self, query: np.ndarray) -> Optional[Tuple[List[ObjectId], np.ndarray]]:
+        """Cosine similarity of every indexed email to the query (vectors are unit length).
+        
+        Returned with the ids they belong to, so a refresh in between cannot mismatch them.
+        """
+        if not self.ids or not query.any():
+            return None
+        return self.ids, self.matrix @ query
+
+    @staticmethod
+    def top(scored: Optional[Tuple[List[ObjectId], np.ndarray]], count: int) -> List[Tuple[ObjectId, float]]:
+        """Best `count` matches from `scores()`, above SEARCH_MIN_SIMILARITY"""
+        if scored is None:
+            return []
+        ids, scores = scored
+        count = min(count, len(scores))
+        candidates = np.argpartition(-scores, count - 1)[:count]
+        ranked = candidates[np.argsort(-scores[candidates])]
+        return [
+            (ids[index], float(scores[index]))
+            for index in ranked
+            if scores[index] >= settings.SEARCH_MIN_SIMILARITY
+        ]
+
+semantic_index = SemanticIndex()
+
+class SearchService:
+    def __init__(self):
+        self._email_service = None
+
+    @property
+    def email_service(self):
+        if self._email_service is None:
+            self._email_service = EmailService()
+        return self._email_service
+
+    @property
+    def collection(self):
+        return self.email_service.collection
+
+    async def _fetch_compact(self, ranked: List[Tuple[ObjectId, float]]) -> List[Tuple[dict, float]]:
+        """Load compact documents for ranked ids, keeping the ranking order"""
+        if not ranked:
+            return []
+        documents = await self.collection.find(
+            {"_id": {"$in": [email_id for email_id, _ in ranked]}}, COMPACT_PROJECTION
+        ).to_list(length=len(ranked))
+        by_id = {doc["_id"]: doc for doc in documents}
+        return [(by_id[email_id], score) for email_id, score in ranked if email_id in by_id]
+
+    async def keyword_ranking(self, query: str, filters: dict, count: int) -> List[Tuple[ObjectId, float]]:
+        """Text-index matches ordered by Mongo's relevance score"""
+        cursor = self.collection.find(
+            {"$text": {"$search": query}, **filters},
+            {"score": {"$meta": "textScore"}}
+        ).sort([("score", {"$meta": "textScore"})]).limit(count)
+        return [(doc["_id"], doc["score"]) async for doc in cursor]
+
+    async def semantic_ranking(self, query: str, filters: dict, count: int) -> List[Tuple[ObjectId, float]]:
+        """Embedding matches ordered by cosine similarity.
+        
+        Filters are applied to the best-ranked candidates only, with one `_id`
+        lookup per round, so the cost does not grow with the number of emails
+        matching the filter.
+        """
+        await semantic_index.refresh(self.collection)
+        scores = semantic_index.scores(embed_text(query))
+        if not filters:
+            return semantic_index.top(scores, count)
+        
+        depth = count * FILTER_OVERFETCH
+        while True:
+            candidates = semantic_index.top(scores, depth)
+            if not candidates:
+                return []
+            cursor = self.collection.find({"_id": {"$in": [email_id for email_id, _ in candidates]}, **filters}, {"_id": 1})
+            allowed = {doc["_id"] async for doc in cursor}
+            matched = [(email_id, score) for email_id, score in candidates if email_id in allowed]
+            # Fewer candidates than asked for: the ranking is exhausted
+            if len(matched) >= count or len(candidates) < depth:
+                return matched[:count]
+            depth *= FILTER_OVERFETCH
+
+    async def search(
+        self,
+        query: str,
+        mode: str = "hybrid",
+        limit: int = 20,
+        offset: int = 0,
+        **filters
+    ) -> Tuple[List[Tuple[dict, float]], bool]:
+        """One page of ranked results (compact documents with scores) and whether more exist.
+
+        hybrid fuses the keyword and semantic rankings with reciprocal rank fusion.
+        """
+        query_filter = self.email_service.build_filter(**filters)
+        wanted = offset + limit + 1
+
+        if mode == "keyword":
+            ranked = await self.keyword_ranking(query, query_filter, wanted)
+        elif mode == "semantic":
+            ranked = await self.semantic_ranking(query, query_filter, wanted)
+        else:
+            depth = max(wanted, settings.SEARCH_CANDIDATES)
+            keyword, semantic = await asyncio.gather(
+                self.keyword_ranking(query, query_filter, depth),
+                self.semantic_ranking(query, query_filter, depth)
+            )
+            fused: Dict[ObjectId, float] = {}
+            for ranking in (keyword, semantic):
+                for rank, (email_id, _) in enumerate(ranking):
+                    fused[email_id] = fused.get(email_id, 0.0) + 1.0 / (RRF_K + rank + 1)
+            ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:wanted]
+
+        page = ranked[offset:offset + limit]
+        return await self._fetch_compact(page), len(ranked) > offset + limit
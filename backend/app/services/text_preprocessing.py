@@ -0,0 +1,92 @@
+import re
+from typing import List
+
+# Average characters per token for English text with Gemini's tokenizer
+CHARS_PER_TOKEN = 4
+
+# Start of a quoted reply chain: everything from here down is earlier mail
+REPLY_HEADER_PATTERNS = [
+    re.compile(r"^\s*On .{5,200}wrote:\s*$", re.IGNORECASE),
+    re.compile(r"^\s*-{2,}\s*Original Message\s*-{2,}\s*$", re.IGNORECASE),
+    re.compile(r"^\s*From:\s.+$", re.IGNORECASE),  # Outlook-style header block, confirmed below
+]
+OUTLOOK_HEADER_FIELDS = re.compile(r"^\s*(Sent|Date|To|Subject):\s", re.IGNORECASE)
+QUOTED_LINE = re.compile(r"^\s*>")
+
+# Signature delimiters: the standard "-- " line and mobile client footers
+SIGNATURE_DELIMITER = re.compile(r"^--\s*$")
+MOBILE_FOOTER = re.compile(r"^\s*Sent from my \w+", re.IGNORECASE)
+
+def estimate_tokens(text: str) -> int:
+    """Fast token estimate (~4 characters per token) for sizing prompts"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def _is_reply_header(lines: List[str], index: int) -> bool:
+    line = lines[index]
+    if REPLY_HEADER_PATTERNS[0].match(line) or REPLY_HEADER_PATTERNS[1].match(line):
+        return True
+    if REPLY_HEADER_PATTERNS[2].match(line):
+        # A lone "From:" is ordinary text; Outlook quotes are followed by Sent/To/Subject
+        following = lines[index + 1:index + 4]
+        return sum(1 for next_line in following if OUTLOOK_HEADER_FIELDS.match(next_line)) >= 2
+    return False
+
+def strip_quoted_replies(text: str) -> str:
+    """Drop the quoted reply chain under the newest message and any '>' quoted lines.
+
+    Forwarded messages are kept since the forwarded content is usually the point.
+    """
+    lines = text.splitlines()
+    kept = []
+    for index, line in enumerate(lines):
+        if kept and _is_reply_header(lines, index):
+            break
+        if QUOTED_LINE.match(line):
+            continue
+        kept.append(line)
+    return "\n".join(kept).strip()
+
+def strip_signature(text: str) -> str:
+    """Drop the signature block after a '-- ' delimiter and mobile footers"""
+    lines = text.splitlines()
+    for index, line in enumerate(lines):
+        if index > 0 and (SIGNATURE_DELIMITER.match(line) or MOBILE_FOOTER.match(line)):
+            return "\n".join(lines[:index]).strip()
+    return text.strip()
+
+def clean_body(text: str) -> str:
+    """Remove content that costs tokens without adding meaning; never returns empty for non-empty input"""
+    cleaned = re.sub(r"\n{3,}", "\n\n", strip_signature(strip_quoted_replies(text)))
+    return cleaned or text.strip()
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to roughly `max_tokens`, preferring a paragraph or sentence boundary"""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    boundary = max(cut.rfind("\n\n"), cut.rfind(". "))
+    if boundary > max_chars // 2:
+        cut = cut[:boundary + 1]
+    return cut.rstrip() + "\n[...truncated]"
+
+def chunk_text(text: str, chunk_tokens: int) -> List[str]:
+    """Split text into chunks of about `chunk_tokens`, breaking between paragraphs where possible"""
+    max_chars = chunk_tokens * CHARS_PER_TOKEN
+    chunks: List[str] = []
+    current = ""
+    for paragraph in re.split(r"\n\s*\n", text):
+        while len(paragraph) > max_chars:
+            # Paragraph alone is too long (pasted logs): hard-split it
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(paragraph[:max_chars])
+            paragraph = paragraph[max_chars:]
+        if current and len(current) + len(paragraph) + 2 > max_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current.strip():
+        chunks.append(current)
+    return chunks
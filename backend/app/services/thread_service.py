@@ -0,0 +1,443 @@
+import re
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, DeleteOne, InsertOne, UpdateMany, UpdateOne
+from app.database import get_database
+from app.config import settings
+from app.models.email_models import to_naive_utc
+from app.models.thread_models import Thread
+from app.services.llm_service import get_llm_service
+from app.services.pagination import encode_cursor, keyset_filter
+from app.services.text_preprocessing import clean_body, truncate_to_tokens
+
+# Newest activity first, with _id as a tie-breaker for keyset pagination
+THREAD_SORT = [("last_at", DESCENDING), ("_id", DESCENDING)]
+
+# Reply/forward prefixes in common clients and languages, possibly repeated or counted ("Re[2]:")
+SUBJECT_PREFIX = re.compile(r"^\s*((re|fw|fwd|aw|wg|sv|vs|tr|antw)(\[\d+\])?\s*:\s*)+", re.IGNORECASE)
+# New messages folded into the rolling summary per LLM call
+MAX_MESSAGES_PER_UPDATE = 5
+
+def normalize_subject(subject: str) -> str:
+    """Subject without Re:/Fwd: prefixes, list tags aside, case and whitespace folded"""
+    return " ".join(SUBJECT_PREFIX.sub("", subject or "").split()).lower()
+
+def is_reply_subject(subject: str) -> bool:
+    return bool(SUBJECT_PREFIX.match(subject or ""))
+
+def _participants(doc: dict) -> List[str]:
+    return sorted({address.lower() for address in [doc.get("sender", "")] + list(doc.get("recipients", [])) if address})
+
+def _references(doc: dict) -> List[str]:
+    return [ref for ref in [doc.get("in_reply_to")] + list(doc.get("references", [])) if ref]
+
+# Thread fields needed to match new emails against existing threads
+THREAD_MATCH_PROJECTION = {
+    "subject": 1, "normalized_subject": 1, "participants": 1, "message_ids": 1,
+    "referenced_ids": 1, "message_count": 1, "first_at": 1, "last_at": 1
+}
+
+class _ThreadBatch:
+    """Threads touched by one batch of emails, matched and merged in memory.
+
+    A message joins the thread holding a message it references, or the thread
+    whose messages reference it (a reply ingested before its parent). When a
+    message links several threads they are merged into the oldest existing one,
+    and the merged thread's summary is rebuilt from scratch.
+    """
+
+    def __init__(self, documents: List[dict]):
+        self.threads: Dict[ObjectId, dict] = {}
+        self.aliases: Dict[ObjectId, ObjectId] = {}  # merged-away id -> surviving id
+        self.by_message_id: Dict[str, ObjectId] = {}
+        self.by_reference: Dict[str, set] = {}
+        self.by_subject: Dict[str, set] = {}
+        for document in documents:
+            self._register(document["_id"], document, new=False)
+
+    def _register(self, thread_id: ObjectId, document: dict, new: bool) -> dict:
+        state = {
+            "_id": thread_id,
+            "new": new,
+            "subject": document.get("subject", ""),
+            "normalized_subject": document.get("normalized_subject", ""),
+            "participants": set(document.get("participants", [])),
+            "message_ids": set(document.get("message_ids", [])),
+            "referenced_ids": set(document.get("referenced_ids", [])),
+            "message_count": document.get("message_count", 0),
+            "first_at": document.get("first_at"),
+            "last_at": document.get("last_at"),
+            # Changes to write for an existing thread
+            "added": {"participants": set(), "message_ids": set(), "referenced_ids": set(), "message_count": 0},
+            "merged": [],
+            "reset_summary": False
+        }
+        self.threads[thread_id] = state
+        self._index(state, state["message_ids"], state["referenced_ids"])
+        return state
+
+    def _index(self, state: dict, message_ids, references):
+        for message_id in message_ids:
+            self.by_message_id[message_id] = state["_id"]
+        for ref in references:
+            self.by_reference.setdefault(ref, set()).add(state["_id"])
+        if state["normalized_subject"]:
+            self.by_subject.setdefault(state["normalized_subject"], set()).add(state["_id"])
+
+    def resolve(self, thread_id: ObjectId) -> ObjectId:
+        while thread_id in self.aliases:
+            thread_id = self.aliases[thread_id]
+        return thread_id
+
+    def _merge(self, target: dict, other: dict):
+        self.aliases[other["_id"]] = target["_id"]
+        del self.threads[other["_id"]]
+        for field in ("participants", "message_ids", "referenced_ids"):
+            target[field] |= other[field]
+            target["added"][field] |= other[field]
+        target["message_count"] += other["message_count"]
+        target["added"]["message_count"] += other["message_count"]
+        target["first_at"] = min(target["first_at"], other["first_at"])
+        target["last_at"] = max(target["last_at"], other["last_at"])
+        target["merged"] += other["merged"] + ([] if other["new"] else [other["_id"]])
+        target["reset_summary"] = True
+
+    def _match(self, doc: dict) -> Optional[dict]:
+        linked = {self.resolve(self.by_message_id[ref]) for ref in _references(doc) if ref in self.by_message_id}
+        if doc.get("message_id"):
+            linked |= {self.resolve(thread_id) for thread_id in self.by_reference.get(doc["message_id"], ())}
+        if linked:
+            # Keep the oldest stored thread, so existing thread ids stay stable
+            states = sorted((self.threads[thread_id] for thread_id in linked), key=lambda t: (t["new"], t["first_at"]))
+            for other in states[1:]:
+                self._merge(states[0], other)
+            return states[0]
+
+        # Without headers, only a Re:/Fwd: subject continues a conversation; a repeated
+        # plain subject ("Weekly report") starts a new one
+        subject = normalize_subject(doc.get("subject", ""))
+        if not subject or not is_reply_subject(doc.get("subject", "")):
+            return None
+        # A participant must overlap and the thread must have been active recently
+        participants = set(_participants(doc))
+        since = doc["timestamp"] - timedelta(days=settings.THREAD_WINDOW_DAYS)
+        candidates = [
+            self.threads[thread_id]
+            for thread_id in {self.resolve(thread_id) for thread_id in self.by_subject.get(subject, ())}
+        ]
+        candidates = [t for t in candidates if t["participants"] & participants and t["last_at"] >= since]
+        return max(candidates, key=lambda t: t["last_at"]) if candidates else None
+
+    def add(self, doc: dict) -> ObjectId:
+        """Place one email; returns its thread id (resolve it again after later merges)"""
+        state = self._match(doc)
+        if state is None:
+            state = self._register(ObjectId(), {
+                "subject": doc.get("subject", ""),
+                "normalized_subject": normalize_subject(doc.get("subject", "")),
+                "first_at": doc["timestamp"],
+                "last_at": doc["timestamp"]
+            }, new=True)
+        message_ids = {doc["message_id"]} if doc.get("message_id") else set()
+        references = set(_references(doc))
+        for field, values in (("participants", set(_participants(doc))), ("message_ids", message_ids), ("referenced_ids", references)):
+            state[field] |= values
+            state["added"][field] |= values
+        state["message_count"] += 1
+        state["added"]["message_count"] += 1
+        state["first_at"] = min(state["first_at"], doc["timestamp"])
+        state["last_at"] = max(state["last_at"], doc["timestamp"])
+        self._index(state, message_ids, references)
+        return state["_id"]
+
+    def write_operations(self) -> Tuple[list, list]:
+        """Bulk operations for the threads and emails collections"""
+        thread_ops, email_ops = [], []
+        for state in self.threads.values():
+            thread_id = state["_id"]
+            if state["merged"] or state["reset_summary"]:
+                # The merged conversation is summarized again from its first message
+                affected = [str(thread_id)] + [str(old_id) for old_id in state["merged"]]
+                email_ops.append(UpdateMany({"thread_id": {"$in": affected}}, {"$set": {"thread_summarized": False}}))
+            for old_id in state["merged"]:
+                thread_ops.append(DeleteOne({"_id": old_id}))
+                email_ops.append(UpdateMany({"thread_id": str(old_id)}, {"$set": {"thread_id": str(thread_id)}}))
+
+            if state["new"]:
+                thread_ops.append(InsertOne({
+                    "_id": thread_id,
+                    "subject": state["subject"],
+                    "normalized_subject": state["normalized_subject"],
+                    "participants": sorted(state["participants"]),
+                    "message_ids": sorted(state["message_ids"]),
+                    "referenced_ids": sorted(state["referenced_ids"]),
+                    "message_count": state["message_count"],
+                    "first_at": state["first_at"],
+                    "last_at": state["last_at"],
+                    "summarized_count": 0
+                }))
+            elif state["added"]["message_count"]:
+                added = state["added"]
+                update = {
+                    "$addToSet": {
+                        field: {"$each": sorted(added[field])}
+                        for field in ("participants", "message_ids", "referenced_ids")
+                    },
+                    "$inc": {"message_count": added["message_count"]},
+                    "$min": {"first_at": state["first_at"]},
+                    "$max": {"last_at": state["last_at"]}
+                }
+                if state["reset_summary"]:
+                    update["$set"] = {"summary": None, "key_points": [], "summarized_count": 0}
+                thread_ops.append(UpdateOne({"_id": thread_id}, update))
+        return thread_ops, email_ops
+
+class ThreadService:
+    def __init__(self):
+        self._db = None
+        self._threads = None
+        self._emails = None
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = get_database()
+        return self._db
+
+    @property
+    def collection(self):
+        if self._threads is None:
+            self._threads = self.db.threads
+        return self._threads
+
+    @property
+    def emails(self):
+        if self._emails is None:
+            self._emails = self.db.emails
+        return self._emails
+
+    def _to_thread(self, document) -> Optional[Thread]:
+        if not document:
+            return None
+        document["_id"] = str(document["_id"])
+        return Thread(**document)
+
+    async def _load_candidates(self, docs: List[dict]) -> List[dict]:
+        """Existing threads any of the emails could belong to, in one query"""
+        message_ids = list({doc["message_id"] for doc in docs if doc.get("message_id")})
+        references = list({ref for doc in docs for ref in _references(doc)})
+        subjects = list({
+            normalize_subject(doc["subject"]) for doc in docs if is_reply_subject(doc.get("subject", ""))
+        } - {""})
+        clauses = []
+        if references:
+            clauses.append({"message_ids": {"$in": references}})
+        if message_ids:
+            # Replies ingested before this (parent) message
+            clauses.append({"referenced_ids": {"$in": message_ids}})
+        if subjects:
+            oldest = min(doc["timestamp"] for doc in docs)
+            clauses.append({
+                "normalized_subject": {"$in": subjects},
+                "last_at": {"$gte": oldest - timedelta(days=settings.THREAD_WINDOW_DAYS)}
+            })
+        if not clauses:
+            return []
+        return await self.collection.find({"$or": clauses}, THREAD_MATCH_PROJECTION).to_list(length=None)
+
+    async def assign_threads(self, docs: List[dict]):
+        """Attach email documents to their threads, creating and merging threads as needed.
+
+        The whole batch is matched in memory against the candidate threads, then
+        written with one bulk write per collection. Sets `thread_id` on each doc.
+        """
+        docs = [doc for doc in docs if doc.get("timestamp")]
+        if not docs:
+            return
+        # Stored thread datetimes are naive UTC; an aware timestamp could not be compared with them
+        for doc in docs:
+            doc["timestamp"] = to_naive_utc(doc["timestamp"])
+        docs.sort(key=lambda d: d["timestamp"])
+        try:
+            batch = _ThreadBatch(await self._load_candidates(docs))
+            assigned = [(doc, batch.add(doc)) for doc in docs]
+            thread_ops, email_ops = batch.write_operations()
+
+            by_thread: Dict[ObjectId, List] = {}
+            for doc, thread_id in assigned:
+                thread_id = batch.resolve(thread_id)
+                doc["thread_id"] = str(thread_id)
+                by_thread.setdefault(thread_id, []).append(doc["_id"])
+            email_ops.extend(
+                UpdateMany({"_id": {"$in": email_ids}}, {"$set": {"thread_id": str(thread_id)}})
+                for thread_id, email_ids in by_thread.items()
+            )
+
+            if thread_ops:
+                await self.collection.bulk_write(thread_ops, ordered=False)
+            # In order: merged threads' emails are moved before new emails are attached
+            await self.emails.bulk_write(email_ops, ordered=True)
+        except Exception as e:
+            print(f"Error threading {len(docs)} emails: {e}")
+
+    async def assign_unthreaded(self, page_size: int = 500) -> int:
+        """Thread emails stored before threading existed"""
+        assigned = 0
+        projection = {"sender": 1, "recipients": 1, "subject": 1, "timestamp": 1,
+                      "message_id": 1, "in_reply_to": 1, "references": 1}
+        query = {"thread_id": None}
+        while True:
+            docs = await self.emails.find(query, projection).sort(
+                [("timestamp", ASCENDING), ("_id", ASCENDING)]
+            ).to_list(length=page_size)
+            if not docs:
+                break
+            await self.assign_threads(docs)
+            assigned += len(docs)
+            # Move past this page, so an email that fails to thread is not retried forever
+            last = docs[-1]
+            query = {"thread_id": None, "$or": [
+                {"timestamp": {"$gt": last["timestamp"]}},
+                {"timestamp": last["timestamp"], "_id": {"$gt": last["_id"]}}
+            ]}
+        if assigned:
+            print(f"🧵 Threaded {assigned} existing emails")
+        return assigned
+
+    async def get_thread(self, thread_id: str) -> Optional[Thread]:
+        try:
+            return self._to_thread(await self.collection.find_one({"_id": ObjectId(thread_id)}))
+        except Exception:
+            return None
+
+    async def get_threads_page(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        participant: Optional[str] = None
+    ) -> Tuple[List[Thread], Optional[str]]:
+        """One page of threads, most recently active first, plus the next cursor"""
+        query = {"participants": participant.lower()} if participant else {}
+        after = keyset_filter(cursor, field="last_at")
+        if after:
+            query = {"$and": [query, after]} if query else after
+        documents = await self.collection.find(query, {"message_ids": 0}).sort(THREAD_SORT).to_list(length=limit + 1)
+
+        next_cursor = None
+        if len(documents) > limit:
+            documents = documents[:limit]
+            next_cursor = encode_cursor(documents[-1]["last_at"], documents[-1]["_id"])
+        return [self._to_thread(document) for document in documents], next_cursor
+
+    async def get_thread_messages(
+        self,
+        thread_id: str,
+        unsummarized_only: bool = False,
+        limit: int = 0,
+        projection: Optional[dict] = None
+    ) -> List[dict]:
+        """Thread emails in chronological order, optionally only those not yet in the summary"""
+        query = {"thread_id": thread_id}
+        if unsummarized_only:
+            query["thread_summarized"] = {"$ne": True}
+        cursor = self.emails.find(
+            query, projection or {"embedding": 0}
+        ).sort([("timestamp", ASCENDING), ("_id", ASCENDING)])
+        if limit:
+            cursor = cursor.limit(limit)
+        return await cursor.to_list(length=None)
+
+    def _summary_prompt(self, thread: Thread, messages: List[dict]) -> str:
+        # Each message gets an equal share of the summary budget
+        per_message = settings.LLM_BODY_TOKEN_BUDGETS["generate_summary"] // MAX_MESSAGES_PER_UPDATE
+        new_messages = "\n\n".join(
+            f"From: {message['sender']}\nDate: {message['timestamp'].isoformat()}\n"
+            f"{truncate_to_tokens(clean_body(message['body']), per_message)}"
+            for message in messages
+        )
+        return f"""
+        You maintain a running summary of an email conversation.
+        Update it with the new message(s) below. Keep what still matters from the
+        current summary, add new requests, decisions and deadlines, and drop
+        anything the new messages resolve.
+
+        CONVERSATION SUBJECT: {thread.subject}
+
+        CURRENT SUMMARY:
+        {thread.summary or "(none yet - this is the start of the conversation)"}
+
+        CURRENT KEY POINTS:
+        {thread.key_points}
+
+        NEW MESSAGE(S):
+        {new_messages}
+
+        IMPORTANT: Return ONLY a valid JSON object:
+        {{
+            "summary": "3-5 sentence summary of the whole conversation so far",
+            "key_points": ["point 1", "point 2", "point 3"]
+        }}
+        """
+
+    def _fallback_summary(self, thread: Thread, messages: List[dict]) -> dict:
+        """Rule-based rolling summary: the latest few messages' openings (not stored)"""
+        lines = [
+            f"{message['sender']}: {' '.join(clean_body(message['body']).split()[:20])}"
+            for message in messages[-5:]
+        ]
+        return {
+            "summary": thread.summary or " ".join(lines),
+            "key_points": thread.key_points or lines,
+            "fallback": True
+        }
+
+    async def get_or_update_summary(self, thread: Thread) -> dict:
+        """Rolling thread summary, extended with only the messages added since the last update.
+
+        Each LLM call sees the current summary plus at most MAX_MESSAGES_PER_UPDATE
+        new messages, so the cost per message stays flat however long the thread is.
+        """
+        # Folded messages are flagged by id, so late arrivals with older timestamps still count
+        pending = await self.get_thread_messages(str(thread.id), unsummarized_only=True)
+        if not pending:
+            return {"summary": thread.summary, "key_points": thread.key_points}
+
+        llm_service = get_llm_service()
+        if llm_service is None:
+            return self._fallback_summary(thread, pending)
+
+        for start in range(0, len(pending), MAX_MESSAGES_PER_UPDATE):
+            messages = pending[start:start + MAX_MESSAGES_PER_UPDATE]
+            try:
+                response_text = await llm_service.generate_text(
+                    "update_thread_summary", self._summary_prompt(thread, messages),
+                    validate=lambda text: isinstance(llm_service._parse_keyed_json(text).get("summary"), str)
+                )
+                data = llm_service._parse_keyed_json(response_text)
+                if not isinstance(data.get("summary"), str):
+                    raise ValueError("Thread summary response did not match the expected schema")
+            except Exception as e:
+                print(f"Error updating thread summary: {e}")
+                return self._fallback_summary(thread, pending[start:])
+
+            update = {
+                "summary": data["summary"],
+                "key_points": [str(point) for point in data.get("key_points", [])][:10],
+                "summary_updated_at": datetime.now()
+            }
+            # Only advance from the position we read, so concurrent updaters cannot double-apply
+            result = await self.collection.update_one(
+                {"_id": ObjectId(str(thread.id)), "summarized_count": thread.summarized_count},
+                {"$set": update, "$inc": {"summarized_count": len(messages)}}
+            )
+            if result.modified_count == 0:
+                refreshed = await self.get_thread(str(thread.id))
+                return {"summary": refreshed.summary, "key_points": refreshed.key_points}
+            await self.emails.update_many(
+                {"_id": {"$in": [message["_id"] for message in messages]}},
+                {"$set": {"thread_summarized": True}}
+            )
+            thread = thread.model_copy(update={**update, "summarized_count": thread.summarized_count + len(messages)})
+
+        return {"summary": thread.summary, "key_points": thread.key_points}
@@ -0,0 +1,50 @@
+import json
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+from fastapi.responses import StreamingResponse
+
+def sse_event(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    """Format one Server-Sent Event"""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
+
+async def text_events(
+    chunks: Optional[AsyncIterator[str]],
+    fallback: Callable[[], str],
+    cleaner=None,
+    done_fields: Optional[Dict[str, Any]] = None
+) -> AsyncIterator[str]:
+    """Forward model text chunks as `delta` events, ending with a `done` event.
+    
+    `cleaner` (anything with feed()/finish()) post-processes the stream
+    incrementally. If generation fails before any text was sent, the
+    fallback text is sent instead so clients always get a usable result.
+    """
+    done_fields = done_fields or {}
+    sent_any = False
+    try:
+        if chunks is None:
+            raise RuntimeError("AI service not configured")
+        async for chunk in chunks:
+            text = cleaner.feed(chunk) if cleaner else chunk
+            if not sent_any:
+                text = text.lstrip()
+            if text:
+                sent_any = True
+                yield sse_event({"delta": text})
+        tail = cleaner.finish() if cleaner else ""
+        if tail:
+            sent_any = True
+            yield sse_event({"delta": tail})
+        yield sse_event({**done_fields, "success": True, "ai_generated": True}, event="done")
+    except Exception as e:
+        print(f"❌ Error streaming AI response: {e}")
+        if not sent_any:
+            yield sse_event({"delta": fallback()})
+        yield sse_event({**done_fields, "success": False, "ai_generated": False}, event="done")
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,53 @@
+import argparse
+import asyncio
+import os
+import socket
+from typing import Optional
+from app.config import settings
+from app.database import connect_to_mongo, close_mongo_connection
+from app.services.llm_service import init_llm_service
+from app.services.processing_service import ProcessingService
+
+async def run_worker(
+    worker_id: str,
+    concurrency: int,
+    poll_interval: float,
+    once: bool = False,
+    batch_mode: Optional[bool] = None
+):
+    """Poll for queued jobs and process their emails until stopped"""
+    await connect_to_mongo()
+    await init_llm_service()
+    processing_service = ProcessingService(batch_mode=batch_mode)
+    print(f"🛠️ Worker {worker_id} started (concurrency={concurrency})")
+    
+    try:
+        while True:
+            handled = await processing_service.run_active_jobs(worker_id, concurrency)
+            if not handled:
+                if once:
+                    break
+                await asyncio.sleep(poll_interval)
+    finally:
+        await close_mongo_connection()
+        print(f"👋 Worker {worker_id} stopped")
+
+def main():
+    parser = argparse.ArgumentParser(description="Email processing worker")
+    parser.add_argument("--worker-id", default=f"{socket.gethostname()}-{os.getpid()}")
+    parser.add_argument("--concurrency", type=int, default=settings.PROCESSING_CONCURRENCY)
+    parser.add_argument("--poll-interval", type=float, default=settings.WORKER_POLL_INTERVAL)
+    parser.add_argument("--once", action="store_true", help="Exit when no work is left")
+    parser.add_argument(
+        "--batch", action=argparse.BooleanOptionalAction, default=None,
+        help="Pack several emails into each LLM request (default: LLM_BATCH_MODE)"
+    )
+    args = parser.parse_args()
+    
+    try:
+        asyncio.run(run_worker(args.worker_id, args.concurrency, args.poll_interval, args.once, args.batch))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import pytest
+from app.services import circuit_breaker
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock)
+    return clock
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker("test", failure_threshold=3, reset_timeout=30)
+
+def trip(breaker: CircuitBreaker):
+    for _ in range(breaker.failure_threshold):
+        assert breaker.allow()
+        breaker.record_failure(RuntimeError("boom"))
+
+def test_stays_closed_below_threshold(breaker):
+    breaker.record_failure(RuntimeError("boom"))
+    breaker.record_failure(RuntimeError("boom"))
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_success()
+    breaker.record_failure(RuntimeError("boom"))
+    breaker.record_failure(RuntimeError("boom"))
+    # Only consecutive failures count
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+def test_opens_after_consecutive_failures_and_short_circuits(breaker):
+    trip(breaker)
+    assert breaker.is_open
+    assert not breaker.allow()
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    assert breaker.short_circuited == 2
+    assert breaker.status()["retry_in_seconds"] == 30
+    assert breaker.status()["last_error"] == "RuntimeError: boom"
+
+def test_half_open_lets_one_trial_through(breaker, clock):
+    trip(breaker)
+    clock.now += 29.9
+    assert not breaker.allow()
+    clock.now += 0.1
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # The trial is in flight: everyone else keeps falling back
+    assert not breaker.allow()
+
+def test_successful_trial_closes(breaker, clock):
+    trip(breaker)
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.consecutive_failures == 0
+    assert breaker.allow() and breaker.allow()
+
+def test_failed_trial_reopens_for_a_full_timeout(breaker, clock):
+    trip(breaker)
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_failure(RuntimeError("still down"))
+    assert breaker.is_open
+    assert breaker.opened_at == clock.now
+    clock.now += 29
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()
+
+def test_release_returns_the_trial_slot(breaker, clock):
+    trip(breaker)
+    clock.now += 30
+    assert breaker.allow()
+    # The trial call was cancelled before it finished
+    breaker.release()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
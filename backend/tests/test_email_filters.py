@@ -0,0 +1,80 @@
+from datetime import datetime
+import mongomock
+import pytest
+from app.config import settings
+from app.models.email_models import EmailStatus
+from app.services.email_service import EmailService
+
+VERSIONS = {"action_items": 2, "auto_reply": 1}
+
+@pytest.fixture
+def emails():
+    return mongomock.MongoClient().db.emails
+
+@pytest.fixture
+def service():
+    return EmailService()
+
+def insert(emails, name: str, **fields) -> str:
+    emails.insert_one({"name": name, "status": EmailStatus.UNREAD, "retry_count": 0} | fields)
+    return name
+
+def names(emails, query: dict) -> set:
+    return {doc["name"] for doc in emails.find(query)}
+
+def test_claimable_filter(emails, service):
+    insert(emails, "unread")
+    insert(emails, "drafted", status=EmailStatus.DRAFTED)
+    insert(emails, "retryable", status=EmailStatus.FAILED, retry_count=settings.PROCESSING_MAX_FAILURES - 1)
+    insert(emails, "exhausted", status=EmailStatus.FAILED, retry_count=settings.PROCESSING_MAX_FAILURES)
+    insert(emails, "leased", status=EmailStatus.PROCESSING, claimed_by="w1")
+    insert(emails, "processed", status=EmailStatus.PROCESSED)
+    assert names(emails, service.claimable_filter()) == {"unread", "drafted", "retryable"}
+
+def test_lease_filter_only_matches_the_holder(emails, service):
+    insert(emails, "mine", status=EmailStatus.PROCESSING, claimed_by="w1")
+    insert(emails, "theirs", status=EmailStatus.PROCESSING, claimed_by="w2")
+    # Reaped after w1's lease expired: w1 must not write its results any more
+    insert(emails, "reaped", status=EmailStatus.FAILED, claimed_by=None)
+    insert(emails, "reclaimed_elsewhere", status=EmailStatus.PROCESSED, claimed_by="w1")
+    assert names(emails, service.lease_filter("w1")) == {"mine"}
+
+def test_versions_key_is_order_independent(service):
+    assert service.versions_key({"b": 1, "a": 2}) == service.versions_key({"a": 2, "b": 1}) == "a:2,b:1"
+
+def test_stale_filter(emails, service):
+    current = {"prompt_versions": VERSIONS}
+    insert(emails, "current", status=EmailStatus.PROCESSED, metadata=current)
+    insert(emails, "stale", status=EmailStatus.PROCESSED, metadata={"prompt_versions": {"action_items": 1, "auto_reply": 1}})
+    insert(emails, "legacy", status=EmailStatus.PROCESSED, metadata={})
+    insert(emails, "unprocessed", metadata={"prompt_versions": {"action_items": 1}})
+    assert names(emails, service.stale_filter(VERSIONS)) == {"stale", "legacy"}
+
+def test_claimable_stale_filter_skips_emails_out_of_reprocess_attempts(emails, service):
+    stale = {"prompt_versions": {"action_items": 1, "auto_reply": 1}}
+    key = service.versions_key(VERSIONS)
+    limit = settings.PROCESSING_MAX_FAILURES
+    insert(emails, "fresh", status=EmailStatus.PROCESSED, metadata=stale)
+    insert(emails, "retrying", status=EmailStatus.PROCESSED, metadata=stale,
+           reprocess_failed_key=key, reprocess_failures=limit - 1)
+    insert(emails, "given_up", status=EmailStatus.PROCESSED, metadata=stale,
+           reprocess_failed_key=key, reprocess_failures=limit)
+    # Gave up under older prompt versions: a new prompt change retries it
+    insert(emails, "given_up_before", status=EmailStatus.PROCESSED, metadata=stale,
+           reprocess_failed_key="action_items:1,auto_reply:1", reprocess_failures=limit)
+    assert names(emails, service.stale_filter(VERSIONS)) == {"fresh", "retrying", "given_up", "given_up_before"}
+    assert names(emails, service.stale_filter(VERSIONS, claimable=True)) == {"fresh", "retrying", "given_up_before"}
+
+def test_claim_and_lease_round_trip(emails, service):
+    insert(emails, "queued", job_id="job")
+    claimed = emails.find_one_and_update(
+        {"$and": [service.claimable_filter(), {"job_id": "job"}]},
+        service._claim_update("w1"),
+        return_document=True
+    )
+    assert claimed["status"] == EmailStatus.PROCESSING and claimed["claimed_by"] == "w1"
+    assert claimed["lease_expires_at"] > datetime.now()
+    # Held: no longer claimable by anyone else
+    assert not names(emails, service.claimable_filter())
+    assert names(emails, service.lease_filter("w1")) == {"queued"}
+    assert not names(emails, service.lease_filter("w2"))
@@ -0,0 +1,42 @@
+import hashlib
+from app.services.near_duplicates import (
+    FINGERPRINT_BITS, _shingles, from_int64, hamming_distance, lsh_bands, simhash, to_int64
+)
+
+def reference_simhash(text: str) -> int:
+    """Bit-by-bit definition; stored fingerprints must stay identical to it"""
+    weights = [0] * FINGERPRINT_BITS
+    for shingle in _shingles(text):
+        value = int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), "little")
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+BODIES = [
+    "",
+    "Hi",
+    "Order 1234 shipped",
+    "Your order 1234 has shipped and will arrive on Tuesday. Track it in your account.",
+    " ".join(f"word{i % 37} filler text" for i in range(400)),
+]
+
+def test_simhash_matches_reference():
+    for body in BODIES:
+        assert simhash(body) == reference_simhash(body)
+
+def test_numbers_do_not_change_fingerprint():
+    first = simhash("Your order 1234 has shipped and will arrive on Tuesday")
+    second = simhash("Your order 98765 has shipped and will arrive on Tuesday")
+    assert first == second
+
+def test_int64_round_trip():
+    for fingerprint in (0, 1, (1 << 63) - 1, 1 << 63, (1 << 64) - 1):
+        stored = to_int64(fingerprint)
+        assert -(1 << 63) <= stored < 1 << 63
+        assert from_int64(stored) == fingerprint
+
+def test_close_fingerprints_share_a_band():
+    fingerprint = simhash(BODIES[3])
+    near = fingerprint ^ 0b101  # two bits apart
+    assert hamming_distance(fingerprint, near) == 2
+    assert set(lsh_bands(fingerprint)) & set(lsh_bands(near))
@@ -0,0 +1,22 @@
+from datetime import datetime
+import pytest
+from bson import ObjectId
+from app.services.pagination import decode_cursor, encode_cursor, keyset_filter
+
+def test_cursor_round_trip():
+    timestamp, document_id = datetime(2024, 1, 15, 10, 30, 0, 123000), ObjectId()
+    assert decode_cursor(encode_cursor(timestamp, document_id)) == (timestamp, document_id)
+
+def test_malformed_cursor_is_a_value_error():
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+def test_keyset_filter_breaks_timestamp_ties_by_id():
+    timestamp, document_id = datetime(2024, 1, 15), ObjectId()
+    cursor = encode_cursor(timestamp, document_id)
+    assert keyset_filter(cursor) == {"$or": [
+        {"timestamp": {"$lt": timestamp}},
+        {"timestamp": timestamp, "_id": {"$lt": document_id}}
+    ]}
+    assert keyset_filter(cursor, descending=False, field="last_at")["$or"][0] == {"last_at": {"$gt": timestamp}}
+    assert keyset_filter(None) == {}
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+from bson import ObjectId
+from app.models.email_models import EmailCreate
+from app.services.thread_service import _ThreadBatch
+
+def ingested(**fields) -> dict:
+    """An email document as bulk ingest hands it to assign_threads"""
+    raw = {"sender": "bob@example.com", "recipients": ["alice@example.com"], "body": "Sounds good."}
+    doc = EmailCreate.model_validate(raw | fields).model_dump()
+    doc["_id"] = ObjectId()
+    return doc
+
+def stored_thread(**fields) -> dict:
+    """A thread as loaded from MongoDB, with naive UTC datetimes"""
+    return {
+        "_id": ObjectId(),
+        "subject": "Budget review",
+        "normalized_subject": "budget review",
+        "participants": ["alice@example.com", "bob@example.com"],
+        "message_ids": ["<parent@example.com>"],
+        "referenced_ids": [],
+        "message_count": 1,
+        "first_at": datetime(2024, 1, 14, 9, 0),
+        "last_at": datetime(2024, 1, 14, 9, 0),
+    } | fields
+
+def test_aware_timestamps_are_stored_as_naive_utc():
+    doc = ingested(subject="Hello", timestamp="2024-01-15T10:30:00+02:00")
+    assert doc["timestamp"] == datetime(2024, 1, 15, 8, 30)
+    assert doc["timestamp"].tzinfo is None
+
+def test_reply_header_joins_stored_thread():
+    thread = stored_thread()
+    batch = _ThreadBatch([thread])
+    reply = ingested(
+        subject="Re: Budget review",
+        timestamp="2024-01-15T10:30:00Z",
+        message_id="<reply@example.com>",
+        in_reply_to="<parent@example.com>",
+    )
+    assert batch.add(reply) == thread["_id"]
+    state = batch.threads[thread["_id"]]
+    assert state["first_at"] == datetime(2024, 1, 14, 9, 0)
+    assert state["last_at"] == datetime(2024, 1, 15, 10, 30)
+
+def test_reply_subject_joins_recent_stored_thread():
+    thread = stored_thread(message_ids=[])
+    batch = _ThreadBatch([thread])
+    reply = ingested(subject="RE: budget Review", timestamp="2024-01-15T10:30:00Z")
+    assert batch.add(reply) == thread["_id"]
+
+def test_reply_subject_outside_window_starts_new_thread():
+    thread = stored_thread(message_ids=[], last_at=datetime(2023, 1, 1))
+    batch = _ThreadBatch([thread])
+    reply = ingested(subject="Re: Budget review", timestamp="2024-01-15T10:30:00Z")
+    assert batch.add(reply) != thread["_id"]
+
+def test_message_linking_two_stored_threads_merges_into_oldest():
+    older = stored_thread(first_at=datetime(2024, 1, 10), last_at=datetime(2024, 1, 10))
+    # A reply that arrived before its parent and started its own thread
+    newer = stored_thread(
+        message_ids=["<child@example.com>"],
+        referenced_ids=["<middle@example.com>"],
+        first_at=datetime(2024, 1, 15, 12),
+        last_at=datetime(2024, 1, 15, 12),
+    )
+    batch = _ThreadBatch([older, newer])
+    middle = ingested(
+        subject="Re: Budget review",
+        timestamp="2024-01-15T11:00:00Z",
+        message_id="<middle@example.com>",
+        in_reply_to="<parent@example.com>",
+    )
+    assert batch.add(middle) == older["_id"]
+    assert batch.resolve(newer["_id"]) == older["_id"]
+    state = batch.threads[older["_id"]]
+    assert state["message_count"] == 3
+    assert state["last_at"] == datetime(2024, 1, 15, 12)
+    assert state["reset_summary"] and state["merged"] == [newer["_id"]]